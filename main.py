@@ -19,5 +19,12 @@ from src.main import app  # noqa: E402,F401
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=False)
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        ws="websockets",
+        ws_per_message_deflate=True,
+    )
 
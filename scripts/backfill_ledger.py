@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Перенос существующих балансов в журнал проводок.
+
+Для каждого пользователя и валюты сравнивает проекцию (users.rub_balance /
+users.tf_balance) с суммой его проводок в balance_entries и записывает
+разницу одной проводкой "opening" против счёта equity:opening. Проекция
+не меняется. Повторный запуск безопасен: сошедшиеся балансы пропускаются.
+
+    python scripts/backfill_ledger.py           # записать недостающие проводки
+    python scripts/backfill_ledger.py --check   # только показать расхождения
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, Base, engine
+from src.infrastructure.repositiry.db_models import BalanceEntryORM, CurrencyTypeEnum, UserORM
+from src.infrastructure.services.balance_service import (
+    OPENING_EQUITY,
+    BalanceLedger,
+    from_minor,
+    to_minor,
+    user_account,
+)
+
+BATCH_SIZE = 500
+
+
+async def find_differences(session):
+    totals = await BalanceLedger(session).ledger_totals()
+    rows = (await session.execute(select(UserORM.id, UserORM.rub_balance, UserORM.tf_balance))).all()
+
+    differences = []
+    for user_id, rub_balance, tf_balance in rows:
+        for currency, projection in ((CurrencyTypeEnum.RUB, rub_balance), (CurrencyTypeEnum.TF, tf_balance)):
+            difference = to_minor(projection or 0.0) - totals.get((user_id, currency), 0)
+            if difference:
+                differences.append((user_id, currency, difference))
+    return differences
+
+
+async def write_opening_entries(session, differences) -> int:
+    now = datetime.utcnow()
+    for start in range(0, len(differences), BATCH_SIZE):
+        rows = []
+        for user_id, currency, difference in differences[start:start + BATCH_SIZE]:
+            transfer_id = uuid.uuid4().hex
+            common = {
+                "transfer_id": transfer_id,
+                "currency": currency,
+                "kind": "opening",
+                "reference": "backfill",
+                "created_at": now,
+            }
+            rows.append({**common, "account": user_account(user_id), "user_id": user_id, "amount": difference})
+            rows.append({**common, "account": OPENING_EQUITY, "user_id": None, "amount": -difference})
+        await session.execute(insert(BalanceEntryORM.__table__), rows)
+        await session.commit()
+    return len(differences)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="только вывести расхождения")
+    args = parser.parse_args()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        differences = await find_differences(session)
+        for user_id, currency, difference in differences[:20]:
+            print(f"  user {user_id} {currency.value}: {from_minor(difference):+.2f}")
+        if len(differences) > 20:
+            print(f"  ... ещё {len(differences) - 20}")
+
+        if args.check:
+            print(f"Расхождений журнала и проекции: {len(differences)}")
+            written = 0
+        else:
+            written = await write_opening_entries(session, differences)
+            print(f"Записано вступительных проводок: {written}")
+    await engine.dispose()
+
+    if args.check and differences:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Скрипт переноса тегов из JSON-колонки content.tags и строки portfolio_items.tags
+в нормализованные таблицы tags / content_tags / portfolio_tags.
+Повторный запуск безопасен: связи перезаписываются, счётчики пересчитываются с нуля.
+"""
+
+import asyncio
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, Base, engine
+from src.infrastructure.repositiry.db_models import ContentORM, PortfolioItemORM
+from src.infrastructure.services.content_service import ContentService
+from src.infrastructure.services.tag_service import TagService
+
+BATCH_SIZE = 500
+
+
+async def backfill_content(session) -> int:
+    tags = TagService(session)
+    processed = 0
+    last_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(ContentORM.id, ContentORM.tags)
+                .where(ContentORM.id > last_id)
+                .order_by(ContentORM.id)
+                .limit(BATCH_SIZE)
+            )
+        ).all()
+        if not rows:
+            return processed
+        for content_id, raw in rows:
+            # Счётчики пересчитываются в конце одним запросом
+            await tags.set_content_tags(
+                content_id, ContentService._load_tags(raw), was_published=False, is_published=False
+            )
+        await session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+        print(f"Контент: обработано {processed}")
+
+
+async def backfill_portfolio(session) -> int:
+    tags = TagService(session)
+    processed = 0
+    last_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(PortfolioItemORM.id, PortfolioItemORM.tags)
+                .where(PortfolioItemORM.id > last_id)
+                .order_by(PortfolioItemORM.id)
+                .limit(BATCH_SIZE)
+            )
+        ).all()
+        if not rows:
+            return processed
+        for item_id, raw in rows:
+            await tags.set_portfolio_tags(item_id, raw)
+        await session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+        print(f"Портфолио: обработано {processed}")
+
+
+async def backfill_tags():
+    """Бэкфилл индекса тегов"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        content_count = await backfill_content(session)
+        portfolio_count = await backfill_portfolio(session)
+        await TagService(session).rebuild_counts()
+        await session.commit()
+
+    await engine.dispose()
+    print(f"Готово: материалов {content_count}, работ портфолио {portfolio_count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_tags())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Сравнение фильтра сообщений на автомате Ахо–Корасик с прежним вариантом
+(одна регулярка-альтернация с \\b, finditer + sub) на словарях 10 / 1k / 10k терминов.
+"""
+
+import random
+import re
+import sys
+import os
+import time
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infrastructure.security.content_filter import ContentFilter
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+MESSAGES = 2000
+
+
+class RegexFilter:
+    """Прежняя реализация для сравнения."""
+
+    def __init__(self, terms):
+        terms = sorted(set(terms), key=len, reverse=True)
+        escaped = [re.escape(term) for term in terms]
+        self._pattern = re.compile(rf"\b({'|'.join(escaped)})\b", re.IGNORECASE)
+
+    def evaluate(self, text):
+        if not list(self._pattern.finditer(text)):
+            return text
+        return self._pattern.sub(lambda match: "*" * len(match.group(0)), text)
+
+
+def make_word(rng, low=3, high=9):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+
+def make_messages(rng, terms, count):
+    messages = []
+    for _ in range(count):
+        words = [make_word(rng) for _ in range(rng.randint(5, 30))]
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms))
+        messages.append(" ".join(words))
+    return messages
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def run(size, rng):
+    terms = list({make_word(rng, 4, 10) for _ in range(size)})
+    messages = make_messages(rng, terms, MESSAGES)
+
+    regex_build = timed(lambda: RegexFilter(terms))
+    automaton_build = timed(lambda: ContentFilter(terms))
+    regex_filter = RegexFilter(terms)
+    automaton_filter = ContentFilter(terms)
+
+    regex_time = timed(lambda: [regex_filter.evaluate(text) for text in messages])
+    automaton_time = timed(lambda: [automaton_filter.evaluate(text) for text in messages])
+    batch_time = timed(lambda: automaton_filter.evaluate_many(messages))
+
+    per_message = lambda seconds: seconds / len(messages) * 1e6
+    print(
+        f"{len(terms):>6} | build regex {regex_build * 1000:8.1f} ms, automaton {automaton_build * 1000:8.1f} ms"
+        f" | regex {per_message(regex_time):8.1f} us/msg"
+        f" | automaton {per_message(automaton_time):8.1f} us/msg"
+        f" | evaluate_many {per_message(batch_time):8.1f} us/msg"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{MESSAGES} сообщений на прогон")
+    for size in (10, 1_000, 10_000):
+        run(size, rng)
+
+
+if __name__ == "__main__":
+    main()
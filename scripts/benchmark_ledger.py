@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Параллельные списания с одного баланса: журнал (BalanceLedger.debit, условный
+UPDATE) против старой схемы "прочитать баланс — записать новое значение".
+
+N списаний запускаются одновременно, каждое в своей сессии. Для журнала
+проверяется, что итоговый баланс = начальный − успешные × сумма, баланс не
+ушёл в минус и сумма проводок совпадает с проекцией. По умолчанию база —
+временная SQLite; MySQL можно передать через BENCH_DATABASE_URL.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.infrastructure.repositiry.base_repository import Base
+from src.infrastructure.repositiry.db_models import CurrencyTypeEnum, UserORM
+from src.infrastructure.services.balance_service import BalanceLedger, InsufficientFundsError, to_minor
+
+DEBITS = 1000
+AMOUNT = 1.0
+# Денег хватает ровно на половину списаний
+START_BALANCE = DEBITS * AMOUNT / 2
+CURRENCY = CurrencyTypeEnum.RUB
+
+
+async def create_user(session_factory, nickname):
+    async with session_factory() as session:
+        user = UserORM(name=nickname, nickname=nickname, email=f"{nickname}@bench.local", hashed_password="-")
+        session.add(user)
+        await session.flush()
+        await BalanceLedger(session).credit(user.id, CURRENCY, START_BALANCE, kind="topup")
+        await session.commit()
+        return user.id
+
+
+async def read_balance(session_factory, user_id):
+    async with session_factory() as session:
+        return await session.scalar(select(UserORM.rub_balance).where(UserORM.id == user_id))
+
+
+async def run_ledger(session_factory, user_id):
+    outcomes = {"ok": 0, "insufficient": 0, "error": 0}
+
+    async def debit(index):
+        async with session_factory() as session:
+            try:
+                await BalanceLedger(session).debit(user_id, CURRENCY, AMOUNT, kind="bench", reference=f"bench:{index}")
+                await session.commit()
+                outcomes["ok"] += 1
+            except InsufficientFundsError:
+                await session.rollback()
+                outcomes["insufficient"] += 1
+            except OperationalError:
+                await session.rollback()
+                outcomes["error"] += 1
+
+    await asyncio.gather(*(debit(index) for index in range(DEBITS)))
+    return outcomes
+
+
+async def run_naive(session_factory, user_id):
+    outcomes = {"ok": 0, "insufficient": 0, "error": 0}
+
+    async def debit(index):
+        async with session_factory() as session:
+            try:
+                user = await session.get(UserORM, user_id)
+                if user.rub_balance < AMOUNT:
+                    outcomes["insufficient"] += 1
+                    return
+                # Точка переключения между чтением и записью, как у await в обработчике
+                await asyncio.sleep(0)
+                user.rub_balance = user.rub_balance - AMOUNT
+                await session.commit()
+                outcomes["ok"] += 1
+            except OperationalError:
+                await session.rollback()
+                outcomes["error"] += 1
+
+    await asyncio.gather(*(debit(index) for index in range(DEBITS)))
+    return outcomes
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        url = os.getenv("BENCH_DATABASE_URL", f"sqlite+aiosqlite:///{directory}/bench.db")
+        kwargs = {"pool_size": 20, "max_overflow": 0, "pool_timeout": 300}
+        if url.startswith("sqlite"):
+            kwargs["connect_args"] = {"timeout": 60}
+        engine = create_async_engine(url, **kwargs)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        suffix = int(time.time())
+        print(f"{DEBITS} параллельных списаний по {AMOUNT:.2f}, начальный баланс {START_BALANCE:.2f}")
+
+        user_id = await create_user(session_factory, f"bench_ledger_{suffix}")
+        started = time.perf_counter()
+        outcomes = await run_ledger(session_factory, user_id)
+        elapsed = time.perf_counter() - started
+        balance = await read_balance(session_factory, user_id)
+        async with session_factory() as session:
+            ledger_total = (await BalanceLedger(session).ledger_totals([user_id])).get((user_id, CURRENCY), 0)
+        expected = START_BALANCE - outcomes["ok"] * AMOUNT
+        print(
+            f"журнал      | {elapsed:6.2f}s | успешно {outcomes['ok']}, отказ {outcomes['insufficient']}, "
+            f"ошибок {outcomes['error']} | баланс {balance:.2f} (ожидается {expected:.2f}), "
+            f"журнал {ledger_total / 100:.2f}"
+        )
+        assert to_minor(balance) == to_minor(expected), "потеряны списания"
+        assert balance >= 0, "баланс ушёл в минус"
+        assert ledger_total == to_minor(balance), "журнал расходится с проекцией"
+        if not outcomes["error"]:
+            assert outcomes["ok"] == int(START_BALANCE / AMOUNT), "списано не всё, на что хватало средств"
+
+        user_id = await create_user(session_factory, f"bench_naive_{suffix}")
+        started = time.perf_counter()
+        outcomes = await run_naive(session_factory, user_id)
+        elapsed = time.perf_counter() - started
+        balance = await read_balance(session_factory, user_id)
+        lost = round((balance - (START_BALANCE - outcomes["ok"] * AMOUNT)) / AMOUNT)
+        print(
+            f"чтение+запись | {elapsed:6.2f}s | успешно {outcomes['ok']}, отказ {outcomes['insufficient']}, "
+            f"ошибок {outcomes['error']} | баланс {balance:.2f}, потеряно списаний {lost}"
+        )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность записи сообщений: по одному сообщению на транзакцию
+(MessageRepository.add_message) против пакетной записи MessageWriteBatcher
+при N одновременных отправителях. Используется временная база SQLite.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.domain.entity.messageentity import Message
+from src.infrastructure.repositiry.base_repository import Base
+from src.infrastructure.repositiry.message_repository import MessageRepository
+from src.infrastructure.repositiry.message_writer import MessageWriteBatcher
+
+MESSAGES = 2000
+CHATS = 50
+
+
+def make_message(index):
+    return Message(chat_id=index % CHATS + 1, sender_id=index % 7 + 1, content=f"сообщение {index}")
+
+
+async def run_single(session_factory, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(index):
+        async with semaphore:
+            async with session_factory() as session:
+                await MessageRepository(session).add_message(make_message(index))
+
+    await asyncio.gather(*(send(index) for index in range(MESSAGES)))
+
+
+async def run_batched(session_factory, concurrency, max_batch, max_latency):
+    writer = MessageWriteBatcher(max_batch=max_batch, max_latency=max_latency, session_factory=session_factory)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(index):
+        async with semaphore:
+            await writer.submit(make_message(index), (index % 5 + 100,))
+
+    await asyncio.gather(*(send(index) for index in range(MESSAGES)))
+    await writer.flush()
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        print(f"{MESSAGES} сообщений на прогон")
+        for concurrency in (1, 20, 200):
+            single = await timed(run_single(session_factory, concurrency))
+            line = f"{concurrency:>4} отправителей | по одному {MESSAGES / single:8.0f} msg/s"
+            for max_batch, max_latency in ((50, 0.002), (200, 0.005)):
+                batched = await timed(run_batched(session_factory, concurrency, max_batch, max_latency))
+                line += f" | batch={max_batch}/{max_latency * 1000:.0f}ms {MESSAGES / batched:8.0f} msg/s"
+            print(line)
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
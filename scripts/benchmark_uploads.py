@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Параллельные загрузки файлов по 10 МБ: старый обработчик (UploadFile +
+shutil.copyfileobj в цикле событий) против потокового приёма receive_upload.
+Кроме пропускной способности считается максимальная задержка цикла событий —
+насколько загрузки мешают остальным запросам воркера. Запросы идут через
+ASGI-транспорт httpx в том же процессе, файлы пишутся во временный каталог.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, File, Request, UploadFile
+
+from src.infrastructure.services.upload_service import UploadSink, receive_upload
+
+FILE_SIZE = 10 * 1024 * 1024
+UPLOADS = 40
+# Заголовок PNG, чтобы файл прошёл проверку типа
+PAYLOAD = b"\x89PNG\r\n\x1a\n" + os.urandom(FILE_SIZE - 8)
+
+
+def build_app(directory):
+    app = FastAPI()
+
+    @app.post("/legacy")
+    async def legacy(file: UploadFile = File(...)):
+        destination = os.path.join(directory, f"{uuid.uuid4().hex}.png")
+        with open(destination, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        return {"ok": True}
+
+    @app.post("/stream")
+    async def stream(request: Request):
+        stored = await receive_upload(request, sink=UploadSink(directory, max_size=FILE_SIZE))
+        return {"ok": stored.size == FILE_SIZE}
+
+    return app
+
+
+async def measure_lag(stop):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - started - 0.005)
+    return worst
+
+
+async def run(client, path, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(index):
+        async with semaphore:
+            response = await client.post(path, files={"file": (f"{index}.png", PAYLOAD, "image/png")})
+            response.raise_for_status()
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(index) for index in range(UPLOADS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag_task
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        app = build_app(directory)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"{UPLOADS} загрузок по {FILE_SIZE // (1024 * 1024)} МБ")
+            for concurrency in (1, 10, 40):
+                line = f"{concurrency:>3} параллельно"
+                for path in ("/legacy", "/stream"):
+                    elapsed, lag = await run(client, path, concurrency)
+                    throughput = UPLOADS * FILE_SIZE / elapsed / (1024 * 1024)
+                    line += f" | {path[1:]:>6} {throughput:7.1f} МБ/с, задержка цикла до {lag * 1000:6.1f} мс"
+                print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Сравнение кадров WebSocket: JSON с полными ключами против MessagePack с короткими
+ключами и временем в миллисекундах эпохи. Размеры приводятся без сжатия и после
+permessage-deflate (raw deflate, как в расширении), время — на кодирование кадра.
+Отдельно — полный список чатов против дельты chat_updated.
+"""
+
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.presentation.api.v1.websocket_protocol import json_codec, msgpack_codec
+
+ITERATIONS = 5000
+CHATS = 40
+
+
+def make_message(rng, index):
+    return {
+        "id": 100_000 + index,
+        "text": " ".join(rng.choice(["привет", "заказ", "готово", "сроки", "ок", "спасибо"]) for _ in range(rng.randint(2, 12))),
+        "sender_id": rng.randint(1, 5000),
+        "sender_name": "Алексей Смирнов",
+        "sender_nickname": "alex_smirnov",
+        "created_at": (datetime(2026, 1, 1) + timedelta(seconds=index * 37)).isoformat(),
+        "type": "text",
+        "order_id": None,
+        "offer_price": None,
+    }
+
+
+def make_chat(rng, index):
+    return {
+        "id": index + 1,
+        "customer_id": rng.randint(1, 5000),
+        "executor_id": rng.randint(1, 5000),
+        "customer_name": "Мария Иванова",
+        "customer_nickname": "maria_iv",
+        "executor_name": "Алексей Смирнов",
+        "executor_nickname": "alex_smirnov",
+        "created_at": datetime(2025, 12, 1).isoformat(),
+        "last_message": make_message(rng, index),
+    }
+
+
+def deflated_size(payload):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return len(compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+
+def encode_time(codec, frame):
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        codec.encode(frame)
+    return (time.perf_counter() - started) / ITERATIONS * 1e6
+
+
+def report(title, frame):
+    print(title)
+    for name, codec in (("json", json_codec), ("msgpack", msgpack_codec)):
+        if codec is None:
+            print(f"  {name:<8} недоступен (pip install msgpack)")
+            continue
+        payload = codec.encode(frame)
+        size = len(payload.encode("utf-8") if isinstance(payload, str) else payload)
+        print(
+            f"  {name:<8} {size:>7} B | deflate {deflated_size(payload):>6} B"
+            f" | encode {encode_time(codec, frame):7.1f} us"
+        )
+
+
+def main():
+    rng = random.Random(7)
+    message = make_message(rng, 1)
+    chats = [make_chat(rng, index) for index in range(CHATS)]
+
+    report("new_message", {"type": "new_message", "chat_id": 1, "message": message})
+    report(f"chats_list ({CHATS} чатов)", {"type": "chats_list", "chats": chats})
+    report("chat_updated (дельта)", {
+        "type": "chat_updated",
+        "chat": {"id": 1, "customer_id": 10, "executor_id": 20, "last_message": message},
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Миграция чатов на канонический ключ пары (user_low, user_high).
+
+1. Добавляет и заполняет user_low / user_high у старых строк.
+2. Склеивает дубликаты: остаётся чат с минимальным id, сообщения остальных
+   переносятся в него, лишние чаты удаляются.
+3. Создаёт уникальный индекс uq_chats_pair, если его ещё нет.
+
+Повторный запуск безопасен. Запускать до первого старта приложения с новой схемой
+на существующей базе (на новой базе индекс создаёт create_all).
+"""
+
+import asyncio
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import case, delete, func, inspect, select, text, update
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, Base, engine
+from src.infrastructure.repositiry.db_models import ChatORM, MessageORM
+
+PAIR_INDEX = "uq_chats_pair"
+PAIR_COLUMNS = ("user_low", "user_high")
+
+
+async def ensure_pair_columns() -> None:
+    async with engine.begin() as conn:
+        columns = await conn.run_sync(
+            lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns("chats")}
+        )
+        for column in PAIR_COLUMNS:
+            if column not in columns:
+                await conn.execute(text(f"ALTER TABLE chats ADD COLUMN {column} INTEGER NULL"))
+
+
+async def backfill_pairs(session) -> int:
+    result = await session.execute(
+        update(ChatORM)
+        .where(ChatORM.user_low.is_(None))
+        .values(
+            user_low=case(
+                (ChatORM.customer_id <= ChatORM.executor_id, ChatORM.customer_id),
+                else_=ChatORM.executor_id,
+            ),
+            user_high=case(
+                (ChatORM.customer_id <= ChatORM.executor_id, ChatORM.executor_id),
+                else_=ChatORM.customer_id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def merge_duplicates(session) -> int:
+    groups = (
+        await session.execute(
+            select(ChatORM.user_low, ChatORM.user_high, func.min(ChatORM.id))
+            .group_by(ChatORM.user_low, ChatORM.user_high)
+            .having(func.count(ChatORM.id) > 1)
+        )
+    ).all()
+
+    removed = 0
+    for user_low, user_high, keeper_id in groups:
+        duplicate_ids = (
+            await session.execute(
+                select(ChatORM.id).where(
+                    ChatORM.user_low == user_low,
+                    ChatORM.user_high == user_high,
+                    ChatORM.id != keeper_id,
+                )
+            )
+        ).scalars().all()
+        await session.execute(
+            update(MessageORM)
+            .where(MessageORM.chat_id.in_(duplicate_ids))
+            .values(chat_id=keeper_id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            delete(ChatORM)
+            .where(ChatORM.id.in_(duplicate_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        removed += len(duplicate_ids)
+    return removed
+
+
+async def ensure_pair_index() -> bool:
+    async with engine.begin() as conn:
+        def _existing(sync_conn):
+            inspector = inspect(sync_conn)
+            names = {index["name"] for index in inspector.get_indexes("chats")}
+            names |= {constraint["name"] for constraint in inspector.get_unique_constraints("chats")}
+            return names
+
+        if PAIR_INDEX in await conn.run_sync(_existing):
+            return False
+        await conn.execute(text(f"CREATE UNIQUE INDEX {PAIR_INDEX} ON chats (user_low, user_high)"))
+        return True
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await ensure_pair_columns()
+
+    async with AsyncSessionLocal() as session:
+        filled = await backfill_pairs(session)
+        removed = await merge_duplicates(session)
+    created = await ensure_pair_index()
+    await engine.dispose()
+
+    print(f"Заполнено пар: {filled}")
+    print(f"Удалено дубликатов чатов: {removed}")
+    print("Индекс uq_chats_pair " + ("создан" if created else "уже существует"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
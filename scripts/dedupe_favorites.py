@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Уникальный индекс избранного (user_id, order_id).
+
+1. Удаляет повторные строки favorite_orders: для каждой пары остаётся запись
+   с минимальным id.
+2. Создаёт уникальный индекс uq_favorite_orders_user_order, если его ещё нет.
+
+Повторный запуск безопасен. Запускать на существующей базе до первого старта
+приложения с новой схемой: при старте приложение само создаёт индекс и не
+запустится, пока в таблице остаются повторы.
+"""
+
+import asyncio
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, inspect, select, text
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, Base, engine
+from src.infrastructure.repositiry.db_models import FavoriteOrderORM
+
+PAIR_INDEX = "uq_favorite_orders_user_order"
+
+
+async def remove_duplicates(session) -> int:
+    keepers = (
+        select(func.min(FavoriteOrderORM.id))
+        .group_by(FavoriteOrderORM.user_id, FavoriteOrderORM.order_id)
+        .scalar_subquery()
+    )
+    # MySQL не разрешает подзапрос к изменяемой таблице напрямую — сначала читаем id
+    duplicate_ids = (
+        await session.execute(select(FavoriteOrderORM.id).where(FavoriteOrderORM.id.notin_(keepers)))
+    ).scalars().all()
+    for start in range(0, len(duplicate_ids), 1000):
+        await session.execute(
+            delete(FavoriteOrderORM)
+            .where(FavoriteOrderORM.id.in_(duplicate_ids[start:start + 1000]))
+            .execution_options(synchronize_session=False)
+        )
+    await session.commit()
+    return len(duplicate_ids)
+
+
+async def ensure_pair_index() -> bool:
+    async with engine.begin() as conn:
+        def _existing(sync_conn):
+            inspector = inspect(sync_conn)
+            names = {index["name"] for index in inspector.get_indexes("favorite_orders")}
+            names |= {constraint["name"] for constraint in inspector.get_unique_constraints("favorite_orders")}
+            return names
+
+        if PAIR_INDEX in await conn.run_sync(_existing):
+            return False
+        await conn.execute(text(f"CREATE UNIQUE INDEX {PAIR_INDEX} ON favorite_orders (user_id, order_id)"))
+        return True
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        removed = await remove_duplicates(session)
+    created = await ensure_pair_index()
+    await engine.dispose()
+
+    print(f"Удалено повторов избранного: {removed}")
+    print(f"Индекс {PAIR_INDEX} " + ("создан" if created else "уже существует"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Перенос старых загрузок (assets/uploads/<uuid>.<ext>) в хранилище по хэшу.
+
+1. Каждый файл из корня каталога загрузок хэшируется и переносится в
+   <sha[:2]>/<sha256><ext>; одинаковые файлы сливаются в один.
+2. Ссылки media_url/attachment_url в портфолио переписываются на новые URL.
+3. Счётчики ссылок upload_blobs пересчитываются по портфолио целиком.
+
+Повторный запуск безопасен: уже перенесённые файлы не трогаются, пересчёт
+приводит счётчики к фактическому числу ссылок.
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select, update
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, Base, engine
+from src.infrastructure.repositiry.db_models import PortfolioItemORM, UploadBlobORM
+from src.infrastructure.services.blob_store import blob_name, blob_url, digest_from_url
+from src.infrastructure.services.upload_service import UPLOAD_DIR, UPLOAD_URL_PREFIX, sniff_content_type
+
+CHUNK = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        head = source.read(CHUNK)
+        content_type = sniff_content_type(head)
+        while head:
+            digest.update(head)
+            head = source.read(CHUNK)
+    return digest.hexdigest(), content_type
+
+
+def move_legacy_files():
+    """Перенести файлы; возвращает {старый URL: (sha256, name, size, content_type)}."""
+    moved = {}
+    if not os.path.isdir(UPLOAD_DIR):
+        return moved
+    for entry in os.scandir(UPLOAD_DIR):
+        if not entry.is_file():
+            continue
+        sha256, content_type = hash_file(entry.path)
+        extension = os.path.splitext(entry.name)[1].lower()
+        name = blob_name(sha256, extension)
+        destination = os.path.join(UPLOAD_DIR, *name.split("/"))
+        size = entry.stat().st_size
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.exists(destination):
+            os.unlink(entry.path)
+        else:
+            os.replace(entry.path, destination)
+        moved[f"{UPLOAD_URL_PREFIX}/{entry.name}"] = (
+            sha256,
+            name,
+            size,
+            content_type or "application/octet-stream",
+        )
+    return moved
+
+
+async def register_blobs(session, moved) -> int:
+    known = set((await session.execute(select(UploadBlobORM.sha256))).scalars().all())
+    rows = {}
+    for sha256, name, size, content_type in moved.values():
+        if sha256 not in known:
+            rows[sha256] = {
+                "sha256": sha256,
+                "name": name,
+                "size": size,
+                "content_type": content_type,
+                "ref_count": 0,
+                "orphaned_at": datetime.utcnow(),
+            }
+    if rows:
+        await session.execute(insert(UploadBlobORM), list(rows.values()))
+    await session.commit()
+    return len(rows)
+
+
+async def rewrite_urls(session, moved) -> int:
+    rewritten = 0
+    for column in (PortfolioItemORM.media_url, PortfolioItemORM.attachment_url):
+        for old_url, (_, name, _, _) in moved.items():
+            result = await session.execute(
+                update(PortfolioItemORM)
+                .where(column == old_url)
+                .values({column: blob_url(name)})
+                .execution_options(synchronize_session=False)
+            )
+            rewritten += result.rowcount or 0
+    await session.commit()
+    return rewritten
+
+
+async def recount(session) -> int:
+    rows = (await session.execute(select(PortfolioItemORM.media_url, PortfolioItemORM.attachment_url))).all()
+    counts = Counter(digest for row in rows for digest in map(digest_from_url, row) if digest)
+
+    now = datetime.utcnow()
+    blobs = (await session.execute(select(UploadBlobORM.sha256, UploadBlobORM.ref_count))).all()
+    changed = 0
+    for sha256, ref_count in blobs:
+        actual = counts.get(sha256, 0)
+        if actual != ref_count:
+            await session.execute(
+                update(UploadBlobORM)
+                .where(UploadBlobORM.sha256 == sha256)
+                .values(ref_count=actual, orphaned_at=None if actual else now)
+            )
+            changed += 1
+    await session.commit()
+    return changed
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    moved = await asyncio.to_thread(move_legacy_files)
+    async with AsyncSessionLocal() as session:
+        registered = await register_blobs(session, moved)
+        rewritten = await rewrite_urls(session, moved)
+        recounted = await recount(session)
+    await engine.dispose()
+
+    print(f"Перенесено файлов: {len(moved)} (новых в хранилище: {registered})")
+    print(f"Переписано ссылок в портфолио: {rewritten}")
+    print(f"Исправлено счётчиков ссылок: {recounted}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
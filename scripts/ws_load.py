@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный генератор WebSocket: открывает N соединений (по умолчанию 10 000)
+к локальному серверу, держит их открытыми и гоняет ping.
+
+Токены выпускаются локально тем же секретом, что и у сервера (settings.secret_key),
+поэтому пользователи в БД не нужны. Перед запуском поднимите лимит дескрипторов:
+    ulimit -n 65536
+Пример:
+    python scripts/ws_load.py --url ws://127.0.0.1:8000/api/v1/ws/chat --connections 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+from jose import jwt
+
+from src.config import settings
+from src.infrastructure.services.auth_service import ALGORITHM
+
+
+def make_token(user_id):
+    payload = {"sub": str(user_id), "type": "access", "exp": datetime.utcnow() + timedelta(hours=1)}
+    return jwt.encode(payload, settings.secret_key, algorithm=ALGORITHM)
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.pongs = 0
+        self.rtt_total = 0.0
+
+
+async def client(url, user_id, stats, duration, ping_interval, ready):
+    try:
+        async with websockets.connect(f"{url}?token={make_token(user_id)}", ping_interval=None) as ws:
+            await ws.recv()  # connection_established
+            stats.connected += 1
+            await ready.wait()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                await ws.send(json.dumps({"type": "ping"}))
+                while json.loads(await ws.recv()).get("type") != "pong":
+                    pass
+                stats.pongs += 1
+                stats.rtt_total += time.perf_counter() - started
+                await asyncio.sleep(ping_interval)
+    except Exception:  # noqa: BLE001
+        stats.failed += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/api/v1/ws/chat")
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=2_000, help="сколько разных user_id (несколько вкладок на пользователя)")
+    parser.add_argument("--ramp", type=int, default=500, help="соединений, открываемых за раз")
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд держать соединения")
+    parser.add_argument("--ping-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    stats = Stats()
+    ready = asyncio.Event()
+    tasks = []
+    started = time.perf_counter()
+    for index in range(args.connections):
+        user_id = index % args.users + 1
+        tasks.append(asyncio.create_task(
+            client(args.url, user_id, stats, args.duration, args.ping_interval, ready)
+        ))
+        if (index + 1) % args.ramp == 0:
+            await asyncio.sleep(0.1)
+            print(f"открыто {stats.connected}, ошибок {stats.failed}")
+
+    while stats.connected + stats.failed < args.connections:
+        await asyncio.sleep(0.2)
+    print(f"подключено {stats.connected} за {time.perf_counter() - started:.1f} с, ошибок {stats.failed}")
+
+    ready.set()
+    await asyncio.gather(*tasks)
+    average = stats.rtt_total / stats.pongs * 1000 if stats.pongs else 0.0
+    print(f"ping/pong: {stats.pongs}, средний RTT {average:.1f} мс, ошибок {stats.failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -60,7 +60,64 @@ class Settings(BaseSettings):
     # File Upload
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_file_types: list = ["image/jpeg", "image/png", "image/gif", "application/pdf"]
-    
+    upload_write_buffer: int = 1024 * 1024  # bytes per write in the thread pool
+    upload_gc_interval: float = 3600.0  # seconds
+    upload_gc_batch_size: int = 200
+    upload_gc_grace: float = 24 * 3600.0  # seconds before an unreferenced file is removed
+
+    # Изображения портфолио
+    image_variant_widths: List[int] = [320, 640, 1280]
+    image_variant_formats: List[str] = ["webp", "jpeg"]
+    image_workers: int = 2
+    image_quality: int = 80
+
+    # Контент
+    content_views_flush_interval: float = 5.0  # seconds
+    content_views_flush_batch: int = 500
+    content_cache_ttl: int = 60  # seconds
+    content_cache_warm_pages: int = 2
+
+    # Чаты
+    chat_membership_cache_size: int = 50_000
+    message_batching_enabled: bool = True
+    message_batch_max_size: int = 100
+    message_batch_max_latency: float = 0.005  # seconds
+
+    # WebSocket
+    ws_heartbeat_interval: float = 25.0  # seconds
+    ws_heartbeat_max_missed: int = 2
+    ws_send_timeout: float = 5.0  # seconds
+    # Ping/pong протокола WebSocket для клиентов без прикладного heartbeat
+    ws_ping_interval: float = 20.0  # seconds
+    ws_ping_timeout: float = 20.0  # seconds
+    ws_max_connections_per_user: int = 10
+    ws_max_connections_per_worker: int = 20_000
+    ws_outbox_ttl: int = 72 * 3600  # seconds
+    ws_outbox_replay_limit: int = 500
+    ws_outbox_purge_interval: float = 600.0  # seconds
+
+    # Избранное
+    favorites_cache_size: int = 10_000  # users
+    favorites_cache_max_ids: int = 1000
+
+    # Комиссии
+    commission_cache_ttl: float = 300.0  # seconds
+
+    # Админская статистика
+    stats_refresh_interval: float = 10.0  # seconds
+    stats_reconcile_interval: float = 3600.0  # seconds
+    stats_day_buckets: int = 30
+
+    # Админская выгрузка и SQL-консоль
+    admin_export_batch_size: int = 1000
+    admin_sql_max_rows: int = 1000
+    admin_sql_stream_max_rows: int = 1_000_000
+    admin_sql_timeout: float = 30.0  # seconds
+
+    # Модерация
+    moderation_reload_interval: float = 60.0  # seconds
+    moderation_snapshot_dir: str = "./.cache/moderation"
+
     # Email
     smtp_host: Optional[str] = None
     smtp_port: int = 587
@@ -13,6 +13,13 @@ class Chat(BaseModel):
     messages: list[MessageEntity] = Field(default_factory=list)
 
 
+class ChatReadState(BaseModel):
+    chat_id: int
+    user_id: int
+    last_read_message_id: int = 0
+    unread_count: int = 0
+
+
 class Message(MessageEntity):
     """Backward-compatible re-export in chatentity module."""
     is_deleted: bool = False
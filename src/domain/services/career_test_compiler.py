@@ -0,0 +1,137 @@
+"""Скомпилированные профориентационные тесты.
+
+JSON ``CareerTestORM.questions`` разбирается один раз на версию теста
+(id + updated_at) в неизменяемую структуру со словарём ``value -> вариант``
+для каждого вопроса. Подсчёт результата идёт без повторного ``json.loads``
+и без линейного поиска по вариантам.
+"""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from src.infrastructure.repositiry.db_models import CareerTestORM
+
+DEFAULT_PROFILE = "generalist"
+
+
+@dataclass(frozen=True)
+class CompiledOption:
+    score: int
+    profile: Optional[str]
+    recommendations: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ScoreResult:
+    score: int
+    profile: str
+    recommendations: List[str]
+
+
+@dataclass(frozen=True)
+class CompiledTest:
+    test_id: int
+    version: Optional[datetime]
+    # (question_id, value -> вариант) в порядке вопросов теста
+    questions: Tuple[Tuple[str, Mapping[Any, CompiledOption]], ...]
+    # Разобранный JSON для выдачи клиенту; только для чтения
+    payload: List[Dict[str, Any]]
+
+    @classmethod
+    def compile(cls, test: CareerTestORM) -> "CompiledTest":
+        payload = json.loads(test.questions)
+        questions = []
+        for question in payload:
+            qid = question.get("id")
+            if not qid:
+                continue
+            options: Dict[Any, CompiledOption] = {}
+            for option in question.get("options", []):
+                value = option.get("value")
+                try:
+                    # Первый вариант с таким значением выигрывает, как и при линейном поиске
+                    options.setdefault(
+                        value,
+                        CompiledOption(
+                            score=int(option.get("score", 0)),
+                            profile=option.get("profile"),
+                            recommendations=tuple(option.get("recommendations", [])),
+                        ),
+                    )
+                except TypeError:
+                    continue  # нехешируемое значение не может совпасть с ответом-строкой
+            questions.append((qid, MappingProxyType(options)))
+        return cls(
+            test_id=test.id,
+            version=version_of(test),
+            questions=tuple(questions),
+            payload=payload,
+        )
+
+    def score(self, answers: Mapping[str, Any]) -> ScoreResult:
+        score = 0
+        profile = DEFAULT_PROFILE
+        recommendations: List[str] = []
+        for qid, options in self.questions:
+            try:
+                option = options.get(answers.get(qid))
+            except TypeError:
+                option = None
+            if option is None:
+                continue
+            score += option.score
+            recommendations.extend(option.recommendations)
+            if option.profile is not None:
+                profile = option.profile
+        return ScoreResult(score=score, profile=profile, recommendations=recommendations)
+
+    def score_many(self, answer_sets: Iterable[Mapping[str, Any]]) -> List[ScoreResult]:
+        """Посчитать пачку наборов ответов за один проход."""
+        score = self.score
+        return [score(answers) for answers in answer_sets]
+
+
+def version_of(test: CareerTestORM) -> Optional[datetime]:
+    return getattr(test, "updated_at", None) or test.created_at
+
+
+class CompiledTestCache:
+    """LRU скомпилированных тестов; запись устаревает при смене updated_at."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._items: "OrderedDict[int, CompiledTest]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, test: CareerTestORM) -> CompiledTest:
+        version = version_of(test)
+        with self._lock:
+            compiled = self._items.get(test.id)
+            if compiled is not None and compiled.version == version:
+                self._items.move_to_end(test.id)
+                return compiled
+
+        compiled = CompiledTest.compile(test)
+        with self._lock:
+            self._items[test.id] = compiled
+            self._items.move_to_end(test.id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return compiled
+
+    def invalidate(self, test_id: Optional[int] = None) -> None:
+        with self._lock:
+            if test_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(test_id, None)
+
+
+# Глобальный кэш скомпилированных тестов (на воркер)
+compiled_tests = CompiledTestCache()
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import json
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.domain.services.career_test_compiler import CompiledTest, ScoreResult, compiled_tests
 from src.infrastructure.repositiry.db_models import CareerResultORM, CareerTestORM, UserORM
 
 
@@ -49,41 +50,95 @@ class CareerTestService:
         if not user:
             raise ValueError("User not found")
 
-        questions = json.loads(test.questions)
-        score = 0
-        matched_profile = "generalist"
-        recommendations: List[str] = []
-
-        for question in questions:
-            qid = question.get("id")
-            if not qid:
-                continue
-            answer = answers.get(qid)
-            options = question.get("options", [])
-            matched_option = next((opt for opt in options if opt.get("value") == answer), None)
-            if matched_option:
-                score += int(matched_option.get("score", 0))
-                recommendations.extend(matched_option.get("recommendations", []))
-                matched_profile = matched_option.get("profile", matched_profile)
+        scored = compiled_tests.get(test).score(answers)
 
         result = CareerResultORM(
             user_id=user_id,
             test_id=test_id,
-            score=score,
-            profile=matched_profile,
-            recommendations=json.dumps(recommendations),
+            score=scored.score,
+            profile=scored.profile,
+            recommendations=json.dumps(scored.recommendations),
+            # Ответы сохраняются для пересчёта результатов после правки теста
+            answers=json.dumps(answers),
         )
         self.session.add(result)
         await self.session.commit()
         await self.session.refresh(result)
 
         return {
-            "profile": matched_profile,
-            "score": score,
-            "recommendations": recommendations,
+            "profile": scored.profile,
+            "score": scored.score,
+            "recommendations": scored.recommendations,
             "result_id": result.id,
         }
 
+    async def score_many(self, test_id: int, answer_sets: Iterable[Mapping[str, Any]]) -> List[ScoreResult]:
+        """Посчитать результаты для набора ответов без сохранения."""
+        return (await self._compiled(test_id)).score_many(answer_sets)
+
+    async def rescore_results(self, test_id: int, *, batch_size: int = 1000) -> int:
+        """Пересчитать сохранённые результаты теста (например, после его правки).
+
+        Результаты читаются пачками по id, считаются одним проходом по пачке и
+        записываются bulk UPDATE по первичному ключу. Возвращает число
+        пересчитанных результатов; записи без сохранённых ответов пропускаются.
+        """
+        compiled = await self._compiled(test_id)
+        rescored = 0
+        last_id = 0
+        while True:
+            rows = (
+                await self.session.execute(
+                    select(CareerResultORM.id, CareerResultORM.answers)
+                    .where(
+                        CareerResultORM.test_id == test_id,
+                        CareerResultORM.answers.is_not(None),
+                        CareerResultORM.id > last_id,
+                    )
+                    .order_by(CareerResultORM.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            ids = []
+            answer_sets = []
+            for result_id, raw in rows:
+                try:
+                    answers = json.loads(raw)
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(answers, dict):
+                    ids.append(result_id)
+                    answer_sets.append(answers)
+            if not ids:
+                continue
+
+            scored = compiled.score_many(answer_sets)
+            await self.session.execute(
+                update(CareerResultORM),
+                [
+                    {
+                        "id": result_id,
+                        "score": item.score,
+                        "profile": item.profile,
+                        "recommendations": json.dumps(item.recommendations),
+                    }
+                    for result_id, item in zip(ids, scored)
+                ],
+            )
+            await self.session.commit()
+            rescored += len(ids)
+        return rescored
+
+    async def _compiled(self, test_id: int) -> CompiledTest:
+        test = await self.session.get(CareerTestORM, test_id)
+        if not test:
+            raise ValueError("Test not found")
+        return compiled_tests.get(test)
+
     async def list_results(self, user_id: int) -> List[Dict[str, Any]]:
         stmt = (
             select(CareerResultORM, CareerTestORM)
@@ -116,7 +171,7 @@ class CareerTestService:
             "created_at": test.created_at,
         }
         if with_questions:
-            payload["questions"] = json.loads(test.questions)
+            payload["questions"] = compiled_tests.get(test).payload
         return payload
 
 
@@ -8,7 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.repositiry.db_models import ContentORM, UserORM
 from src.domain.entity.userentity import UserRole
+from src.infrastructure.cache.content_cache import content_list_cache
 from src.infrastructure.services.content_service import ContentStatus
+from src.infrastructure.services.tag_service import TagService
 
 
 class WorkflowError(Exception):
@@ -20,6 +22,7 @@ class WorkflowService:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.tags = TagService(session)
 
     async def submit_for_review(self, content_id: int, author_id: int) -> Dict[str, str]:
         content = await self.session.get(ContentORM, content_id)
@@ -31,6 +34,7 @@ class WorkflowService:
         content.status = ContentStatus.PENDING.value
         content.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content.type)
 
         return {"status": content.status}
 
@@ -40,11 +44,13 @@ class WorkflowService:
         if not content:
             raise WorkflowError("Content not found")
 
+        await self.tags.set_content_published(content_id, bool(content.is_published), True)
         content.status = ContentStatus.PUBLISHED.value
         content.is_published = True
         content.published_at = datetime.utcnow()
         content.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content.type)
 
         return {"status": content.status}
 
@@ -54,10 +60,12 @@ class WorkflowService:
         if not content:
             raise WorkflowError("Content not found")
 
+        await self.tags.set_content_published(content_id, bool(content.is_published), False)
         content.status = ContentStatus.DRAFT.value
         content.is_published = False
         content.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content.type)
 
         return {"status": content.status}
 
@@ -67,10 +75,12 @@ class WorkflowService:
         if not content:
             raise WorkflowError("Content not found")
 
+        await self.tags.set_content_published(content_id, bool(content.is_published), False)
         content.status = ContentStatus.ARCHIVED.value
         content.is_published = False
         content.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content.type)
 
         return {"status": content.status}
 
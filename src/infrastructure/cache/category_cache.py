@@ -0,0 +1,78 @@
+"""
+Кэш категорий заказов ``name <-> id``.
+Категорий немного, и они почти не меняются: справочник читается целиком
+один раз, а промах (категорию создал другой воркер) дочитывает одну строку.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.repositiry.db_models import CategoryORM
+
+
+class CategoryRef(NamedTuple):
+    id: int
+    name: str
+
+
+class CategoryCache:
+    """Справочник категорий в памяти процесса."""
+
+    def __init__(self):
+        self._by_id: Dict[int, CategoryRef] = {}
+        self._by_name: Dict[str, CategoryRef] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def put(self, category_id: int, name: str) -> CategoryRef:
+        ref = CategoryRef(category_id, name)
+        self._by_id[category_id] = ref
+        # Для одинаковых имён используется категория с меньшим id
+        current = self._by_name.get(name)
+        if current is None or current.id > category_id:
+            self._by_name[name] = ref
+        return ref
+
+    async def _ensure_loaded(self, session: AsyncSession) -> None:
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            rows = (await session.execute(select(CategoryORM.id, CategoryORM.name))).all()
+            for category_id, name in rows:
+                self.put(category_id, name)
+            self._loaded = True
+
+    async def get_by_id(self, session: AsyncSession, category_id: int) -> Optional[CategoryRef]:
+        await self._ensure_loaded(session)
+        ref = self._by_id.get(category_id)
+        if ref is None:
+            name = await session.scalar(select(CategoryORM.name).where(CategoryORM.id == category_id))
+            if name is not None:
+                ref = self.put(category_id, name)
+        return ref
+
+    async def get_by_name(self, session: AsyncSession, name: str) -> Optional[CategoryRef]:
+        await self._ensure_loaded(session)
+        ref = self._by_name.get(name)
+        if ref is None:
+            category_id = await session.scalar(
+                select(CategoryORM.id).where(CategoryORM.name == name).order_by(CategoryORM.id).limit(1)
+            )
+            if category_id is not None:
+                ref = self.put(category_id, name)
+        return ref
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._by_name.clear()
+        self._loaded = False
+
+
+# Глобальный справочник категорий
+category_cache = CategoryCache()
@@ -0,0 +1,125 @@
+"""
+Кэш участников чатов для проверок доступа.
+Состав чата (заказчик, исполнитель, заказ) после создания не меняется, поэтому
+записи живут всё время работы процесса и удаляются только вместе с чатом.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import ChatORM
+
+CHAT_MEMBERSHIP_TOPIC = "chat_membership"
+
+
+class ChatMembership(NamedTuple):
+    customer_id: int
+    executor_id: int
+    order_id: Optional[int]
+
+    def includes(self, user_id: int) -> bool:
+        return user_id == self.customer_id or user_id == self.executor_id
+
+    @property
+    def participants(self) -> tuple:
+        return (self.customer_id, self.executor_id)
+
+
+def _chat_key(chat_id: Any) -> Optional[int]:
+    try:
+        return int(chat_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class ChatMembershipCache:
+    """LRU ``chat_id -> ChatMembership`` с догрузкой из БД при промахе."""
+
+    _COLUMNS = (ChatORM.id, ChatORM.customer_id, ChatORM.executor_id, ChatORM.order_id)
+
+    def __init__(
+        self,
+        max_size: int = 50_000,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.max_size = max_size
+        self._session_factory = session_factory
+        self._items: "OrderedDict[int, ChatMembership]" = OrderedDict()
+
+    def put(self, chat_id: int, customer_id: int, executor_id: int, order_id: Optional[int]) -> ChatMembership:
+        membership = ChatMembership(customer_id, executor_id, order_id)
+        self._items[chat_id] = membership
+        self._items.move_to_end(chat_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return membership
+
+    async def _fetch(self, stmt, session: Optional[AsyncSession]):
+        if session is not None:
+            return (await session.execute(stmt)).all()
+        async with self._session_factory() as own_session:
+            return (await own_session.execute(stmt)).all()
+
+    async def get(self, chat_id: Any, session: Optional[AsyncSession] = None) -> Optional[ChatMembership]:
+        key = _chat_key(chat_id)
+        if key is None:
+            return None
+        membership = self._items.get(key)
+        if membership is not None:
+            self._items.move_to_end(key)
+            return membership
+
+        rows = await self._fetch(select(*self._COLUMNS).where(ChatORM.id == key), session)
+        if not rows:
+            # Отсутствие не кэшируется: чат с этим id может появиться позже
+            return None
+        _, customer_id, executor_id, order_id = rows[0]
+        return self.put(key, customer_id, executor_id, order_id)
+
+    async def is_member(self, chat_id: Any, user_id: int, session: Optional[AsyncSession] = None) -> bool:
+        membership = await self.get(chat_id, session)
+        return membership is not None and membership.includes(user_id)
+
+    async def warm_user(self, user_id: int, session: Optional[AsyncSession] = None) -> int:
+        """Загрузить все чаты пользователя одним запросом (при подключении WebSocket)."""
+        rows = await self._fetch(
+            select(*self._COLUMNS).where(or_(ChatORM.customer_id == user_id, ChatORM.executor_id == user_id)),
+            session,
+        )
+        for chat_id, customer_id, executor_id, order_id in rows:
+            self.put(chat_id, customer_id, executor_id, order_id)
+        return len(rows)
+
+    def invalidate(self, chat_id: Any) -> None:
+        key = _chat_key(chat_id)
+        if key is not None:
+            self._items.pop(key, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for chat_id in [key for key, item in self._items.items() if item.includes(user_id)]:
+            self._items.pop(chat_id, None)
+
+    def invalidate_order(self, order_id: int) -> None:
+        for chat_id in [key for key, item in self._items.items() if item.order_id == order_id]:
+            self._items.pop(chat_id, None)
+
+    async def handle_invalidation(self, payload: Dict[str, Any]) -> None:
+        """Обработчик шины: удаление чатов в другом воркере."""
+        if payload.get("chat_id") is not None:
+            self.invalidate(payload["chat_id"])
+        if payload.get("user_id") is not None:
+            self.invalidate_user(int(payload["user_id"]))
+        if payload.get("order_id") is not None:
+            self.invalidate_order(int(payload["order_id"]))
+
+
+# Глобальный кэш участников чатов
+chat_membership = ChatMembershipCache(max_size=settings.chat_membership_cache_size)
+invalidation_bus.subscribe(CHAT_MEMBERSHIP_TOPIC, chat_membership.handle_invalidation)
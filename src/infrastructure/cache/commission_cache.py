@@ -0,0 +1,111 @@
+"""
+Кэш настроек комиссий.
+Настройки меняются только через админку, а читаются при каждой публикации заказа
+и каждом отклике. Снимок хранится в памяти процесса; после изменения воркер,
+сохранивший настройки, рассылает новую версию через шину инвалидации.
+TTL страхует от потерянного события, если Redis недоступен.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import CommissionSettingsORM
+
+COMMISSION_SETTINGS_TOPIC = "commission_settings"
+
+
+@dataclass(frozen=True)
+class CommissionSnapshot:
+    """Настройки комиссий; значения по умолчанию действуют, пока строки в БД нет."""
+
+    commission_withdraw: float = 3.0
+    commission_customer: float = 10.0
+    commission_executor: float = 5.0
+    commission_post_order: int = 200
+    commission_response_threshold: int = 5000
+    commission_response_percent: float = 1.0
+    version: int = 0
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Any]) -> "CommissionSnapshot":
+        values: Dict[str, Any] = {}
+        for field in fields(cls):
+            raw = mapping.get(field.name)
+            if raw is not None:
+                # Аннотации строковые из-за ``from __future__ import annotations``
+                values[field.name] = int(raw) if field.type == "int" else float(raw)
+        return cls(**values)
+
+
+class CommissionSettingsCache:
+    """Снимок ``commission_settings`` с версией и перечитыванием по TTL."""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.ttl = ttl
+        self._session_factory = session_factory
+        self._snapshot: Optional[CommissionSnapshot] = None
+        self._loaded_at = 0.0
+        # Минимальная версия, о которой сообщила шина: более старый снимок не используется,
+        # даже если он был прочитан параллельно с изменением
+        self._required_version = 0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, snapshot: Optional[CommissionSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version >= self._required_version
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def get(self, session: Optional[AsyncSession] = None) -> CommissionSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        async with self._lock:
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            snapshot = await self._load(session)
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            return snapshot
+
+    async def _load(self, session: Optional[AsyncSession]) -> CommissionSnapshot:
+        stmt = select(CommissionSettingsORM.__table__).order_by(CommissionSettingsORM.id).limit(1)
+        if session is not None:
+            row = (await session.execute(stmt)).first()
+        else:
+            async with self._session_factory() as own_session:
+                row = (await own_session.execute(stmt)).first()
+        return CommissionSnapshot.from_mapping(row._mapping) if row is not None else CommissionSnapshot()
+
+    def invalidate(self, version: Optional[int] = None) -> None:
+        if version is not None:
+            self._required_version = max(self._required_version, int(version))
+        else:
+            self._snapshot = None
+
+    async def publish_update(self, version: int) -> None:
+        """Сообщить всем воркерам (включая текущий) о новой версии настроек."""
+        await invalidation_bus.publish(COMMISSION_SETTINGS_TOPIC, {"version": version})
+
+    async def handle_invalidation(self, payload: Dict[str, Any]) -> None:
+        """Обработчик шины: изменение настроек в другом воркере."""
+        self.invalidate(payload.get("version"))
+
+
+# Глобальный кэш настроек комиссий
+commission_cache = CommissionSettingsCache(ttl=settings.commission_cache_ttl)
+invalidation_bus.subscribe(COMMISSION_SETTINGS_TOPIC, commission_cache.handle_invalidation)
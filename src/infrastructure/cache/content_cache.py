@@ -0,0 +1,117 @@
+"""
+Кэш опубликованных лент контента.
+Записи версионируются счётчиком на тип контента: публикация, изменение или удаление
+материала увеличивает версию, и старые ключи перестают читаться.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.infrastructure.cache.memory_cache import MemoryCache, memory_cache
+from src.infrastructure.cache.redis_client import get_redis_client
+from src.infrastructure.monitoring.logger import logger
+
+
+class ContentListCache:
+    """Read-through кэш страниц ленты с сильными ETag."""
+
+    ALL_SCOPE = "all"
+
+    def __init__(self, cache: MemoryCache, ttl: int = 60, prefix: str = "content:"):
+        self.cache = cache
+        self.ttl = ttl
+        self.prefix = prefix
+        self._fallback_notice_sent = False
+        try:
+            self.redis = get_redis_client()
+        except RedisError as exc:
+            logger.warning("Redis unavailable for content cache", error=str(exc))
+            self.redis = None
+            self._fallback_notice_sent = True
+        # Локальная часть версии: гарантирует инвалидацию в своём воркере даже без Redis
+        self._local_versions: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def scope_for(cls, content_type: Optional[str]) -> str:
+        return content_type.lower() if content_type else cls.ALL_SCOPE
+
+    def _version_key(self, scope: str) -> str:
+        return f"{self.prefix}version:{scope}"
+
+    def _notify_fallback(self, exc: Exception) -> None:
+        if not self._fallback_notice_sent:
+            logger.warning("Content cache using local versions", error=str(exc))
+            self._fallback_notice_sent = True
+
+    async def _shared_version(self, scope: str) -> int:
+        if self.redis is None:
+            return 0
+        try:
+            value = await self.redis.get(self._version_key(scope))
+            return int(value or 0)
+        except RedisError as exc:
+            self._notify_fallback(exc)
+            return 0
+
+    async def invalidate(self, content_type: Optional[str] = None) -> None:
+        """Сбросить ленты типа и общую ленту (tag-инвалидация через версию)."""
+        scopes = {self.ALL_SCOPE, self.scope_for(content_type)}
+        for scope in scopes:
+            self._local_versions[scope] += 1
+            if self.redis is None:
+                continue
+            try:
+                await self.redis.incr(self._version_key(scope))
+            except RedisError as exc:
+                self._notify_fallback(exc)
+
+    @staticmethod
+    def _make_etag(scope: str, version: int, payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+        return f'"{scope}-{version}-{digest}"'
+
+    async def get_or_load(
+        self,
+        content_type: Optional[str],
+        status: Optional[str],
+        search: Optional[str],
+        page: int,
+        page_size: int,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+        tag: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """Вернуть (payload, etag) страницы ленты, загрузив её при промахе."""
+        scope = self.scope_for(content_type)
+        shared_version = await self._shared_version(scope)
+        key = (
+            f"{self.prefix}list:{scope}:{shared_version}.{self._local_versions[scope]}:"
+            f"{status or '*'}:{page}:{page_size}:{tag or ''}:{search or ''}"
+        )
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry["payload"], entry["etag"]
+
+        payload = await loader()
+        etag = self._make_etag(scope, shared_version, payload)
+        self.cache.set(key, {"payload": payload, "etag": etag}, ttl=self.ttl)
+        return payload, etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка заголовка If-None-Match (список значений или ``*``)."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Глобальный кэш лент контента
+content_list_cache = ContentListCache(memory_cache, ttl=settings.content_cache_ttl)
@@ -0,0 +1,103 @@
+"""
+Кэш избранного: ``user_id -> множество id заказов``.
+Лента заказов отмечает избранные карточки пересечением с этим множеством без
+запросов к БД. Множество читается одним запросом по индексу (user_id, order_id);
+у пользователей с очень большим избранным оно не кэшируется, и страница
+проверяется одним запросом ``order_id IN (...)``. Добавление и удаление
+сбрасывают запись во всех воркерах через шину инвалидации.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
+from src.infrastructure.repositiry.db_models import FavoriteOrderORM
+
+FAVORITES_TOPIC = "favorites"
+
+# Пометка "избранного слишком много для кэша"
+_TOO_LARGE = None
+
+
+class FavoriteIdsCache:
+    """LRU ``user_id -> frozenset(order_id)``."""
+
+    def __init__(self, max_users: int = 10_000, max_ids_per_user: int = 1000):
+        self.max_users = max_users
+        self.max_ids_per_user = max_ids_per_user
+        self._items: "OrderedDict[int, Optional[FrozenSet[int]]]" = OrderedDict()
+        # Счётчик изменений: загрузка, начатая до изменения, не попадёт в кэш
+        self._generations: Dict[int, int] = {}
+
+    def _put(self, user_id: int, ids: Optional[FrozenSet[int]]) -> None:
+        self._items[user_id] = ids
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_users:
+            evicted, _ = self._items.popitem(last=False)
+            self._generations.pop(evicted, None)
+
+    async def _load(self, session: AsyncSession, user_id: int) -> Optional[FrozenSet[int]]:
+        generation = self._generations.get(user_id, 0)
+        rows = await session.execute(
+            select(FavoriteOrderORM.order_id)
+            .where(FavoriteOrderORM.user_id == user_id)
+            .limit(self.max_ids_per_user + 1)
+        )
+        ids = frozenset(rows.scalars().all())
+        if len(ids) > self.max_ids_per_user:
+            ids = _TOO_LARGE
+        if self._generations.get(user_id, 0) == generation:
+            self._put(user_id, ids)
+        return ids
+
+    async def get(self, session: AsyncSession, user_id: int) -> Optional[FrozenSet[int]]:
+        """Всё избранное пользователя или ``None``, если оно слишком велико для кэша."""
+        if user_id in self._items:
+            self._items.move_to_end(user_id)
+            return self._items[user_id]
+        return await self._load(session, user_id)
+
+    async def contains_many(self, session: AsyncSession, user_id: int, order_ids: Iterable[int]) -> Set[int]:
+        """Какие из ``order_ids`` у пользователя в избранном."""
+        order_ids = set(order_ids)
+        if not order_ids:
+            return set()
+        ids = await self.get(session, user_id)
+        if ids is not _TOO_LARGE:
+            return order_ids & ids
+        rows = await session.execute(
+            select(FavoriteOrderORM.order_id).where(
+                FavoriteOrderORM.user_id == user_id,
+                FavoriteOrderORM.order_id.in_(order_ids),
+            )
+        )
+        return set(rows.scalars().all())
+
+    def invalidate(self, user_id: int) -> None:
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._items.pop(user_id, None)
+
+    async def publish_change(self, user_id: int) -> None:
+        """Сбросить запись пользователя здесь и в остальных воркерах (после commit)."""
+        await invalidation_bus.publish(FAVORITES_TOPIC, {"user_id": user_id})
+
+    async def handle_invalidation(self, payload: Dict[str, Any]) -> None:
+        if payload.get("user_id") is not None:
+            self.invalidate(int(payload["user_id"]))
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._generations.clear()
+
+
+# Глобальный кэш избранного
+favorite_ids = FavoriteIdsCache(
+    max_users=settings.favorites_cache_size,
+    max_ids_per_user=settings.favorites_cache_max_ids,
+)
+invalidation_bus.subscribe(FAVORITES_TOPIC, favorite_ids.handle_invalidation)
@@ -0,0 +1,102 @@
+"""
+Шина межворкерной инвалидации через Redis pub/sub.
+Воркер, изменивший данные, применяет обработчики у себя сразу и публикует событие;
+остальные воркеры получают его из канала. Без Redis событие остаётся локальным.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from redis.exceptions import RedisError
+
+from src.infrastructure.cache.redis_client import get_redis_client
+from src.infrastructure.monitoring.logger import logger
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class InvalidationBus:
+    """Рассылка событий ``topic -> обработчики`` между воркерами."""
+
+    def __init__(self, channel: str = "app:invalidate", retry_interval: float = 30.0):
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self._origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+        self._fallback_notice_sent = False
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        if handler not in self._handlers[topic]:
+            self._handlers[topic].append(handler)
+
+    def _notify_fallback(self, exc: Exception) -> None:
+        if not self._fallback_notice_sent:
+            logger.warning("Invalidation bus running without Redis", error=str(exc))
+            self._fallback_notice_sent = True
+
+    async def _dispatch(self, topic: str, payload: Dict[str, Any]) -> None:
+        for handler in list(self._handlers.get(topic, ())):
+            try:
+                await handler(payload)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Invalidation handler failed", error=str(exc))
+
+    async def publish(self, topic: str, payload: Optional[Dict[str, Any]] = None) -> None:
+        payload = payload or {}
+        await self._dispatch(topic, payload)
+        message = json.dumps({"topic": topic, "payload": payload, "origin": self._origin})
+        try:
+            await get_redis_client().publish(self.channel, message)
+        except RedisError as exc:
+            self._notify_fallback(exc)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis_client().pubsub()
+                await pubsub.subscribe(self.channel)
+                self._fallback_notice_sent = False
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        data = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if data.get("origin") == self._origin:
+                        continue
+                    await self._dispatch(data.get("topic", ""), data.get("payload") or {})
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as exc:
+                self._notify_fallback(exc)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except (RedisError, OSError):
+                        pass
+            await asyncio.sleep(self.retry_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальная шина инвалидации
+invalidation_bus = InvalidationBus()
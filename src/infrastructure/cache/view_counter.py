@@ -0,0 +1,106 @@
+"""
+Буферизованный счётчик просмотров контента.
+Просмотры копятся в памяти воркера и периодически сбрасываются в БД пакетным UPDATE.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import ContentORM
+
+
+class ViewCounterBuffer:
+    """Агрегирует инкременты просмотров по content_id.
+
+    Сброс выполняется одним ``UPDATE content SET views = views + CASE ...`` на пачку
+    без изменения ``updated_at``. При ошибке инкременты возвращаются в буфер,
+    поэтому доставка — at-least-once.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        max_batch: int = 500,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._session_factory = session_factory
+        self._pending: Counter = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, content_id: int, amount: int = 1) -> None:
+        self._pending[content_id] += amount
+
+    def pending(self, content_id: int) -> int:
+        """Количество ещё не сброшенных просмотров (для актуального ответа API)."""
+        return self._pending.get(content_id, 0)
+
+    async def flush(self) -> int:
+        """Сбросить накопленные просмотры в БД. Возвращает количество записанных просмотров."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, Counter()
+            items = list(batch.items())
+            try:
+                async with self._session_factory() as session:
+                    for start in range(0, len(items), self.max_batch):
+                        await session.execute(self._build_update(dict(items[start:start + self.max_batch])))
+                    await session.commit()
+            except Exception as exc:  # noqa: BLE001
+                self._pending.update(batch)
+                logger.warning("Content views flush failed", error=str(exc))
+                return 0
+
+            return sum(batch.values())
+
+    @staticmethod
+    def _build_update(chunk: Dict[int, int]):
+        return (
+            update(ContentORM)
+            .where(ContentORM.id.in_(list(chunk)))
+            .values(
+                views=ContentORM.views + case(chunk, value=ContentORM.id, else_=0),
+                # явно сохраняем updated_at, иначе сработает onupdate колонки
+                updated_at=ContentORM.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить периодический сброс и записать остаток буфера."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Глобальный буфер просмотров
+view_counter = ViewCounterBuffer(
+    flush_interval=settings.content_views_flush_interval,
+    max_batch=settings.content_views_flush_batch,
+)
@@ -139,6 +139,11 @@ class StructuredLogger:
     def debug(self, message: str, **kwargs):
         """Отладочное сообщение"""
         self._log(logging.DEBUG, message, **kwargs)
+
+    @property
+    def debug_enabled(self) -> bool:
+        """Включён ли уровень DEBUG (для горячих путей, где дорог даже сбор полей)"""
+        return self.logger.isEnabledFor(logging.DEBUG)
     
     def audit(self, action: str, user_id: Optional[int] = None, **kwargs):
         """Аудит действий пользователя"""
@@ -151,10 +156,10 @@ class StructuredLogger:
     def security(self, event: str, user_id: Optional[int] = None, ip_address: Optional[str] = None, **kwargs):
         """Логирование событий безопасности"""
         security_logger = logging.getLogger("security")
-        security_logger.warning(f"Security event: {event}", 
-                              user_id=user_id, 
-                              ip_address=ip_address, 
-                              **kwargs)
+        extra = dict(kwargs)
+        extra["user_id"] = user_id
+        extra["ip_address"] = ip_address
+        security_logger.warning(f"Security event: {event}", extra=extra)
     
     def performance(self, operation: str, duration: float, **kwargs):
         """Логирование производительности"""
@@ -165,6 +170,8 @@ class StructuredLogger:
     
     def _log(self, level: int, message: str, **kwargs):
         """Внутренний метод для логирования"""
+        if not self.logger.isEnabledFor(level):
+            return
         extra = {}
         for key, value in kwargs.items():
             if key in ['user_id', 'request_id', 'ip_address', 'endpoint']:
@@ -1,5 +1,7 @@
 import asyncio
-from sqlalchemy import inspect
+from typing import List
+
+from sqlalchemy import Table, inspect, insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -41,6 +43,22 @@ AsyncSessionLocal = async_sessionmaker(
 class Base(DeclarativeBase):
     pass
 
+async def insert_returning_ids(session: AsyncSession, table: Table, rows: List[dict]) -> List[int]:
+    """Вставить строки одним запросом и вернуть их id в порядке ``rows``."""
+    if session.bind.dialect.insert_executemany_returning:
+        # SQLite / PostgreSQL / MariaDB: INSERT ... RETURNING с порядком как у параметров
+        result = await session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            rows,
+        )
+        return list(result.scalars().all())
+
+    # MySQL без RETURNING: один многострочный INSERT получает непрерывный
+    # диапазон автоинкремента, lastrowid — id первой строки
+    result = await session.execute(insert(table).values(rows))
+    first_id = result.lastrowid
+    return list(range(first_id, first_id + len(rows)))
+
 _schema_lock = asyncio.Lock()
 
 async def ensure_database_schema() -> None:
@@ -1,40 +1,110 @@
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from src.infrastructure.repositiry.db_models import ChatORM
+from src.infrastructure.cache.chat_membership import chat_membership
 from src.domain.entity.chatentity import Chat
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def chat_pair(user1_id: int, user2_id: int) -> Tuple[int, int]:
+    """Канонический ключ пары участников: (меньший id, больший id)."""
+    return (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
+
 
 class ChatRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
-    
+
     async def get_chat_between_users(self, user1_id: int, user2_id: int) -> Optional[ChatORM]:
-        query = select(ChatORM).where(
-            ((ChatORM.customer_id == user1_id) & (ChatORM.executor_id == user2_id)) |
-            ((ChatORM.customer_id == user2_id) & (ChatORM.executor_id == user1_id))
+        user_low, user_high = chat_pair(user1_id, user2_id)
+        # Точечный поиск по уникальному индексу uq_chats_pair
+        query = (
+            select(ChatORM)
+            .where(ChatORM.user_low == user_low, ChatORM.user_high == user_high)
+            .order_by(ChatORM.id)
+            .limit(1)
         )
         result = await self.session.execute(query)
-        return result.scalar_one_or_none()
-    
+        return result.scalars().first()
+
     async def get_by_id(self, chat_id: int) -> Optional[ChatORM]:
         query = select(ChatORM).where(ChatORM.id == chat_id)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
-    
+
+    def _insert_ignoring_pair_conflict(self, values: Dict[str, Any]):
+        dialect = self.session.bind.dialect.name
+        if dialect == "mysql":
+            stmt = mysql_insert(ChatORM).values(**values)
+            # Конфликт по паре превращается в no-op; прочие ошибки (FK, NOT NULL) не глушатся
+            return stmt.on_duplicate_key_update(id=ChatORM.id)
+        if dialect == "sqlite":
+            return (
+                sqlite_insert(ChatORM)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=["user_low", "user_high"])
+            )
+        return insert(ChatORM).values(**values)
+
+    async def get_or_create_between_users(
+        self, user1_id: int, user2_id: int, order_id: Optional[int]
+    ) -> ChatORM:
+        """Найти чат пары или создать его без гонки между параллельными запросами.
+
+        В обычном случае (чат уже есть) — один SELECT по уникальному индексу.
+        При промахе вставка игнорирует конфликт по паре, после чего строка читается
+        повторно: победитель гонки у всех запросов один.
+        """
+        chat = await self.get_chat_between_users(user1_id, user2_id)
+        if chat:
+            return chat
+
+        user_low, user_high = chat_pair(user1_id, user2_id)
+        now = datetime.utcnow()
+        values = {
+            "customer_id": user1_id,
+            "executor_id": user2_id,
+            "order_id": order_id,
+            "user_low": user_low,
+            "user_high": user_high,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            await self.session.execute(self._insert_ignoring_pair_conflict(values))
+            await self.session.commit()
+        except IntegrityError:
+            # Диалект без upsert: чат успел создать параллельный запрос
+            await self.session.rollback()
+
+        chat = await self.get_chat_between_users(user1_id, user2_id)
+        if chat is None:
+            raise RuntimeError("Chat between users was not created")
+        chat_membership.put(chat.id, chat.customer_id, chat.executor_id, chat.order_id)
+        return chat
+
     async def create(self, user1_id: int, user2_id: int, order_id: Optional[int]) -> ChatORM:
+        user_low, user_high = chat_pair(user1_id, user2_id)
         chat = ChatORM(
             customer_id=user1_id,
             executor_id=user2_id,
-            order_id=order_id
+            order_id=order_id,
+            user_low=user_low,
+            user_high=user_high,
         )
         self.session.add(chat)
         await self.session.commit()
         await self.session.refresh(chat)
+        chat_membership.put(chat.id, chat.customer_id, chat.executor_id, chat.order_id)
         return chat
-    
+
     async def get_user_chats(self, user_id: int) -> List[ChatORM]:
         query = select(ChatORM).where(
             (ChatORM.customer_id == user_id) | (ChatORM.executor_id == user_id)
         )
         result = await self.session.execute(query)
-        return result.scalars().all()
\ No newline at end of file
+        return result.scalars().all()
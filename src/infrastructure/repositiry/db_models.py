@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
     String,
@@ -8,6 +9,7 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     Enum,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
@@ -63,7 +65,7 @@ class UserORM(Base):
     hashed_password = Column(String(255), nullable=False)
     specification = Column(String(200), default="")
     description = Column(Text, default="")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     rub_balance = Column(Float, default=0.0)
     tf_balance = Column(Float, default=0.0)
@@ -83,6 +85,8 @@ class UserORM(Base):
     role = Column(String(20), default="CUSTOMER")
     photo = Column(String(255), nullable=True)
 
+    __table_args__ = (Index("ix_users_role_id", "role", "id"),)
+
     @property
     def balance(self) -> float:
         value = getattr(self, "rub_balance", 0.0)
@@ -123,7 +127,7 @@ class OrderORM(Base):
     customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     executor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     status = Column(Enum(OrderStatusEnum, native_enum=False, length=32), default=OrderStatusEnum.OPEN, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deadline = Column(DateTime, nullable=True)
     category_id = Column(Integer, nullable=True)
@@ -132,6 +136,8 @@ class OrderORM(Base):
     responses = Column(Integer, default=0, nullable=False)
     term = Column(Integer, nullable=False)
     order_type = Column(Enum(OrderTypeEnum, native_enum=False, length=16), nullable=False, default=OrderTypeEnum.REGULAR)
+
+    __table_args__ = (Index("ix_orders_status_id", "status", "id"),)
     
     # Relationships
     customer = relationship("UserORM", foreign_keys=[customer_id])
@@ -144,6 +150,10 @@ class FavoriteOrderORM(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Индекс, а не UniqueConstraint: при старте он создаётся и в существующей таблице
+    # (или старт падает, если в ней остались повторы)
+    __table_args__ = (Index("uq_favorite_orders_user_order", "user_id", "order_id", unique=True),)
     
     # Relationships
     user = relationship("UserORM", foreign_keys=[user_id])
@@ -179,6 +189,8 @@ class CommissionSettingsORM(Base):
     commission_post_order = Column(Integer, default=200)
     commission_response_threshold = Column(Integer, default=5000)
     commission_response_percent = Column(Float, default=1.0)
+    # Растёт при каждом изменении; по нему воркеры отбрасывают устаревший снимок
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -222,6 +234,65 @@ class ContentLikeORM(Base):
     content = relationship("ContentORM", backref="likes_rel")
     user = relationship("UserORM")
 
+
+class ModerationTermORM(Base):
+    __tablename__ = "moderation_terms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    term = Column(String(100), unique=True, nullable=False)
+    match_mode = Column(String(10), nullable=False, default="word")  # word | stem
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TagORM(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(64), unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ContentTagORM(Base):
+    __tablename__ = "content_tags"
+
+    content_id = Column(Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_content_tags_tag", "tag_id", "content_id"),)
+
+
+class TagCountORM(Base):
+    """Поддерживаемые счётчики тегов для фасетов (content — только опубликованное)."""
+
+    __tablename__ = "tag_counts"
+
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    scope = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_tag_counts_scope_count", "scope", "count"),)
+
+class StatCounterORM(Base):
+    """Поддерживаемые счётчики админской статистики: bucket = "total" или дата YYYY-MM-DD."""
+
+    __tablename__ = "stat_counters"
+
+    entity = Column(String(32), primary_key=True)
+    bucket = Column(String(10), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class StatWatermarkORM(Base):
+    """Последний учтённый в счётчиках id по каждой сущности."""
+
+    __tablename__ = "stat_watermarks"
+
+    entity = Column(String(32), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime, nullable=True)
+
 class ChatORM(Base):
     __tablename__ = "chats"
     
@@ -229,8 +300,13 @@ class ChatORM(Base):
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     executor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Каноническая пара участников (min, max): один чат на пару независимо от ролей
+    user_low = Column(Integer, nullable=True)
+    user_high = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("user_low", "user_high", name="uq_chats_pair"),)
     
     # Relationships
     order = relationship("OrderORM", foreign_keys=[order_id])
@@ -249,12 +325,67 @@ class MessageORM(Base):
     message_type = Column(Enum(MessageTypeEnum, native_enum=False, length=16), nullable=False, default=MessageTypeEnum.TEXT)
     file_path = Column(String(255), nullable=True)
     is_deleted = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index("ix_messages_chat_id_id", "chat_id", "id"),
+        Index("ix_messages_type_id", "message_type", "id"),
+    )
     
     # Relationships
     chat = relationship("ChatORM", foreign_keys=[chat_id])
     sender = relationship("UserORM", foreign_keys=[sender_id])
 
 
+class ChatReadStateORM(Base):
+    """Состояние прочтения чата участником: граница прочитанного и счётчик непрочитанных."""
+
+    __tablename__ = "chat_read_states"
+
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_read_message_id = Column(Integer, nullable=False, default=0)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_chat_read_states_user_id", "user_id"),)
+
+
+class UserEventORM(Base):
+    """Исходящее событие WebSocket для пользователя; id служит номером в последовательности."""
+
+    __tablename__ = "user_events"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (Index("ix_user_events_user_id_id", "user_id", "id"),)
+
+
+class BalanceEntryORM(Base):
+    """Проводка журнала балансов. Строки только добавляются; сумма — в минимальных единицах валюты."""
+
+    __tablename__ = "balance_entries"
+
+    id = Column(Integer, primary_key=True)
+    transfer_id = Column(String(64), nullable=False)
+    account = Column(String(64), nullable=False)
+    # Без внешнего ключа: журнал сохраняется и после удаления пользователя
+    user_id = Column(Integer, nullable=True)
+    currency = Column(Enum(CurrencyTypeEnum, native_enum=False, length=16), nullable=False)
+    amount = Column(BigInteger, nullable=False)
+    kind = Column(String(32), nullable=False)
+    reference = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("transfer_id", "account", name="uq_balance_entries_leg"),
+        Index("ix_balance_entries_user_id_id", "user_id", "id"),
+        Index("ix_balance_entries_account_id", "account", "id"),
+    )
+
+
 class SupportRequestORM(Base):
     __tablename__ = "support_requests"
 
@@ -264,7 +395,9 @@ class SupportRequestORM(Base):
     email = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
     status = Column(String(20), nullable=False, default="pending")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (Index("ix_support_requests_status_id", "status", "id"),)
 
     user = relationship("UserORM", foreign_keys=[user_id])
 
@@ -286,6 +419,34 @@ class PortfolioItemORM(Base):
     user = relationship("UserORM", backref="portfolio_items")
 
 
+class PortfolioTagORM(Base):
+    __tablename__ = "portfolio_tags"
+
+    item_id = Column(Integer, ForeignKey("portfolio_items.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_portfolio_tags_tag", "tag_id", "item_id"),)
+
+
+class UploadBlobORM(Base):
+    """Загруженный файл, адресуемый SHA-256 содержимого, со счётчиком ссылок."""
+
+    __tablename__ = "upload_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    # Путь относительно каталога загрузок: "ab/<sha256>.png"
+    name = Column(String(128), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(64), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Когда счётчик стал нулевым (или файл загружен, но ещё не использован)
+    orphaned_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_upload_blobs_gc", "ref_count", "orphaned_at"),)
+
+
 class AchievementORM(Base):
     __tablename__ = "achievements"
 
@@ -341,6 +502,7 @@ class CareerTestORM(Base):
     description = Column(Text, nullable=True)
     questions = Column(Text, nullable=False)  # JSON payload
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class CareerResultORM(Base):
@@ -352,6 +514,7 @@ class CareerResultORM(Base):
     score = Column(Integer, nullable=False)
     profile = Column(String(100), nullable=False)
     recommendations = Column(Text, nullable=True)
+    answers = Column(Text, nullable=True)  # JSON question_id -> value
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("UserORM", foreign_keys=[user_id])
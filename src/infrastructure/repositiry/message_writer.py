@@ -0,0 +1,120 @@
+"""
+Пакетная запись сообщений чатов.
+Сообщения, пришедшие в пределах нескольких миллисекунд, вставляются одним
+многострочным INSERT в одной транзакции вместе с приращениями счётчиков непрочитанных.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.domain.entity.messageentity import Message
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, insert_returning_ids
+from src.infrastructure.repositiry.db_models import MessageORM
+from src.infrastructure.repositiry.read_state_repository import ChatReadStateRepository
+
+_Pending = Tuple[Message, Sequence[int], asyncio.Future]
+
+
+class MessageWriteBatcher:
+    """Группирует вставки сообщений в пачки.
+
+    Пачка уходит в БД, когда набралось ``max_batch`` сообщений или с момента первого
+    прошло ``max_latency`` секунд. Каждый ``submit`` получает своё сообщение с
+    присвоенным id; ошибка записи пачки пробрасывается всем её отправителям.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 100,
+        max_latency: float = 0.005,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._session_factory = session_factory
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._tasks: set = set()
+
+    async def submit(self, message: Message, recipient_ids: Sequence[int] = ()) -> Message:
+        """Поставить сообщение в очередь и дождаться его записи."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, tuple(recipient_ids), future))
+
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_latency, self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            # Хвост сверх max_batch уходит следующей пачкой без ожидания
+            self._timer = asyncio.get_running_loop().call_soon(self._schedule_flush)
+        if not batch:
+            return
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Записать всё, что стоит в очереди, и дождаться завершения записей."""
+        while self._pending:
+            self._schedule_flush()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        now = datetime.utcnow()
+        rows = [
+            {
+                "chat_id": message.chat_id,
+                "sender_id": message.sender_id,
+                "content": message.content,
+                "message_type": message.message_type,
+                "file_path": message.file_path,
+                "created_at": now,
+                "is_deleted": False,
+            }
+            for message, _, _ in batch
+        ]
+        unread = Counter(
+            (message.chat_id, recipient)
+            for message, recipients, _ in batch
+            for recipient in recipients
+        )
+
+        try:
+            async with self._session_factory() as session:
+                ids = await insert_returning_ids(session, MessageORM.__table__, rows)
+                await ChatReadStateRepository(session).increment_unread_many(unread)
+                await session.commit()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Message batch write failed", error=str(exc), size=len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (message, _, future), message_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(message.copy(update={"id": message_id, "created_at": now}))
+
+
+# Глобальный писатель сообщений
+message_writer = MessageWriteBatcher(
+    max_batch=settings.message_batch_max_size,
+    max_latency=settings.message_batch_max_latency,
+)
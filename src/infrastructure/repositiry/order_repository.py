@@ -14,6 +14,7 @@ from src.domain.interfaces.repositories import (
     OrderType,
     OrderUpdateDto,
 )
+from src.infrastructure.cache.favorite_cache import favorite_ids
 from src.infrastructure.repositiry.db_models import FavoriteOrderORM, OrderORM
 from src.infrastructure.monitoring.logger import logger
 
@@ -77,6 +78,7 @@ class OrderRepository:
         self.session.add(favorite)
         await self.session.commit()
         await self.session.refresh(favorite)
+        await favorite_ids.publish_change(user_id)
         return favorite
 
     async def remove_favorite(self, user_id: int, order_id: int) -> None:
@@ -90,6 +92,7 @@ class OrderRepository:
         if favorite:
             await self.session.delete(favorite)
             await self.session.commit()
+            await favorite_ids.publish_change(user_id)
 
     async def get_favorites(self, user_id: int) -> list[FavoriteOrderORM]:
         result = await self.session.execute(
@@ -98,13 +101,7 @@ class OrderRepository:
         return list(result.scalars().all())
 
     async def is_favorite(self, user_id: int, order_id: int) -> bool:
-        result = await self.session.execute(
-            select(FavoriteOrderORM).where(
-                FavoriteOrderORM.user_id == user_id,
-                FavoriteOrderORM.order_id == order_id,
-            )
-        )
-        return result.scalar_one_or_none() is not None
+        return order_id in await favorite_ids.contains_many(self.session, user_id, [order_id])
 
     async def create(self, order_data: OrderPayload) -> OrderORM:
         payload = self._prepare_payload(order_data, is_create=True)
@@ -0,0 +1,158 @@
+"""
+Постраничная выборка для админских списков.
+Поддерживает обычные страницы (OFFSET) и keyset-курсор по паре
+``(колонка сортировки, id)``: следующая страница читается по индексу
+без пропуска предыдущих строк. Общее число строк — COUNT(*) в БД
+или готовое значение из поддерживаемых счётчиков.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import DateTime, and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+class InvalidCursorError(ValueError):
+    """Курсор повреждён или выдан для другой сортировки."""
+
+
+@dataclass
+class PageRequest:
+    page: int = 1
+    page_size: int = 20
+    sort: str = "id"
+    descending: bool = True
+    cursor: Optional[str] = None
+    include_total: bool = True
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+    next_cursor: Optional[str] = None
+    total_approximate: bool = False
+
+
+def _column(attribute):
+    return attribute.property.columns[0]
+
+
+def encode_cursor(request: PageRequest, value: Any, last_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif hasattr(value, "value"):
+        value = value.value
+    payload = json.dumps([request.sort, request.descending, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(request: PageRequest, sort_attribute) -> tuple:
+    try:
+        padded = request.cursor + "=" * (-len(request.cursor) % 4)
+        sort, descending, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if value is not None and isinstance(_column(sort_attribute).type, DateTime):
+            value = datetime.fromisoformat(value)
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor") from None
+    if sort != request.sort or descending != request.descending:
+        raise InvalidCursorError("Cursor does not match sort order")
+    return value, last_id
+
+
+def _after(sort_attribute, id_attribute, value: Any, last_id: int, descending: bool):
+    """Условие «строго после (value, last_id)» в порядке сортировки."""
+    id_after = id_attribute < last_id if descending else id_attribute > last_id
+    if sort_attribute is id_attribute:
+        return id_after
+    # NULL меньше любого значения: при DESC такие строки идут в конце, при ASC — в начале
+    if value is None:
+        tail = and_(sort_attribute.is_(None), id_after)
+        return tail if descending else or_(tail, sort_attribute.is_not(None))
+    beyond = sort_attribute < value if descending else sort_attribute > value
+    condition = or_(beyond, and_(sort_attribute == value, id_after))
+    if descending and _column(sort_attribute).nullable:
+        condition = or_(condition, sort_attribute.is_(None))
+    return condition
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    model,
+    request: PageRequest,
+    sort_columns: Dict[str, Any],
+    total_hint: Optional[int] = None,
+    options: Sequence[Any] = (),
+) -> Page:
+    """Выбрать страницу ORM-объектов ``model`` по запросу ``query``.
+
+    ``sort_columns`` — разрешённые сортировки (имя -> атрибут модели), только
+    индексированные колонки. ``total_hint`` подставляется вместо COUNT(*), если
+    число строк уже известно (например, из счётчиков для запроса без фильтров).
+    """
+    sort_attribute = sort_columns[request.sort]
+    id_attribute = model.id
+
+    total = 0
+    approximate = False
+    if request.include_total:
+        if total_hint is not None:
+            total, approximate = total_hint, True
+        else:
+            count_query = query.with_only_columns(func.count(id_attribute)).order_by(None)
+            total = await session.scalar(count_query) or 0
+
+    if request.descending:
+        ordering = [sort_attribute.desc(), id_attribute.desc()]
+    else:
+        ordering = [sort_attribute.asc(), id_attribute.asc()]
+    if sort_attribute is id_attribute:
+        ordering = ordering[:1]
+
+    # Лишняя строка показывает, есть ли следующая страница, без отдельного запроса
+    data_query = query.order_by(*ordering).limit(request.page_size + 1)
+    if request.cursor:
+        value, last_id = decode_cursor(request, sort_attribute)
+        data_query = data_query.where(_after(sort_attribute, id_attribute, value, last_id, request.descending))
+    else:
+        data_query = data_query.offset((request.page - 1) * request.page_size)
+    if options:
+        data_query = data_query.options(*options)
+
+    items = list((await session.execute(data_query)).scalars().all())
+    next_cursor = None
+    if len(items) > request.page_size:
+        items = items[:request.page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(request, getattr(last, sort_attribute.key), last.id)
+
+    total_pages = (total + request.page_size - 1) // request.page_size
+    return Page(
+        items=items,
+        total=total,
+        page=request.page,
+        page_size=request.page_size,
+        total_pages=max(1, total_pages),
+        next_cursor=next_cursor,
+        total_approximate=approximate,
+    )
+
+
+async def load_by_ids(session: AsyncSession, model, ids: Iterable[Optional[int]], *columns) -> Dict[int, Any]:
+    """Связанные строки одним ``WHERE id IN (...)`` вместо запроса на каждую."""
+    unique_ids = {item_id for item_id in ids if item_id is not None}
+    if not unique_ids:
+        return {}
+    result = await session.execute(select(model.id, *columns).where(model.id.in_(unique_ids)))
+    return {row.id: row for row in result.all()}
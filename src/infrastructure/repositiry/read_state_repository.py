@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.repositiry.db_models import ChatReadStateORM, MessageORM
+
+
+class ChatReadStateRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def increment_unread(self, chat_id: int, user_ids: Iterable[int]) -> None:
+        """Увеличить счётчики непрочитанных у получателей нового сообщения.
+
+        Одна upsert-операция на получателя, без чтения истории сообщений.
+        """
+        await self.increment_unread_many({(chat_id, user_id): 1 for user_id in user_ids})
+        await self.session.commit()
+
+    async def increment_unread_many(self, amounts: Dict[Tuple[int, int], int]) -> None:
+        """Применить накопленные приращения ``(chat_id, user_id) -> n`` без коммита."""
+        now = datetime.utcnow()
+        # Один порядок блокировок строк во всех воркерах: иначе встречные пачки
+        # с пересекающимися ключами могут взаимно заблокироваться в InnoDB
+        for (chat_id, user_id), amount in sorted(amounts.items()):
+            await self._upsert_increment(chat_id, user_id, amount, now)
+
+    async def _upsert_increment(self, chat_id: int, user_id: int, amount: int, now: datetime) -> None:
+        values = {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "last_read_message_id": 0,
+            "unread_count": amount,
+            "updated_at": now,
+        }
+        dialect = self.session.bind.dialect.name
+        if dialect == "mysql":
+            stmt = mysql_insert(ChatReadStateORM).values(**values)
+            await self.session.execute(
+                stmt.on_duplicate_key_update(
+                    unread_count=ChatReadStateORM.unread_count + amount,
+                    updated_at=now,
+                )
+            )
+            return
+        if dialect == "sqlite":
+            stmt = sqlite_insert(ChatReadStateORM).values(**values)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["chat_id", "user_id"],
+                    set_={"unread_count": ChatReadStateORM.unread_count + amount, "updated_at": now},
+                )
+            )
+            return
+
+        bump = (
+            update(ChatReadStateORM)
+            .where(ChatReadStateORM.chat_id == chat_id, ChatReadStateORM.user_id == user_id)
+            .values(unread_count=ChatReadStateORM.unread_count + amount, updated_at=now)
+        )
+        result = await self.session.execute(bump)
+        if result.rowcount == 0:
+            try:
+                async with self.session.begin_nested():
+                    self.session.add(ChatReadStateORM(**values))
+            except IntegrityError:
+                # Строку успел создать параллельный запрос
+                await self.session.execute(bump)
+
+    async def mark_read(self, chat_id: int, user_id: int, message_id: Optional[int] = None) -> ChatReadStateORM:
+        """Сдвинуть границу прочитанного и пересчитать счётчик.
+
+        Без ``message_id`` чат считается прочитанным до последнего сообщения.
+        Граница никогда не сдвигается назад. Пересчёт идёт по индексу
+        ``(chat_id, id)`` и затрагивает только сообщения после границы.
+        """
+        last_message_id = await self.session.scalar(
+            select(func.max(MessageORM.id)).where(MessageORM.chat_id == chat_id)
+        ) or 0
+        target = last_message_id if message_id is None else min(message_id, last_message_id)
+
+        state = await self.session.get(ChatReadStateORM, (chat_id, user_id))
+        if state is None:
+            state = ChatReadStateORM(chat_id=chat_id, user_id=user_id, last_read_message_id=0, unread_count=0)
+            self.session.add(state)
+        if target > (state.last_read_message_id or 0):
+            state.last_read_message_id = target
+
+        if state.last_read_message_id >= last_message_id:
+            state.unread_count = 0
+        else:
+            state.unread_count = await self.session.scalar(
+                select(func.count(MessageORM.id)).where(
+                    MessageORM.chat_id == chat_id,
+                    MessageORM.id > state.last_read_message_id,
+                    MessageORM.sender_id != user_id,
+                    MessageORM.is_deleted == False,
+                )
+            ) or 0
+        state.updated_at = datetime.utcnow()
+        await self.session.commit()
+        await self.session.refresh(state)
+        return state
+
+    async def get_for_user(self, user_id: int) -> List[ChatReadStateORM]:
+        query = select(ChatReadStateORM).where(ChatReadStateORM.user_id == user_id)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_for_chat(self, chat_id: int, user_ids: Iterable[int]) -> Dict[int, ChatReadStateORM]:
+        query = select(ChatReadStateORM).where(
+            ChatReadStateORM.chat_id == chat_id,
+            ChatReadStateORM.user_id.in_(list(user_ids)),
+        )
+        result = await self.session.execute(query)
+        return {state.user_id: state for state in result.scalars().all()}
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-import re
+from collections import deque
 from dataclasses import dataclass
-from typing import Iterable, Pattern
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 from src.infrastructure.monitoring.logger import logger
 
@@ -12,6 +12,7 @@ class ModerationResult:
     sanitized_text: str
     flagged: bool
     reason: str | None = None
+    matches: Tuple[str, ...] = ()
 
 
 class ContentRejectedError(Exception):
@@ -21,37 +22,195 @@ class ContentRejectedError(Exception):
         self.sanitized_text = sanitized_text
 
 
+# Латиница, похожая на кириллицу, и ё приводятся к одному виду в тексте и в словаре
+_HOMOGLYPHS = str.maketrans(
+    {
+        "a": "а",
+        "b": "в",
+        "c": "с",
+        "e": "е",
+        "h": "н",
+        "k": "к",
+        "m": "м",
+        "o": "о",
+        "p": "р",
+        "t": "т",
+        "x": "х",
+        "y": "у",
+        "ё": "е",
+    }
+)
+
+# (длина, только целым словом, исходный термин)
+_Output = Tuple[int, bool, str]
+
+
+def canonicalize(text: str) -> str:
+    """Нижний регистр и замена гомоглифов без изменения длины строки.
+
+    Позиции в канонической строке совпадают с позициями исходного текста, поэтому
+    найденные участки маскируются прямо в оригинале.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Редкие символы (например, «İ») раскрываются в несколько — их не трогаем
+        lowered = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+    return lowered.translate(_HOMOGLYPHS)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class _Automaton:
+    """Автомат Ахо–Корасик по каноническим формам терминов."""
+
+    __slots__ = ("goto", "fail", "out")
+
+    def __init__(self, terms: Iterable[Tuple[str, bool]]) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[_Output, ...]] = [()]
+
+        own: Dict[int, List[_Output]] = {}
+        for term, whole_word in terms:
+            key = canonicalize(term)
+            if not key:
+                continue
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            own.setdefault(state, []).append((len(key), whole_word, term))
+
+        # BFS: суффиксные ссылки и объединение выходов с выходами по ссылке
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.out[state] = tuple(own.get(state, ()))
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = tuple(own.get(nxt, ())) + self.out[self.fail[nxt]]
+                queue.append(nxt)
+
+    def scan(self, canonical: str) -> List[Tuple[int, int, str]]:
+        goto, fail, out = self.goto, self.fail, self.out
+        size = len(canonical)
+        spans: List[Tuple[int, int, str]] = []
+        state = 0
+        for index, ch in enumerate(canonical):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = index + 1
+            for length, whole_word, term in out[state]:
+                start = end - length
+                if whole_word and (
+                    (start > 0 and _is_word_char(canonical[start - 1]))
+                    or (end < size and _is_word_char(canonical[end]))
+                ):
+                    continue
+                spans.append((start, end, term))
+        return spans
+
+
 class ContentFilter:
-    """Примитивная фильтрация сообщений от нецензурной лексики и запрещённого контента."""
+    """Фильтрация сообщений от нецензурной лексики и запрещённого контента.
 
-    def __init__(self, banned_terms: Iterable[str] | None = None) -> None:
-        self.banned_terms = tuple(sorted(set(banned_terms or []), key=len, reverse=True))
-        self._pattern: Pattern[str] | None = None
-        if self.banned_terms:
-            escaped = [re.escape(term) for term in self.banned_terms]
-            self._pattern = re.compile(rf"\b({'|'.join(escaped)})\b", re.IGNORECASE)
+    ``banned_terms`` совпадают только целым словом, ``banned_stems`` — в любом месте
+    слова (корни вроде «пизд»). Поиск идёт одним проходом автомата Ахо–Корасик по
+    тексту с приведённым регистром и гомоглифами, маскирование — по найденным
+    участкам исходного текста.
+    """
 
-    def evaluate(self, text: str, *, context: dict | None = None) -> ModerationResult:
-        if not text or not self._pattern:
-            return ModerationResult(sanitized_text=text, flagged=False)
+    reason = "Message contains prohibited language"
 
-        matches = list(self._pattern.finditer(text))
-        if not matches:
+    def __init__(
+        self,
+        banned_terms: Iterable[str] | None = None,
+        banned_stems: Iterable[str] | None = None,
+    ) -> None:
+        self.banned_terms = tuple(sorted(set(banned_terms or []), key=len, reverse=True))
+        self.banned_stems = tuple(sorted(set(banned_stems or []), key=len, reverse=True))
+        self._automaton: _Automaton | None = None
+        if self.banned_terms or self.banned_stems:
+            self._automaton = _Automaton(
+                [(term, True) for term in self.banned_terms]
+                + [(stem, False) for stem in self.banned_stems]
+            )
+
+    def _moderate(self, text: str) -> ModerationResult:
+        if not text or self._automaton is None:
             return ModerationResult(sanitized_text=text, flagged=False)
 
-        sanitized = self._pattern.sub(lambda match: "*" * len(match.group(0)), text)
-        reason = "Message contains prohibited language"
+        spans = self._automaton.scan(canonicalize(text))
+        if not spans:
+            return ModerationResult(sanitized_text=text, flagged=False)
 
-        logger.security(
-            "chat_message_blocked",
-            user_id=(context or {}).get("user_id"),
-            ip_address=(context or {}).get("ip_address"),
-            reason=reason,
-            sanitized=sanitized,
-            context=context or {},
+        spans.sort()
+        parts: List[str] = []
+        cursor = 0
+        for start, end, _ in spans:
+            if end <= cursor:
+                continue
+            start = max(start, cursor)
+            parts.append(text[cursor:start])
+            parts.append("*" * (end - start))
+            cursor = end
+        parts.append(text[cursor:])
+
+        matches = tuple(dict.fromkeys(term for _, _, term in spans))
+        return ModerationResult(
+            sanitized_text="".join(parts),
+            flagged=True,
+            reason=self.reason,
+            matches=matches,
         )
 
-        return ModerationResult(sanitized_text=sanitized, flagged=True, reason=reason)
+    def evaluate(self, text: str, *, context: dict | None = None) -> ModerationResult:
+        result = self._moderate(text)
+        if result.flagged:
+            logger.security(
+                "chat_message_blocked",
+                user_id=(context or {}).get("user_id"),
+                ip_address=(context or {}).get("ip_address"),
+                reason=result.reason,
+                sanitized=result.sanitized_text,
+                context=context or {},
+            )
+        return result
+
+    def evaluate_many(self, texts: Sequence[str], *, context: dict | None = None) -> List[ModerationResult]:
+        """Пакетная проверка (разбор очереди модерации).
+
+        В журнал безопасности пишется одно сводное событие на пакет, а не по
+        событию на каждое сообщение.
+        """
+        results = [self._moderate(text) for text in texts]
+        flagged = sum(1 for result in results if result.flagged)
+        if flagged:
+            logger.security(
+                "content_batch_moderated",
+                user_id=(context or {}).get("user_id"),
+                ip_address=(context or {}).get("ip_address"),
+                total=len(results),
+                flagged=flagged,
+                context=context or {},
+            )
+        return results
 
     def enforce(self, text: str, *, context: dict | None = None) -> str:
         result = self.evaluate(text, context=context)
@@ -62,14 +221,14 @@ class ContentFilter:
 
 default_banned_terms = [
     "черт",
-    "блять",
     "сука",
+]
+
+default_banned_stems = [
+    "блять",
     "пизд",
     "fuck",
     "shit",
 ]
 
-default_content_filter = ContentFilter(default_banned_terms)
-
-
-
+default_content_filter = ContentFilter(default_banned_terms, default_banned_stems)
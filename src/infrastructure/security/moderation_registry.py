@@ -0,0 +1,211 @@
+"""
+Реестр словаря модерации с горячей перезагрузкой.
+Термины хранятся в таблице moderation_terms; автомат собирается в отдельном потоке
+и подменяется одной операцией присваивания. Собранный фильтр сохраняется в снимок
+на диске по хэшу словаря, чтобы воркеры при старте не компилировали его заново.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.cache.invalidation_bus import InvalidationBus, invalidation_bus
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import ModerationTermORM
+from src.infrastructure.security import content_filter as content_filter_module
+from src.infrastructure.security.content_filter import (
+    ContentFilter,
+    default_banned_stems,
+    default_banned_terms,
+    default_content_filter,
+)
+
+MODERATION_TOPIC = "moderation"
+MATCH_MODE_WORD = "word"
+MATCH_MODE_STEM = "stem"
+# Формат снимка: увеличить при несовместимом изменении ContentFilter
+SNAPSHOT_FORMAT = 1
+# Снимок, собранный другой версией кода фильтра, не подходит даже при том же словаре
+_FILTER_CODE_DIGEST = hashlib.sha256(Path(content_filter_module.__file__).read_bytes()).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class ModerationSnapshot:
+    version: int
+    digest: str
+    content_filter: ContentFilter
+    terms_count: int
+
+
+def dictionary_digest(words: List[str], stems: List[str]) -> str:
+    hasher = hashlib.sha256()
+    for mode, terms in ((MATCH_MODE_WORD, words), (MATCH_MODE_STEM, stems)):
+        for term in sorted(terms):
+            hasher.update(f"{mode}\0{term}\n".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ModerationRegistry:
+    """Версионированная ссылка на актуальный ``ContentFilter``."""
+
+    def __init__(
+        self,
+        initial_filter: ContentFilter,
+        *,
+        snapshot_dir: str,
+        reload_interval: float = 60.0,
+        bus: InvalidationBus = invalidation_bus,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.reload_interval = reload_interval
+        self._bus = bus
+        self._session_factory = session_factory
+        self._snapshot = ModerationSnapshot(
+            version=0,
+            digest=dictionary_digest(list(initial_filter.banned_terms), list(initial_filter.banned_stems)),
+            content_filter=initial_filter,
+            terms_count=len(initial_filter.banned_terms) + len(initial_filter.banned_stems),
+        )
+        self._reload_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> ModerationSnapshot:
+        return self._snapshot
+
+    @property
+    def filter(self) -> ContentFilter:
+        return self._snapshot.content_filter
+
+    # region snapshot file
+    def _snapshot_path(self, digest: str) -> Path:
+        return self.snapshot_dir / f"moderation-v{SNAPSHOT_FORMAT}-{_FILTER_CODE_DIGEST}-{digest[:32]}.pickle"
+
+    def _load_or_build(self, digest: str, words: List[str], stems: List[str]) -> ContentFilter:
+        """Выполняется в отдельном потоке: чтение снимка или сборка автомата."""
+        path = self._snapshot_path(digest)
+        try:
+            with path.open("rb") as handle:
+                content_filter = pickle.load(handle)
+            if isinstance(content_filter, ContentFilter):
+                return content_filter
+        except FileNotFoundError:
+            pass
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Moderation snapshot unreadable, rebuilding", error=str(exc))
+
+        content_filter = ContentFilter(words, stems)
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                pickle.dump(content_filter, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            for stale in self.snapshot_dir.glob("moderation-*.pickle"):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+        except OSError as exc:
+            logger.warning("Moderation snapshot not saved", error=str(exc))
+        return content_filter
+
+    # endregion
+
+    async def _ensure_seeded(self) -> None:
+        """Перенести встроенный словарь в пустую таблицу (первый запуск)."""
+        async with self._session_factory() as session:
+            total = (await session.execute(select(func.count(ModerationTermORM.id)))).scalar_one()
+            if total:
+                return
+            rows = [{"term": term, "match_mode": MATCH_MODE_WORD} for term in default_banned_terms]
+            rows += [{"term": term, "match_mode": MATCH_MODE_STEM} for term in default_banned_stems]
+            try:
+                await session.execute(insert(ModerationTermORM), rows)
+                await session.commit()
+            except IntegrityError:
+                # Таблицу параллельно заполнил другой воркер
+                await session.rollback()
+
+    async def _load_terms(self) -> Tuple[List[str], List[str]]:
+        async with self._session_factory() as session:
+            rows = await session.execute(select(ModerationTermORM.term, ModerationTermORM.match_mode))
+            words: List[str] = []
+            stems: List[str] = []
+            for term, mode in rows:
+                (stems if mode == MATCH_MODE_STEM else words).append(term)
+        return words, stems
+
+    async def reload(self, *, force: bool = False) -> ModerationSnapshot:
+        """Перечитать словарь и подменить фильтр, если содержимое изменилось."""
+        async with self._reload_lock:
+            words, stems = await self._load_terms()
+            digest = dictionary_digest(words, stems)
+            current = self._snapshot
+            if digest == current.digest and not force:
+                return current
+
+            content_filter = await asyncio.to_thread(self._load_or_build, digest, words, stems)
+            self._snapshot = ModerationSnapshot(
+                version=current.version + 1,
+                digest=digest,
+                content_filter=content_filter,
+                terms_count=len(words) + len(stems),
+            )
+            logger.info("Moderation dictionary reloaded")
+            return self._snapshot
+
+    async def _on_invalidate(self, payload: Dict[str, Any]) -> None:
+        await self.reload()
+
+    async def _run(self) -> None:
+        # Периодическая сверка страхует от потерянных pub/sub-уведомлений
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Moderation dictionary reload failed", error=str(exc))
+
+    async def start(self) -> None:
+        self._bus.subscribe(MODERATION_TOPIC, self._on_invalidate)
+        try:
+            await self._ensure_seeded()
+            await self.reload()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Moderation dictionary not loaded, using defaults", error=str(exc))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def notify_changed(self) -> ModerationSnapshot:
+        """Пересобрать словарь у себя и оповестить остальные воркеры."""
+        await self._bus.publish(MODERATION_TOPIC)
+        return self._snapshot
+
+
+# Глобальный реестр словаря модерации
+moderation_registry = ModerationRegistry(
+    default_content_filter,
+    snapshot_dir=settings.moderation_snapshot_dir,
+    reload_interval=settings.moderation_reload_interval,
+)
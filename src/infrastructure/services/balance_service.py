@@ -0,0 +1,282 @@
+"""
+Балансы пользователей на основе журнала проводок (double-entry).
+Каждое движение денег — перевод из нескольких проводок с нулевой суммой
+в ``balance_entries`` (целые минимальные единицы валюты: копейки, сотые TF).
+Колонки ``users.rub_balance``/``users.tf_balance`` — проекция журнала: они
+меняются только относительным UPDATE в той же транзакции, что и проводки,
+а списание проходит лишь при достаточном остатке. Методы не делают commit —
+перевод фиксируется вместе с остальными изменениями вызывающего кода.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.repositiry.db_models import BalanceEntryORM, CurrencyTypeEnum, UserORM
+
+MINOR_UNITS = 100
+
+# Служебные счета платформы; у них нет проекции, только проводки
+PLATFORM_REVENUE = "platform:revenue"
+PLATFORM_PAYOUTS = "platform:payouts"
+EXTERNAL_FUNDS = "external:funds"
+OPENING_EQUITY = "equity:opening"
+
+BALANCE_COLUMNS = {
+    CurrencyTypeEnum.RUB: UserORM.rub_balance,
+    CurrencyTypeEnum.TF: UserORM.tf_balance,
+}
+
+# Проекция хранится во float: сравнение с нулём допускает погрешность округления
+_ROUNDING_TOLERANCE = 0.005
+
+
+def to_minor(amount: float) -> int:
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_minor(amount: int) -> float:
+    return amount / MINOR_UNITS
+
+
+def user_account(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class InsufficientFundsError(Exception):
+    def __init__(self, user_id: int, required: float, available: float, currency: CurrencyTypeEnum) -> None:
+        super().__init__(f"Insufficient funds for user {user_id}: required {required}, available {available}")
+        self.user_id = user_id
+        self.required = required
+        self.available = available
+        self.currency = currency
+
+
+class DuplicateTransferError(Exception):
+    """Перевод с таким transfer_id уже проведён (повтор запроса)."""
+
+
+@dataclass(frozen=True)
+class Leg:
+    """Проводка перевода: счёт и сумма в минимальных единицах (минус — списание)."""
+
+    account: str
+    amount: int
+    user_id: Optional[int] = None
+
+    @classmethod
+    def for_user(cls, user_id: int, amount: int) -> "Leg":
+        return cls(user_account(user_id), amount, user_id)
+
+
+@dataclass(frozen=True)
+class Settlement:
+    """Элемент пакетного начисления/списания (сумма в единицах валюты, со знаком)."""
+
+    user_id: int
+    amount: float
+    currency: CurrencyTypeEnum = CurrencyTypeEnum.RUB
+
+
+class BalanceLedger:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def transfer(
+        self,
+        currency: CurrencyTypeEnum,
+        kind: str,
+        legs: Sequence[Leg],
+        reference: Optional[str] = None,
+        transfer_id: Optional[str] = None,
+    ) -> str:
+        """Провести перевод: проводки одним INSERT, проекции одним условным UPDATE."""
+        # Несколько проводок на один счёт сворачиваются в одну
+        merged: Dict[str, Leg] = {}
+        for leg in legs:
+            previous = merged.get(leg.account)
+            merged[leg.account] = Leg(leg.account, leg.amount + (previous.amount if previous else 0), leg.user_id)
+        legs = [leg for leg in merged.values() if leg.amount]
+        if sum(leg.amount for leg in legs) != 0:
+            raise ValueError("Transfer legs must sum to zero")
+        if not legs:
+            return transfer_id or ""
+        transfer_id = transfer_id or uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        try:
+            # Savepoint: при повторе перевода откатывается только эта вставка
+            async with self.session.begin_nested():
+                await self.session.execute(
+                    insert(BalanceEntryORM.__table__),
+                    [
+                        {
+                            "transfer_id": transfer_id,
+                            "account": leg.account,
+                            "user_id": leg.user_id,
+                            "currency": currency,
+                            "amount": leg.amount,
+                            "kind": kind,
+                            "reference": reference,
+                            "created_at": now,
+                        }
+                        for leg in legs
+                    ],
+                )
+        except IntegrityError as exc:
+            raise DuplicateTransferError(transfer_id) from exc
+
+        deltas: Dict[int, int] = {}
+        for leg in legs:
+            if leg.user_id is not None:
+                deltas[leg.user_id] = deltas.get(leg.user_id, 0) + leg.amount
+        await self._apply_projection(currency, deltas)
+        return transfer_id
+
+    async def _apply_projection(self, currency: CurrencyTypeEnum, deltas: Dict[int, int]) -> None:
+        deltas = {user_id: amount for user_id, amount in deltas.items() if amount}
+        if not deltas:
+            return
+        column = BALANCE_COLUMNS[currency]
+        delta = case({user_id: from_minor(amount) for user_id, amount in deltas.items()}, value=UserORM.id)
+        stmt = (
+            update(UserORM)
+            .where(UserORM.id.in_(list(deltas)))
+            .values({column: func.round(column + delta, 2)})
+            .execution_options(synchronize_session=False)
+        )
+        debited = [user_id for user_id, amount in deltas.items() if amount < 0]
+        if debited:
+            # Остаток проверяется и меняется одним запросом под блокировкой строки
+            stmt = stmt.where(or_(UserORM.id.notin_(debited), column + delta >= -_ROUNDING_TOLERANCE))
+
+        result = await self.session.execute(stmt)
+        if result.rowcount != len(deltas):
+            balances = await self.balances(debited, currency)
+            for user_id in debited:
+                available = balances.get(user_id, 0.0)
+                required = from_minor(-deltas[user_id])
+                if available + _ROUNDING_TOLERANCE < required:
+                    raise InsufficientFundsError(user_id, required, available, currency)
+            raise LookupError("User not found")
+
+    async def debit(
+        self,
+        user_id: int,
+        currency: CurrencyTypeEnum,
+        amount: float,
+        kind: str,
+        reference: Optional[str] = None,
+        counterparty: str = PLATFORM_REVENUE,
+        transfer_id: Optional[str] = None,
+    ) -> str:
+        minor = to_minor(amount)
+        return await self.transfer(
+            currency,
+            kind,
+            [Leg.for_user(user_id, -minor), Leg(counterparty, minor)],
+            reference=reference,
+            transfer_id=transfer_id,
+        )
+
+    async def credit(
+        self,
+        user_id: int,
+        currency: CurrencyTypeEnum,
+        amount: float,
+        kind: str,
+        reference: Optional[str] = None,
+        counterparty: str = EXTERNAL_FUNDS,
+        transfer_id: Optional[str] = None,
+    ) -> str:
+        minor = to_minor(amount)
+        return await self.transfer(
+            currency,
+            kind,
+            [Leg.for_user(user_id, minor), Leg(counterparty, -minor)],
+            reference=reference,
+            transfer_id=transfer_id,
+        )
+
+    async def adjust_to(
+        self,
+        user_id: int,
+        currency: CurrencyTypeEnum,
+        target: float,
+        kind: str = "admin_adjustment",
+        reference: Optional[str] = None,
+    ) -> Optional[str]:
+        """Довести баланс до ``target`` корректирующей проводкой (правка из админки)."""
+        column = BALANCE_COLUMNS[currency]
+        current = await self.session.scalar(select(column).where(UserORM.id == user_id).with_for_update())
+        difference = to_minor(target) - to_minor(current or 0.0)
+        if not difference:
+            return None
+        return await self.transfer(
+            currency,
+            kind,
+            [Leg.for_user(user_id, difference), Leg(EXTERNAL_FUNDS, -difference)],
+            reference=reference,
+        )
+
+    async def settle_batch(
+        self,
+        settlements: Iterable[Settlement],
+        kind: str,
+        reference: Optional[str] = None,
+        counterparty: str = PLATFORM_PAYOUTS,
+        transfer_id: Optional[str] = None,
+    ) -> List[str]:
+        """Пакет начислений и списаний: по одному переводу на валюту.
+
+        Все проводки валюты — один INSERT, все проекции — один UPDATE с CASE.
+        Если хоть одному пользователю не хватает средств, пакет не проводится.
+        """
+        by_currency: Dict[CurrencyTypeEnum, List[Leg]] = {}
+        for item in settlements:
+            legs = by_currency.setdefault(item.currency, [])
+            legs.append(Leg.for_user(item.user_id, to_minor(item.amount)))
+
+        transfer_ids = []
+        for currency, legs in by_currency.items():
+            balance = -sum(leg.amount for leg in legs)
+            legs.append(Leg(counterparty, balance))
+            suffix = f":{currency.value}" if transfer_id else ""
+            transfer_ids.append(
+                await self.transfer(
+                    currency,
+                    kind,
+                    legs,
+                    reference=reference,
+                    transfer_id=f"{transfer_id}{suffix}" if transfer_id else None,
+                )
+            )
+        return transfer_ids
+
+    async def balances(self, user_ids: Iterable[int], currency: CurrencyTypeEnum) -> Dict[int, float]:
+        """Текущая проекция для нескольких пользователей одним запросом."""
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return {}
+        column = BALANCE_COLUMNS[currency]
+        rows = (await self.session.execute(select(UserORM.id, column).where(UserORM.id.in_(user_ids)))).all()
+        return {user_id: float(value or 0.0) for user_id, value in rows}
+
+    async def ledger_totals(self, user_ids: Optional[Iterable[int]] = None) -> Dict[tuple, int]:
+        """Суммы журнала ``(user_id, currency) -> минимальные единицы`` для сверки с проекцией."""
+        stmt = (
+            select(BalanceEntryORM.user_id, BalanceEntryORM.currency, func.sum(BalanceEntryORM.amount))
+            .where(BalanceEntryORM.user_id.is_not(None))
+            .group_by(BalanceEntryORM.user_id, BalanceEntryORM.currency)
+        )
+        if user_ids is not None:
+            stmt = stmt.where(BalanceEntryORM.user_id.in_(list(user_ids)))
+        rows = (await self.session.execute(stmt)).all()
+        return {(user_id, CurrencyTypeEnum(currency)): int(total or 0) for user_id, currency, total in rows}
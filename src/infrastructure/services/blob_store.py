@@ -0,0 +1,283 @@
+"""
+Хранилище загрузок по хэшу содержимого.
+Файл лежит в ``<upload_dir>/<sha[:2]>/<sha256><ext>`` в единственном экземпляре,
+сколько бы раз его ни загружали. ``upload_blobs.ref_count`` считает ссылки из
+портфолио (media_url/attachment_url) и меняется в той же транзакции, что и работа.
+Файлы без ссылок дольше ``upload_gc_grace`` удаляет фоновый сборщик пачками.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import UploadBlobORM
+from src.infrastructure.services.image_service import remove_derivatives
+from src.infrastructure.services.upload_service import (
+    UPLOAD_DIR,
+    UPLOAD_URL_PREFIX,
+    StoredUpload,
+    UploadSink,
+)
+
+_BLOB_URL = re.compile(r"^/assets/uploads/[0-9a-f]{2}/([0-9a-f]{64})(?:\.[a-z0-9]+)?$")
+SHA256_PATTERN = r"^[0-9a-fA-F]{64}$"
+
+
+def blob_name(sha256: str, extension: str) -> str:
+    return f"{sha256[:2]}/{sha256}{extension}"
+
+
+def blob_url(name: str) -> str:
+    return f"{UPLOAD_URL_PREFIX}/{name}"
+
+
+def digest_from_url(url: Optional[str]) -> Optional[str]:
+    """SHA-256 из URL хранилища; для старых и внешних ссылок — None."""
+    if not url:
+        return None
+    match = _BLOB_URL.match(url.split("?", 1)[0])
+    return match.group(1) if match else None
+
+
+def _unlink_missing_ok(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class BlobStore:
+    def __init__(self, session: AsyncSession, directory: str = UPLOAD_DIR):
+        self.session = session
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, *name.split("/"))
+
+    def _stored(self, blob_row, deduplicated: bool) -> StoredUpload:
+        sha256, name, size, content_type = blob_row
+        return StoredUpload(
+            name=name,
+            path=self._path(name),
+            url=blob_url(name),
+            size=size,
+            content_type=content_type,
+            sha256=sha256,
+            deduplicated=deduplicated,
+        )
+
+    async def _touch(self, sha256: str) -> Optional[tuple]:
+        """Продлить жизнь существующему файлу без ссылок; None, если файла нет в базе."""
+        # UPDATE, а не SELECT: строку, которую сейчас удаляет сборщик, ждём и не находим
+        result = await self.session.execute(
+            update(UploadBlobORM)
+            .where(UploadBlobORM.sha256 == sha256)
+            .values(
+                orphaned_at=case((UploadBlobORM.ref_count == 0, datetime.utcnow()), else_=None)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            return None
+        row = await self.session.execute(
+            select(UploadBlobORM.sha256, UploadBlobORM.name, UploadBlobORM.size, UploadBlobORM.content_type)
+            .where(UploadBlobORM.sha256 == sha256)
+        )
+        return row.first()
+
+    async def reuse(self, sha256: str) -> Optional[StoredUpload]:
+        """Готовый файл с таким хэшем, если он есть (загрузку можно не передавать)."""
+        blob_row = await self._touch(sha256.lower())
+        if blob_row is None or not await asyncio.to_thread(os.path.exists, self._path(blob_row[1])):
+            await self.session.rollback()
+            return None
+        await self.session.commit()
+        return self._stored(blob_row, deduplicated=True)
+
+    async def store(self, sink: UploadSink) -> StoredUpload:
+        """Сохранить принятый файл; повтор содержимого отбрасывается без второй копии."""
+        await sink.finish()
+        sha256 = sink.sha256
+        created: Optional[str] = None
+        try:
+            blob_row = await self._touch(sha256)
+            if blob_row is not None and await asyncio.to_thread(os.path.exists, self._path(blob_row[1])):
+                await sink.abort()
+                await self.session.commit()
+                return self._stored(blob_row, deduplicated=True)
+
+            # Сначала строка: до коммита она заблокирована, и сборщик не удалит
+            # файл, а параллельная загрузка того же содержимого ждёт нас
+            new_row = (sha256, blob_name(sha256, sink.extension), sink.size, sink.content_type)
+            while blob_row is None:
+                try:
+                    async with self.session.begin_nested():
+                        await self.session.execute(
+                            insert(UploadBlobORM).values(
+                                sha256=sha256,
+                                name=new_row[1],
+                                size=sink.size,
+                                content_type=sink.content_type,
+                                ref_count=0,
+                                orphaned_at=datetime.utcnow(),
+                            )
+                        )
+                    blob_row = new_row
+                except IntegrityError:
+                    # Тот же файл параллельно загрузил другой запрос
+                    blob_row = await self._touch(sha256)
+
+            name = blob_row[1]
+            path = self._path(name)
+            existed = await asyncio.to_thread(os.path.exists, path)
+            # Одинаковое содержимое: замена файла параллельной загрузкой безопасна
+            await sink.publish(path)
+            if not existed:
+                created = path
+            await self.session.commit()
+        except BaseException:
+            await self.session.rollback()
+            # Строка не записана: созданный этим запросом файл никто не найдёт
+            if created is not None:
+                await asyncio.to_thread(_unlink_missing_ok, created)
+            raise
+        return self._stored((sha256, name, sink.size, sink.content_type), deduplicated=False)
+
+    async def _shift(self, urls: Iterable[Optional[str]], sign: int) -> None:
+        counts = Counter(digest for digest in map(digest_from_url, urls) if digest)
+        by_amount: Dict[int, List[str]] = {}
+        for digest, amount in counts.items():
+            by_amount.setdefault(amount, []).append(digest)
+
+        now = datetime.utcnow()
+        for amount, digests in by_amount.items():
+            stmt = update(UploadBlobORM).where(UploadBlobORM.sha256.in_(digests))
+            if sign > 0:
+                stmt = stmt.values(ref_count=UploadBlobORM.ref_count + amount, orphaned_at=None)
+            else:
+                # orphaned_at первым: MySQL вычисляет SET слева направо уже по новым значениям
+                stmt = stmt.ordered_values(
+                    (
+                        UploadBlobORM.orphaned_at,
+                        case((UploadBlobORM.ref_count <= amount, now), else_=UploadBlobORM.orphaned_at),
+                    ),
+                    (
+                        UploadBlobORM.ref_count,
+                        case((UploadBlobORM.ref_count > amount, UploadBlobORM.ref_count - amount), else_=0),
+                    ),
+                )
+            await self.session.execute(stmt.execution_options(synchronize_session=False))
+
+    async def retain(self, urls: Iterable[Optional[str]]) -> None:
+        """Учесть новые ссылки на файлы. Коммит — за вызывающим кодом."""
+        await self._shift(urls, 1)
+
+    async def release(self, urls: Iterable[Optional[str]]) -> None:
+        """Снять ссылки; файл без ссылок удалит сборщик. Коммит — за вызывающим кодом."""
+        await self._shift(urls, -1)
+
+
+class BlobGarbageCollector:
+    """Периодическое удаление файлов, на которые давно никто не ссылается."""
+
+    def __init__(
+        self,
+        interval: float = 3600.0,
+        batch_size: int = 200,
+        grace: float = 24 * 3600.0,
+        directory: str = UPLOAD_DIR,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.grace = grace
+        self.directory = directory
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def _unlink(self, names: List[str]) -> None:
+        for name in names:
+            path = os.path.join(self.directory, *name.split("/"))
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            # Уменьшенные копии лежат рядом с оригиналом
+            remove_derivatives(path)
+
+    async def collect_batch(self) -> int:
+        """Удалить одну пачку; возвращает число удалённых файлов."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.grace)
+        async with self._session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(UploadBlobORM.sha256, UploadBlobORM.name)
+                    .where(UploadBlobORM.ref_count == 0, UploadBlobORM.orphaned_at < cutoff)
+                    .order_by(UploadBlobORM.orphaned_at)
+                    .limit(self.batch_size)
+                    # Параллельный воркер берёт следующую пачку, а не ждёт эту
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                return 0
+            await session.execute(
+                delete(UploadBlobORM)
+                .where(UploadBlobORM.sha256.in_([sha256 for sha256, _ in rows]), UploadBlobORM.ref_count == 0)
+                .execution_options(synchronize_session=False)
+            )
+            # Файлы удаляются под блокировкой строк: повторная загрузка того же
+            # содержимого дождётся коммита и положит файл заново
+            await asyncio.to_thread(self._unlink, [name for _, name in rows])
+            await session.commit()
+        return len(rows)
+
+    async def collect(self) -> int:
+        removed = 0
+        while True:
+            batch = await self.collect_batch()
+            removed += batch
+            if batch < self.batch_size:
+                return removed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                removed = await self.collect()
+                if removed:
+                    logger.info("Unreferenced uploads removed", count=removed)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Upload garbage collection failed", error=str(exc))
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальный сборщик неиспользуемых загрузок
+blob_gc = BlobGarbageCollector(
+    interval=settings.upload_gc_interval,
+    batch_size=settings.upload_gc_batch_size,
+    grace=settings.upload_gc_grace,
+)
@@ -1,28 +1,18 @@
 from src.infrastructure.repositiry.chat_repository import ChatRepository
-from src.domain.entity.chatentity import Chat
-from typing import List, Optional
+from src.infrastructure.repositiry.read_state_repository import ChatReadStateRepository
+from src.domain.entity.chatentity import Chat, ChatReadState
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime
 
 class ChatService:
     def __init__(self, session):
         self.chat_repo = ChatRepository(session)
+        self.read_state_repo = ChatReadStateRepository(session)
         self.session = session
 
     async def get_or_create_chat_between_users(self, user1_id: int, user2_id: int, order_id: Optional[int] = None) -> Chat:
-        # Сначала проверяем, есть ли уже чат между этими пользователями
-        existing_chat = await self.chat_repo.get_chat_between_users(user1_id, user2_id)
-        
-        if existing_chat:
-            return Chat(
-                id=existing_chat.id,
-                user1_id=existing_chat.customer_id,
-                user2_id=existing_chat.executor_id,
-                order_id=existing_chat.order_id,
-                created_at=existing_chat.created_at
-            )
-        
-        # Если чата нет, создаем новый
-        chat_orm = await self.chat_repo.create(user1_id, user2_id, order_id)
+        # Один чат на пару: поиск по уникальному ключу, при промахе — вставка без гонки
+        chat_orm = await self.chat_repo.get_or_create_between_users(user1_id, user2_id, order_id)
         
         return Chat(
             id=chat_orm.id,
@@ -69,4 +59,25 @@ class ChatService:
             user2_id=chat_orm.executor_id,
             order_id=chat_orm.order_id,
             created_at=chat_orm.created_at
-        )
\ No newline at end of file
+        )
+
+    async def mark_chat_read(self, chat_id: int, user_id: int, message_id: Optional[int] = None) -> ChatReadState:
+        state = await self.read_state_repo.mark_read(chat_id, user_id, message_id)
+        return self._to_read_state(state)
+
+    async def get_unread_counters(self, user_id: int) -> List[ChatReadState]:
+        states = await self.read_state_repo.get_for_user(user_id)
+        return [self._to_read_state(state) for state in states]
+
+    async def get_read_states(self, chat_id: int, user_ids: Iterable[int]) -> Dict[int, ChatReadState]:
+        states = await self.read_state_repo.get_for_chat(chat_id, user_ids)
+        return {user_id: self._to_read_state(state) for user_id, state in states.items()}
+
+    @staticmethod
+    def _to_read_state(state) -> ChatReadState:
+        return ChatReadState(
+            chat_id=state.chat_id,
+            user_id=state.user_id,
+            last_read_message_id=state.last_read_message_id or 0,
+            unread_count=state.unread_count or 0,
+        )
@@ -5,13 +5,17 @@ from __future__ import annotations
 import json
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from src.infrastructure.cache.content_cache import content_list_cache
+from src.infrastructure.cache.view_counter import view_counter
 from src.infrastructure.repositiry.db_models import ContentLikeORM, ContentORM, UserORM
+from src.infrastructure.services.tag_service import CONTENT_SCOPE, TagService
 
 
 class ContentType(str, Enum):
@@ -52,6 +56,7 @@ class ContentService:
         if session is None:
             raise ValueError("AsyncSession is required for ContentService")
         self.session = session
+        self.tags = TagService(session)
 
     # region helpers
     @staticmethod
@@ -81,21 +86,27 @@ class ContentService:
     def _normalize_status(value: str) -> str:
         return value.lower()
 
-    def _serialize(self, content: ContentORM, author: Optional[UserORM]) -> Dict[str, Any]:
+    def _serialize(
+        self,
+        content: ContentORM,
+        author: Optional[UserORM],
+        tags: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
         return {
             "id": content.id,
             "title": content.title,
             "content": content.content,
             "type": content.type,
             "status": content.status,
-            "tags": self._load_tags(content.tags),
+            # JSON-колонка остаётся резервом для строк, ещё не попавших в индекс тегов
+            "tags": tags if tags else self._load_tags(content.tags),
             "author_id": content.author_id,
             "author_name": author.name if author else "",
             "author_nickname": author.nickname if author else "",
             "created_at": content.created_at,
             "updated_at": content.updated_at,
             "published_at": content.published_at,
-            "views": content.views,
+            "views": (content.views or 0) + view_counter.pending(content.id),
             "likes": content.likes,
             "is_published": content.is_published,
         }
@@ -114,13 +125,14 @@ class ContentService:
         now = datetime.utcnow()
         normalized_type = self._normalize_type(content_type)
         status = ContentStatus.PUBLISHED.value if is_published else ContentStatus.DRAFT.value
+        tag_names = TagService.normalize(tags)
 
         new_content = ContentORM(
             title=title,
             content=content,
             type=normalized_type,
             status=status,
-            tags=self._dump_tags(tags),
+            tags=self._dump_tags(tag_names),
             author_id=author_id,
             created_at=now,
             updated_at=now,
@@ -129,11 +141,17 @@ class ContentService:
         )
 
         self.session.add(new_content)
+        await self.session.flush()
+        await self.tags.set_content_tags(
+            new_content.id, tag_names, was_published=False, is_published=is_published
+        )
         await self.session.commit()
         await self.session.refresh(new_content)
+        if is_published:
+            await content_list_cache.invalidate(normalized_type)
 
         author = await self.session.get(UserORM, author_id)
-        return self._serialize(new_content, author)
+        return self._serialize(new_content, author, tag_names)
 
     async def get_content_list(
         self,
@@ -143,6 +161,7 @@ class ContentService:
         page: int = 1,
         page_size: int = 20,
         only_published: bool = False,
+        tag: Optional[str] = None,
     ) -> Dict[str, Any]:
         filters = []
         if content_type:
@@ -159,6 +178,8 @@ class ContentService:
                     ContentORM.content.ilike(pattern),
                 )
             )
+        if tag:
+            filters.append(ContentORM.id.in_(TagService.content_ids_with_tag(tag)))
 
         where_clause = and_(*filters) if filters else None
 
@@ -178,8 +199,9 @@ class ContentService:
         if where_clause is not None:
             data_stmt = data_stmt.where(where_clause)
 
-        rows = await self.session.execute(data_stmt)
-        items = [self._serialize(content, author) for content, author in rows]
+        rows = (await self.session.execute(data_stmt)).all()
+        tags_by_id = await self.tags.content_tags_for(content.id for content, _ in rows)
+        items = [self._serialize(content, author, tags_by_id.get(content.id)) for content, author in rows]
 
         return {
             "content": items,
@@ -189,6 +211,37 @@ class ContentService:
             "total_pages": (total + page_size - 1) // page_size if page_size else 1,
         }
 
+    async def get_published_content_list(
+        self,
+        content_type: Optional[str] = None,
+        status: Optional[str] = ContentStatus.PUBLISHED.value,
+        search: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20,
+        tag: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """Публичная лента через кэш: возвращает (payload, etag)."""
+        return await content_list_cache.get_or_load(
+            content_type,
+            status,
+            search,
+            page,
+            page_size,
+            lambda: self.get_content_list(
+                content_type=content_type,
+                status=status,
+                search=search,
+                page=page,
+                page_size=page_size,
+                only_published=True,
+                tag=tag,
+            ),
+            tag=TagService.normalize_one(tag) if tag else None,
+        )
+
+    async def get_tag_facets(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.tags.facets(CONTENT_SCOPE, limit)
+
     async def get_content_by_id(self, content_id: int) -> Optional[Dict[str, Any]]:
         stmt = (
             select(ContentORM, UserORM)
@@ -200,17 +253,12 @@ class ContentService:
         if not row:
             return None
         content, author = row
-        return self._serialize(content, author)
+        tags_by_id = await self.tags.content_tags_for([content.id])
+        return self._serialize(content, author, tags_by_id.get(content.id))
 
     async def increment_views(self, content_id: int) -> None:
-        result = await self.session.execute(
-            select(ContentORM).where(ContentORM.id == content_id).with_for_update()
-        )
-        content = result.scalar_one_or_none()
-        if content:
-            content.views += 1
-            content.updated_at = datetime.utcnow()
-            await self.session.commit()
+        # Просмотры буферизуются и сбрасываются в БД пакетно, без блокировки строки
+        view_counter.increment(content_id)
 
     async def update_content(
         self,
@@ -230,22 +278,30 @@ class ContentService:
             if not author or author.nickname != "admin":
                 return None
 
+        was_published = bool(content_obj.is_published)
         if title is not None:
             content_obj.title = title
         if content is not None:
             content_obj.content = content
-        if tags is not None:
-            content_obj.tags = self._dump_tags(tags)
         if is_published is not None:
             content_obj.is_published = is_published
             content_obj.status = ContentStatus.PUBLISHED.value if is_published else ContentStatus.DRAFT.value
             content_obj.published_at = datetime.utcnow() if is_published else None
+        if tags is not None:
+            tag_names = await self.tags.set_content_tags(
+                content_id, tags, was_published=was_published, is_published=bool(content_obj.is_published)
+            )
+            content_obj.tags = self._dump_tags(tag_names)
+        else:
+            await self.tags.set_content_published(content_id, was_published, bool(content_obj.is_published))
 
         content_obj.updated_at = datetime.utcnow()
         await self.session.commit()
         await self.session.refresh(content_obj)
+        await content_list_cache.invalidate(content_obj.type)
         author = await self.session.get(UserORM, content_obj.author_id)
-        return self._serialize(content_obj, author)
+        tags_by_id = await self.tags.content_tags_for([content_id])
+        return self._serialize(content_obj, author, tags_by_id.get(content_id))
 
     async def delete_content(self, content_id: int, user_id: int) -> bool:
         content_obj = await self.session.get(ContentORM, content_id)
@@ -256,49 +312,101 @@ class ContentService:
         if user_id != content_obj.author_id and (not author or author.nickname != "admin"):
             return False
 
+        content_type = content_obj.type
+        await self.tags.remove_content(content_id, bool(content_obj.is_published))
         await self.session.delete(content_obj)
         await self.session.commit()
+        await content_list_cache.invalidate(content_type)
         return True
 
     async def toggle_like(self, content_id: int, user_id: int) -> Dict[str, Any]:
-        content_obj = await self.session.get(ContentORM, content_id)
-        if not content_obj:
+        removed = await self.session.execute(self._delete_like_stmt(content_id, user_id))
+        if removed.rowcount:
+            await self.session.execute(self._likes_delta_stmt(content_id, -1))
+            await self.session.commit()
+            return await self._like_result(content_id, liked=False)
+        return await self.like(content_id, user_id)
+
+    async def like(self, content_id: int, user_id: int) -> Dict[str, Any]:
+        """Идемпотентно поставить лайк: повторный вызов не меняет счётчик."""
+        try:
+            await self.session.execute(
+                insert(ContentLikeORM).values(
+                    content_id=content_id,
+                    user_id=user_id,
+                    created_at=datetime.utcnow(),
+                )
+            )
+        except IntegrityError:
+            # лайк уже существует (уникальный индекс content_id + user_id)
+            await self.session.rollback()
+            return await self._like_result(content_id, liked=True)
+
+        updated = await self.session.execute(self._likes_delta_stmt(content_id, 1))
+        if not updated.rowcount:
+            await self.session.rollback()
             return {"success": False, "message": "Content not found"}
+        await self.session.commit()
+        return await self._like_result(content_id, liked=True)
 
-        like_stmt = (
-            select(ContentLikeORM)
-            .where(ContentLikeORM.content_id == content_id, ContentLikeORM.user_id == user_id)
-            .with_for_update()
-        )
-        like_result = await self.session.execute(like_stmt)
-        like = like_result.scalar_one_or_none()
+    async def unlike(self, content_id: int, user_id: int) -> Dict[str, Any]:
+        """Идемпотентно снять лайк."""
+        removed = await self.session.execute(self._delete_like_stmt(content_id, user_id))
+        if removed.rowcount:
+            await self.session.execute(self._likes_delta_stmt(content_id, -1))
+        await self.session.commit()
+        return await self._like_result(content_id, liked=False)
 
-        liked = False
-        if like:
-            await self.session.delete(like)
-            content_obj.likes = max(0, content_obj.likes - 1)
-        else:
-            new_like = ContentLikeORM(content_id=content_id, user_id=user_id)
-            self.session.add(new_like)
-            content_obj.likes += 1
-            liked = True
+    async def get_liked_content_ids(self, user_id: int, content_ids: Iterable[int]) -> Set[int]:
+        """Какие из переданных материалов лайкнул пользователь — одним запросом на страницу."""
+        ids = list(set(content_ids))
+        if not ids:
+            return set()
+        result = await self.session.execute(
+            select(ContentLikeORM.content_id).where(
+                ContentLikeORM.user_id == user_id,
+                ContentLikeORM.content_id.in_(ids),
+            )
+        )
+        return set(result.scalars().all())
 
-        content_obj.updated_at = datetime.utcnow()
-        await self.session.commit()
-        await self.session.refresh(content_obj)
+    @staticmethod
+    def _delete_like_stmt(content_id: int, user_id: int):
+        return delete(ContentLikeORM).where(
+            ContentLikeORM.content_id == content_id,
+            ContentLikeORM.user_id == user_id,
+        )
 
-        return {"success": True, "liked": liked, "likes": content_obj.likes}
+    @staticmethod
+    def _likes_delta_stmt(content_id: int, delta: int):
+        stmt = update(ContentORM).where(ContentORM.id == content_id)
+        if delta < 0:
+            stmt = stmt.where(ContentORM.likes > 0)
+        return stmt.values(
+            likes=ContentORM.likes + delta,
+            updated_at=ContentORM.updated_at,
+        ).execution_options(synchronize_session=False)
+
+    async def _like_result(self, content_id: int, *, liked: bool) -> Dict[str, Any]:
+        likes = (
+            await self.session.execute(select(ContentORM.likes).where(ContentORM.id == content_id))
+        ).scalar_one_or_none()
+        if likes is None:
+            return {"success": False, "message": "Content not found"}
+        return {"success": True, "liked": liked, "likes": likes}
 
     async def approve_content(self, content_id: int, editor_id: int) -> bool:
         content_obj = await self.session.get(ContentORM, content_id)
         if not content_obj:
             return False
 
+        await self.tags.set_content_published(content_id, bool(content_obj.is_published), True)
         content_obj.status = ContentStatus.PUBLISHED.value
         content_obj.is_published = True
         content_obj.published_at = datetime.utcnow()
         content_obj.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content_obj.type)
         return True
 
     async def reject_content(self, content_id: int, editor_id: int) -> bool:
@@ -306,10 +414,28 @@ class ContentService:
         if not content_obj:
             return False
 
+        await self.tags.set_content_published(content_id, bool(content_obj.is_published), False)
         content_obj.status = ContentStatus.REJECTED.value
         content_obj.is_published = False
         content_obj.updated_at = datetime.utcnow()
         await self.session.commit()
+        await content_list_cache.invalidate(content_obj.type)
         return True
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+
+
+async def warm_published_content_cache(session_factory, pages: int, page_size: int = 20) -> None:
+    """Прогрев первых страниц публичной ленты для каждого типа контента."""
+    content_types: List[Optional[str]] = [None, *(item.value for item in ContentType)]
+    async with session_factory() as session:
+        service = ContentService(session)
+        for content_type in content_types:
+            for page in range(1, pages + 1):
+                payload, _ = await service.get_published_content_list(
+                    content_type=content_type,
+                    page=page,
+                    page_size=page_size,
+                )
+                if page >= payload["total_pages"]:
+                    break
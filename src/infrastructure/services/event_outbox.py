@@ -0,0 +1,120 @@
+"""
+Исходящий журнал событий чатов для каждого пользователя.
+Событие записывается в БД до отправки. id строки служит номером в последовательности,
+поэтому клиент после переподключения передаёт последний полученный номер
+и получает только пропущенные события.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, insert_returning_ids
+from src.infrastructure.repositiry.db_models import UserEventORM
+
+
+class EventOutbox:
+    """Журнал ``user_id -> события`` с ограниченным временем хранения."""
+
+    def __init__(
+        self,
+        ttl: int = 72 * 3600,
+        replay_limit: int = 500,
+        purge_interval: float = 600.0,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.ttl = ttl
+        self.replay_limit = replay_limit
+        self.purge_interval = purge_interval
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    async def append(self, user_ids: Iterable[int], event: Dict[str, Any]) -> Dict[int, int]:
+        """Записать событие для каждого получателя. Возвращает ``user_id -> seq``."""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        payload = json.dumps(event, ensure_ascii=False)
+        now = datetime.utcnow()
+        rows = [{"user_id": user_id, "payload": payload, "created_at": now} for user_id in user_ids]
+        async with self._session_factory() as session:
+            ids = await insert_returning_ids(session, UserEventORM.__table__, rows)
+            await session.commit()
+        return dict(zip(user_ids, ids))
+
+    async def replay(self, user_id: int, after_seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Пропущенные события одним запросом по индексу ``(user_id, id)``.
+
+        Второй элемент — True, если пропущено больше ``replay_limit`` событий или
+        часть уже удалена по TTL: тогда клиенту нужна полная пересинхронизация.
+        """
+        # Читаем и само событие after_seq: если его уже нет (удалено по TTL),
+        # между ним и первым сохранившимся событием мог быть разрыв
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(UserEventORM.id, UserEventORM.payload)
+                .where(UserEventORM.user_id == user_id, UserEventORM.id >= after_seq)
+                .order_by(UserEventORM.id)
+                .limit(self.replay_limit + 2)
+            )
+            rows = result.all()
+
+        anchored = bool(rows) and rows[0].id == after_seq
+        if anchored:
+            rows = rows[1:]
+        truncated = (after_seq > 0 and not anchored) or len(rows) > self.replay_limit
+        rows = rows[:self.replay_limit]
+        events = []
+        for seq, payload in rows:
+            event = json.loads(payload)
+            event["seq"] = seq
+            events.append(event)
+        return events, truncated
+
+    async def purge(self) -> int:
+        """Удалить события старше TTL."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        async with self._session_factory() as session:
+            result = await session.execute(
+                delete(UserEventORM)
+                .where(UserEventORM.created_at < cutoff)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount or 0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Event outbox purge failed", error=str(exc))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальный журнал событий
+event_outbox = EventOutbox(
+    ttl=settings.ws_outbox_ttl,
+    replay_limit=settings.ws_outbox_replay_limit,
+    purge_interval=settings.ws_outbox_purge_interval,
+)
@@ -0,0 +1,170 @@
+"""
+Потоковая выгрузка данных для админки в CSV и NDJSON.
+Строки читаются серверным курсором порциями по ``batch_size`` и сразу
+кодируются в ответ, поэтому память воркера не зависит от размера выгрузки.
+"""
+from __future__ import annotations
+
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from sqlalchemy.sql import Select
+
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import MessageORM, OrderORM, ReviewORM, UserORM
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Выгружаются только перечисленные колонки: без паролей, токенов и ORM-объектов
+EXPORTS: Dict[str, Select] = {
+    "users": select(
+        UserORM.id,
+        UserORM.name,
+        UserORM.nickname,
+        UserORM.email,
+        UserORM.role,
+        UserORM.rub_balance,
+        UserORM.tf_balance,
+        UserORM.customer_rating,
+        UserORM.executor_rating,
+        UserORM.done_count,
+        UserORM.taken_count,
+        UserORM.phone_verified,
+        UserORM.admin_verified,
+        UserORM.created_at,
+        UserORM.last_login,
+    ).order_by(UserORM.id),
+    "orders": select(
+        OrderORM.id,
+        OrderORM.title,
+        OrderORM.description,
+        OrderORM.price,
+        OrderORM.currency,
+        OrderORM.status,
+        OrderORM.priority,
+        OrderORM.order_type,
+        OrderORM.term,
+        OrderORM.responses,
+        OrderORM.customer_id,
+        OrderORM.executor_id,
+        OrderORM.category_id,
+        OrderORM.created_at,
+        OrderORM.deadline,
+        OrderORM.completed_at,
+    ).order_by(OrderORM.id),
+    "messages": select(
+        MessageORM.id,
+        MessageORM.chat_id,
+        MessageORM.sender_id,
+        MessageORM.message_type,
+        MessageORM.content,
+        MessageORM.file_path,
+        MessageORM.is_deleted,
+        MessageORM.created_at,
+        MessageORM.edited_at,
+    ).order_by(MessageORM.id),
+    "reviews": select(
+        ReviewORM.id,
+        ReviewORM.type,
+        ReviewORM.rate,
+        ReviewORM.text,
+        ReviewORM.response,
+        ReviewORM.sender_id,
+        ReviewORM.recipient_id,
+        ReviewORM.order_id,
+        ReviewORM.created_at,
+    ).order_by(ReviewORM.id),
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return value
+
+
+def _csv_cell(value: Any) -> Any:
+    value = _plain(value)
+    # Формулы в ячейках выполняются табличными редакторами при открытии файла
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+async def limit_rows(partitions: AsyncIterator[Sequence[Any]], limit: Optional[int]) -> AsyncIterator[Sequence[Any]]:
+    """Обрезать поток порций после ``limit`` строк."""
+    remaining = limit
+    async for rows in partitions:
+        if remaining is not None:
+            rows = rows[:remaining]
+            remaining -= len(rows)
+        if rows:
+            yield rows
+        if remaining is not None and remaining <= 0:
+            break
+
+
+async def encode_rows(
+    columns: List[str], partitions: AsyncIterator[Sequence[Any]], fmt: str
+) -> AsyncIterator[bytes]:
+    """Закодировать порции строк в CSV (с заголовком) или NDJSON."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        # BOM, чтобы Excel распознал UTF-8
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+        async for rows in partitions:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_cell(value) for value in row] for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+        return
+
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_plain) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+async def stream_result(
+    result: AsyncResult, fmt: str, limit: Optional[int] = None, size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Отдать уже выполненный потоковый результат и закрыть курсор."""
+    try:
+        columns = list(result.keys())
+        async for chunk in encode_rows(columns, limit_rows(result.partitions(size), limit), fmt):
+            yield chunk
+    finally:
+        await result.close()
+
+
+async def stream_export(
+    name: str,
+    fmt: str,
+    batch_size: int = 1000,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> AsyncIterator[bytes]:
+    """Выгрузка таблицы из ``EXPORTS``; сессия живёт, пока идёт ответ."""
+    statement = EXPORTS[name].execution_options(yield_per=batch_size)
+    async with session_factory() as session:
+        result = await session.stream(statement)
+        async for chunk in stream_result(result, fmt):
+            yield chunk
@@ -4,11 +4,13 @@
 Сервис для работы с избранными заказами
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Set
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.infrastructure.cache.favorite_cache import favorite_ids
 from src.infrastructure.repositiry.db_models import CategoryORM, FavoriteOrderORM, OrderORM, UserORM
 
 class FavoriteService:
@@ -17,45 +19,37 @@ class FavoriteService:
 
     async def add_to_favorites(self, user_id: int, order_id: int) -> FavoriteOrderORM:
         """Добавить заказ в избранное"""
-        # Проверяем, не добавлен ли уже заказ в избранное
-        existing = await self.session.execute(
-            select(FavoriteOrderORM).where(
-                and_(
-                    FavoriteOrderORM.user_id == user_id,
-                    FavoriteOrderORM.order_id == order_id
-                )
-            )
-        )
-        if existing.scalar_one_or_none():
-            raise ValueError("Заказ уже в избранном")
-        
         favorite = FavoriteOrderORM(
             user_id=user_id,
             order_id=order_id
         )
         
         self.session.add(favorite)
-        await self.session.commit()
-        await self.session.refresh(favorite)
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            # Повтор пары отсекает уникальный индекс (user_id, order_id)
+            await self.session.rollback()
+            raise ValueError("Заказ уже в избранном")
+        await favorite_ids.publish_change(user_id)
         return favorite
 
     async def remove_from_favorites(self, user_id: int, order_id: int) -> bool:
         """Удалить заказ из избранного"""
         result = await self.session.execute(
-            select(FavoriteOrderORM).where(
+            delete(FavoriteOrderORM).where(
                 and_(
                     FavoriteOrderORM.user_id == user_id,
                     FavoriteOrderORM.order_id == order_id
                 )
             )
         )
-        favorite = result.scalar_one_or_none()
+        await self.session.commit()
         
-        if not favorite:
+        if not result.rowcount:
             return False
         
-        await self.session.delete(favorite)
-        await self.session.commit()
+        await favorite_ids.publish_change(user_id)
         return True
 
     async def get_user_favorites(self, user_id: int, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
@@ -123,18 +117,17 @@ class FavoriteService:
 
     async def is_favorite(self, user_id: int, order_id: int) -> bool:
         """Проверить, находится ли заказ в избранном"""
-        result = await self.session.execute(
-            select(FavoriteOrderORM).where(
-                and_(
-                    FavoriteOrderORM.user_id == user_id,
-                    FavoriteOrderORM.order_id == order_id
-                )
-            )
-        )
-        return result.scalar_one_or_none() is not None
+        return order_id in await self.favorite_order_ids(user_id, [order_id])
+
+    async def favorite_order_ids(self, user_id: int, order_ids: Iterable[int]) -> Set[int]:
+        """Избранные среди ``order_ids`` — для отметок на целой странице ленты"""
+        return await favorite_ids.contains_many(self.session, user_id, order_ids)
 
     async def get_favorite_count(self, user_id: int) -> int:
         """Получить количество избранных заказов пользователя"""
+        ids = await favorite_ids.get(self.session, user_id)
+        if ids is not None:
+            return len(ids)
         result = await self.session.execute(
             select(func.count()).select_from(FavoriteOrderORM).where(
                 FavoriteOrderORM.user_id == user_id
@@ -0,0 +1,258 @@
+"""
+Уменьшенные копии изображений портфолио (WebP/JPEG нескольких ширин).
+Копия лежит рядом с оригиналом: ``ab/<sha256>.320w.webp``. Рендер идёт в пуле
+процессов (Pillow держит GIL на декодировании), копия создаётся при первом
+запросе или заранее после загрузки. Один и тот же вариант рисуется один раз:
+внутри воркера запросы ждут общую задачу, между процессами — lock-файл.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import settings
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.services.upload_service import UPLOAD_DIR
+
+# format -> (формат Pillow, MIME, расширение)
+VARIANT_FORMATS: Dict[str, Tuple[str, str, str]] = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+IMAGE_EXTENSIONS = {".jpg", ".png", ".gif", ".webp"}
+MEDIA_URL_PREFIX = "/api/v1/portfolio/media"
+
+_BLOB_NAME = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{64})(\.[a-z0-9]+)$")
+_BLOB_URL = re.compile(r"^/assets/uploads/([0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+)$")
+# Сколько ждать чужой рендер, прежде чем счесть lock-файл брошенным
+_LOCK_STALE_AFTER = 60.0
+
+
+def _split(name: str) -> Optional[Tuple[str, str, str]]:
+    match = _BLOB_NAME.match(name)
+    if match is None or match.group(3) not in IMAGE_EXTENSIONS:
+        return None
+    return match.group(1), match.group(2), match.group(3)
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    shard, sha256, _ = _split(name)
+    return f"{shard}/{sha256}.{width}w{VARIANT_FORMATS[fmt][2]}"
+
+
+def _render(source: str, destination: str, width: int, fmt: str, quality: int) -> None:
+    from PIL import Image, ImageOps
+
+    pil_format = VARIANT_FORMATS[fmt][0]
+    with Image.open(source) as original:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        original.draft("RGB", (width, width * 4))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        if pil_format == "JPEG" and image.mode != "RGB":
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.split()[-1])
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        temp_path = f"{destination}.{os.getpid()}.tmp"
+        options = {"quality": quality}
+        if pil_format == "JPEG":
+            options.update(optimize=True, progressive=True)
+        else:
+            options.update(method=4)
+        try:
+            image.save(temp_path, format=pil_format, **options)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+    os.replace(temp_path, destination)
+
+
+def _unlink_missing_ok(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def render_variant(source: str, destination: str, width: int, fmt: str, quality: int) -> Optional[str]:
+    """Нарисовать вариант, если его ещё нет (выполняется в процессе пула).
+
+    None — оригинал удалён сборщиком до или во время рендера.
+    """
+    lock_path = f"{destination}.lock"
+    while not os.path.exists(destination):
+        if not os.path.exists(source):
+            return None
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Этот вариант рисует другой процесс
+            try:
+                if time.time() - os.path.getmtime(lock_path) > _LOCK_STALE_AFTER:
+                    os.unlink(lock_path)
+            except FileNotFoundError:
+                pass
+            time.sleep(0.05)
+            continue
+        try:
+            os.close(lock_fd)
+            if not os.path.exists(destination):
+                try:
+                    _render(source, destination, width, fmt, quality)
+                except FileNotFoundError:
+                    if os.path.exists(source):
+                        raise
+                    return None
+                # Сборщик мог удалить оригинал во время рендера: копия осталась бы сиротой
+                if not os.path.exists(source):
+                    _unlink_missing_ok(destination)
+                    return None
+        finally:
+            # Ожидающий процесс мог счесть lock брошенным и уже удалить его
+            _unlink_missing_ok(lock_path)
+    return destination
+
+
+def remove_derivatives(path: str) -> int:
+    """Удалить все варианты оригинала ``path`` (при удалении самого файла)."""
+    directory, file_name = os.path.split(path)
+    prefix = file_name.split(".", 1)[0] + "."
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.name.startswith(prefix) and entry.name != file_name:
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    width: int
+    format: str
+    url: str
+
+
+class ImagePipeline:
+    """Пул процессов рендера и дедупликация одновременных запросов варианта."""
+
+    def __init__(
+        self,
+        widths: Iterable[int] = (320, 640, 1280),
+        formats: Iterable[str] = ("webp", "jpeg"),
+        max_workers: int = 2,
+        quality: int = 80,
+        directory: str = UPLOAD_DIR,
+    ):
+        self.widths = tuple(sorted(set(widths)))
+        self.formats = tuple(fmt for fmt in formats if fmt in VARIANT_FORMATS)
+        self.max_workers = max_workers
+        self.quality = quality
+        self.directory = directory
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        if self._pool is None:
+            # spawn: форк процесса с циклом событий и потоками небезопасен
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def stop(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        self._background.clear()
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, *name.split("/"))
+
+    @staticmethod
+    def source_name(url: Optional[str]) -> Optional[str]:
+        """Имя оригинала в хранилище для URL изображения; None — не наше изображение."""
+        if not url:
+            return None
+        match = _BLOB_URL.match(url.split("?", 1)[0])
+        if match is None or _split(match.group(1)) is None:
+            return None
+        return match.group(1)
+
+    def variants_for(self, url: Optional[str]) -> List[ImageVariant]:
+        name = self.source_name(url)
+        if name is None:
+            return []
+        return [
+            ImageVariant(width, fmt, f"{MEDIA_URL_PREFIX}/{name}?w={width}&format={fmt}")
+            for fmt in self.formats
+            for width in self.widths
+        ]
+
+    async def ensure(self, name: str, width: int, fmt: str) -> Optional[str]:
+        """Путь к готовому варианту; None, если оригинала нет или это не изображение."""
+        if _split(name) is None or width not in self.widths or fmt not in self.formats:
+            return None
+        source = self._path(name)
+        destination = self._path(variant_name(name, width, fmt))
+        if await asyncio.to_thread(os.path.exists, destination):
+            return destination
+        if not await asyncio.to_thread(os.path.exists, source):
+            return None
+
+        future = self._inflight.get(destination)
+        if future is None:
+            self.start()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._pool, render_variant, source, destination, width, fmt, self.quality
+            )
+            self._inflight[destination] = future
+            future.add_done_callback(lambda _: self._inflight.pop(destination, None))
+        # shield: отмена одного запроса не отменяет рендер для остальных
+        return await asyncio.shield(future)
+
+    async def _warm(self, name: str) -> None:
+        for fmt in self.formats:
+            for width in self.widths:
+                try:
+                    await self.ensure(name, width, fmt)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Image variant rendering failed", name=name, width=width, error=str(exc))
+                    return
+
+    def schedule(self, url: Optional[str]) -> None:
+        """Подготовить все варианты заранее (после загрузки), не задерживая ответ."""
+        name = self.source_name(url)
+        if name is None:
+            return
+        task = asyncio.create_task(self._warm(name))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# Глобальный конвейер изображений
+image_pipeline = ImagePipeline(
+    widths=settings.image_variant_widths,
+    formats=settings.image_variant_formats,
+    max_workers=settings.image_workers,
+    quality=settings.image_quality,
+)
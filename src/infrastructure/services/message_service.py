@@ -4,12 +4,16 @@ from typing import List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entity.messageentity import Message
+from src.infrastructure.cache.chat_membership import chat_membership
+from src.config import settings
 from src.infrastructure.repositiry.message_repository import MessageRepository
+from src.infrastructure.repositiry.message_writer import MessageWriteBatcher, message_writer
+from src.infrastructure.repositiry.read_state_repository import ChatReadStateRepository
 from src.infrastructure.security.content_filter import (
     ContentRejectedError,
     ContentFilter,
-    default_content_filter,
 )
+from src.infrastructure.security.moderation_registry import moderation_registry
 
 class MessageService:
     def __init__(
@@ -17,12 +21,21 @@ class MessageService:
         repo_or_session: Union[MessageRepository, AsyncSession],
         *,
         content_filter: ContentFilter | None = None,
+        writer: MessageWriteBatcher | None = None,
     ):
         if isinstance(repo_or_session, MessageRepository):
             self.message_repo = repo_or_session
         else:
             self.message_repo = MessageRepository(repo_or_session)
-        self.content_filter = content_filter or default_content_filter
+        self.read_state_repo = ChatReadStateRepository(self.message_repo.session)
+        self._content_filter = content_filter
+        # Пакетная запись; без неё каждое сообщение пишется отдельной транзакцией
+        self.writer = writer or (message_writer if settings.message_batching_enabled else None)
+
+    @property
+    def content_filter(self) -> ContentFilter:
+        # Без явного фильтра берётся актуальная версия словаря из реестра
+        return self._content_filter or moderation_registry.filter
 
     async def send_message(
         self,
@@ -47,7 +60,17 @@ class MessageService:
             message_type=message_type,
             file_path=file_url
         )
-        return await self.message_repo.add_message(message)
+        # Счётчик непрочитанных растёт у всех участников, кроме отправителя
+        membership = await chat_membership.get(chat_id, self.message_repo.session)
+        recipients = [user for user in membership.participants if user != sender_id] if membership else []
+
+        if self.writer is not None:
+            return await self.writer.submit(message, recipients)
+
+        saved = await self.message_repo.add_message(message)
+        if recipients:
+            await self.read_state_repo.increment_unread(chat_id, recipients)
+        return saved
 
     async def get_messages(self, chat_id: int) -> List[Message]:
         return await self.message_repo.get_messages_by_chat_id(chat_id)
@@ -0,0 +1,66 @@
+"""Сервис словаря модерации (таблица moderation_terms)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.repositiry.db_models import ModerationTermORM
+from src.infrastructure.security.moderation_registry import MATCH_MODE_STEM, MATCH_MODE_WORD
+
+MATCH_MODES = (MATCH_MODE_WORD, MATCH_MODE_STEM)
+
+
+class ModerationService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _serialize(term: ModerationTermORM) -> Dict[str, Any]:
+        return {
+            "id": term.id,
+            "term": term.term,
+            "match_mode": term.match_mode,
+            "created_by": term.created_by,
+            "created_at": term.created_at,
+        }
+
+    async def list_terms(self, match_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        stmt = select(ModerationTermORM).order_by(ModerationTermORM.term)
+        if match_mode:
+            stmt = stmt.where(ModerationTermORM.match_mode == match_mode)
+        rows = await self.session.execute(stmt)
+        return [self._serialize(term) for term in rows.scalars().all()]
+
+    async def add_terms(self, terms: Iterable[str], match_mode: str, created_by: Optional[int] = None) -> int:
+        """Добавить термины; уже существующие пропускаются. Возвращает число добавленных."""
+        if match_mode not in MATCH_MODES:
+            raise ValueError("Invalid match mode")
+        normalized = list(dict.fromkeys(term.strip().lower() for term in terms if term and term.strip()))
+        if not normalized:
+            return 0
+
+        existing = set(
+            (
+                await self.session.execute(
+                    select(ModerationTermORM.term).where(ModerationTermORM.term.in_(normalized))
+                )
+            ).scalars()
+        )
+        now = datetime.utcnow()
+        new_terms = [
+            ModerationTermORM(term=term, match_mode=match_mode, created_by=created_by, created_at=now)
+            for term in normalized
+            if term not in existing
+        ]
+        self.session.add_all(new_terms)
+        await self.session.commit()
+        return len(new_terms)
+
+    async def delete_term(self, term_id: int) -> bool:
+        result = await self.session.execute(delete(ModerationTermORM).where(ModerationTermORM.id == term_id))
+        await self.session.commit()
+        return bool(result.rowcount)
@@ -0,0 +1,77 @@
+"""
+Публикация заказа одной транзакцией.
+Комиссия списывается через журнал балансов условным UPDATE, поэтому параллельные
+публикации не уводят баланс в минус и не теряют списания. Заказ и новая категория
+вставляются в той же транзакции; категория берётся из справочника в памяти.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.cache.category_cache import CategoryRef, category_cache
+from src.infrastructure.repositiry.db_models import CategoryORM, CurrencyTypeEnum, OrderORM
+from src.infrastructure.services.balance_service import BalanceLedger
+
+
+@dataclass
+class PlacedOrder:
+    order: OrderORM
+    category: CategoryRef
+
+
+class OrderPlacementService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _resolve_category(self, category_id: Optional[int], category_name: Optional[str]) -> Tuple[CategoryRef, bool]:
+        if category_id:
+            ref = await category_cache.get_by_id(self.session, category_id)
+            name = category_name or f"Category {category_id}"
+        else:
+            ref = await category_cache.get_by_name(self.session, category_name)
+            name = category_name
+        if ref is not None:
+            return ref, False
+
+        category = CategoryORM(name=name)
+        self.session.add(category)
+        await self.session.flush()
+        return CategoryRef(category.id, category.name), True
+
+    async def place_order(
+        self,
+        customer_id: int,
+        currency: CurrencyTypeEnum,
+        fee: float,
+        category_id: Optional[int],
+        category_name: Optional[str],
+        **order_fields: Any,
+    ) -> PlacedOrder:
+        """Списать комиссию и создать заказ. При нехватке средств — InsufficientFundsError без изменений в БД."""
+        try:
+            category, created = await self._resolve_category(category_id, category_name)
+            order = OrderORM(
+                customer_id=customer_id,
+                currency=currency,
+                category_id=category.id,
+                **order_fields,
+            )
+            self.session.add(order)
+            # id заказа нужен для ссылки в проводке; при нехватке средств вставка откатится
+            await self.session.flush()
+            if fee > 0:
+                await BalanceLedger(self.session).debit(
+                    customer_id, currency, fee, kind="order_post_fee", reference=f"order:{order.id}"
+                )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        # В справочник попадает только закоммиченная категория
+        if created:
+            category_cache.put(category.id, category.name)
+        return PlacedOrder(order=order, category=category)
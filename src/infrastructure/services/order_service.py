@@ -1,5 +1,6 @@
 from src.infrastructure.repositiry.order_repository import OrderRepository
 from src.infrastructure.repositiry.db_models import CommissionSettingsORM
+from src.infrastructure.cache.commission_cache import CommissionSnapshot, commission_cache
 
 class OrderService:
     def __init__(self, session):
@@ -27,13 +28,9 @@ class OrderService:
     async def is_favorite(self, user_id, order_id):
         return await self.order_repo.is_favorite(user_id, order_id)
 
-    async def get_commission_settings(self, session):
-        settings = (await session.execute(
-            CommissionSettingsORM.__table__.select().limit(1)
-        )).first()
-        if settings and hasattr(settings, '_mapping'):
-            return settings._mapping
-        return None
+    async def get_commission_settings(self, session=None) -> CommissionSnapshot:
+        # Снимок из памяти процесса; БД читается только после изменения настроек или по TTL
+        return await commission_cache.get(session)
 
     async def set_commission_settings(self, session, **kwargs):
         self._validate_commission_settings(kwargs)
@@ -42,14 +39,19 @@ class OrderService:
         )).first()
         if settings and hasattr(settings, '_mapping'):
             settings_id = settings._mapping['id']
+            version = (settings._mapping.get('version') or 0) + 1
             await session.execute(
-                CommissionSettingsORM.__table__.update().where(CommissionSettingsORM.id == settings_id).values(**kwargs)
+                CommissionSettingsORM.__table__.update()
+                .where(CommissionSettingsORM.id == settings_id)
+                .values(version=CommissionSettingsORM.version + 1, **kwargs)
             )
         else:
+            version = 1
             await session.execute(
-                CommissionSettingsORM.__table__.insert().values(**kwargs)
+                CommissionSettingsORM.__table__.insert().values(version=version, **kwargs)
             )
-        await session.commit() 
+        await session.commit()
+        await commission_cache.publish_update(version)
 
     @staticmethod
     def _validate_commission_settings(values):
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.repositiry.db_models import PortfolioItemORM
+from src.infrastructure.services.blob_store import BlobStore
+from src.infrastructure.services.tag_service import PORTFOLIO_SCOPE, TagService
 
 
 class PortfolioService:
@@ -14,13 +16,23 @@ class PortfolioService:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.tags = TagService(session)
+        self.blobs = BlobStore(session)
 
-    async def list_by_user(self, user_id: int, *, limit: int | None = None) -> List[PortfolioItemORM]:
+    async def list_by_user(
+        self,
+        user_id: int,
+        *,
+        limit: int | None = None,
+        tag: Optional[str] = None,
+    ) -> List[PortfolioItemORM]:
         stmt = (
             select(PortfolioItemORM)
             .where(PortfolioItemORM.user_id == user_id)
             .order_by(PortfolioItemORM.created_at.desc())
         )
+        if tag:
+            stmt = stmt.where(PortfolioItemORM.id.in_(TagService.portfolio_ids_with_tag(tag)))
         if limit:
             stmt = stmt.limit(limit)
         result = await self.session.execute(stmt)
@@ -54,6 +66,9 @@ class PortfolioService:
             created_at=datetime.utcnow(),
         )
         self.session.add(item)
+        await self.session.flush()
+        await self.tags.set_portfolio_tags(item.id, tags, is_new=True)
+        await self.blobs.retain([media_url, attachment_url])
         await self.session.commit()
         await self.session.refresh(item)
         return item
@@ -87,18 +102,46 @@ class PortfolioService:
 
         data["updated_at"] = datetime.utcnow()
 
+        if media_url is not None or attachment_url is not None:
+            previous = await self._file_urls(item_id)
+            if previous is not None:
+                replaced = [
+                    (old, new)
+                    for old, new in zip(previous, (media_url, attachment_url))
+                    if new is not None and new != old
+                ]
+                await self.blobs.release([old for old, _ in replaced])
+                await self.blobs.retain([new for _, new in replaced])
+
         await self.session.execute(
             update(PortfolioItemORM)
             .where(PortfolioItemORM.id == item_id)
             .values(**data)
         )
+        if tags is not None:
+            await self.tags.set_portfolio_tags(item_id, tags)
         await self.session.commit()
         return await self.get_item(item_id)
 
     async def delete_item(self, item_id: int) -> None:
+        await self.tags.remove_portfolio_item(item_id)
+        previous = await self._file_urls(item_id)
+        if previous is not None:
+            await self.blobs.release(previous)
         await self.session.execute(
             delete(PortfolioItemORM).where(PortfolioItemORM.id == item_id)
         )
         await self.session.commit()
 
+    async def _file_urls(self, item_id: int) -> Optional[tuple]:
+        """``(media_url, attachment_url)`` работы под блокировкой строки."""
+        result = await self.session.execute(
+            select(PortfolioItemORM.media_url, PortfolioItemORM.attachment_url)
+            .where(PortfolioItemORM.id == item_id)
+            .with_for_update()
+        )
+        row = result.first()
+        return tuple(row) if row is not None else None
 
+    async def get_tag_facets(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.tags.facets(PORTFOLIO_SCOPE, limit)
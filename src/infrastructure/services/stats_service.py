@@ -0,0 +1,223 @@
+"""
+Поддерживаемые счётчики админской статистики.
+Инкрементальный проход читает только строки с id выше сохранённой отметки и
+раскладывает их по общему счётчику и по дням. Периодическая сверка пересчитывает
+всё заново и исправляет расхождения (удаления, поздно закоммиченные вставки).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional, Type
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.repositiry.db_models import (
+    MessageORM,
+    OrderORM,
+    StatCounterORM,
+    StatWatermarkORM,
+    SupportRequestORM,
+    UserORM,
+)
+
+TOTAL_BUCKET = "total"
+
+STAT_ENTITIES: Dict[str, Type] = {
+    "users": UserORM,
+    "orders": OrderORM,
+    "messages": MessageORM,
+    "support_requests": SupportRequestORM,
+}
+
+
+def _bucket(day) -> str:
+    # DATE() возвращает date в MySQL и строку в SQLite
+    return day.isoformat() if isinstance(day, date) else str(day)[:10]
+
+
+class StatsCounters:
+    """Счётчики ``(сущность, total | день) -> значение`` для админской панели."""
+
+    def __init__(
+        self,
+        refresh_interval: float = 10.0,
+        reconcile_interval: float = 3600.0,
+        day_buckets: int = 30,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.refresh_interval = refresh_interval
+        self.reconcile_interval = reconcile_interval
+        self.day_buckets = day_buckets
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._last_reconcile = 0.0
+
+    async def snapshot(self, day: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+        """Общие счётчики и счётчики за день одним запросом по первичному ключу."""
+        day_bucket = (day or datetime.utcnow().date()).isoformat()
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(StatCounterORM.entity, StatCounterORM.bucket, StatCounterORM.value)
+                .where(StatCounterORM.bucket.in_([TOTAL_BUCKET, day_bucket]))
+            )
+            rows = result.all()
+
+        snapshot = {entity: {"total": 0, "today": 0} for entity in STAT_ENTITIES}
+        for entity, bucket, value in rows:
+            key = "total" if bucket == TOTAL_BUCKET else "today"
+            snapshot.setdefault(entity, {"total": 0, "today": 0})[key] = value or 0
+        return snapshot
+
+    async def total(self, entity: str) -> Optional[int]:
+        """Общий счётчик сущности или None, если сверка ещё не проходила."""
+        async with self._session_factory() as session:
+            return await session.scalar(
+                select(StatCounterORM.value).where(
+                    StatCounterORM.entity == entity, StatCounterORM.bucket == TOTAL_BUCKET
+                )
+            )
+
+    async def refresh(self) -> int:
+        """Учесть строки, добавленные после отметки. Возвращает число учтённых строк."""
+        counted = 0
+        for entity, model in STAT_ENTITIES.items():
+            async with self._session_factory() as session:
+                counted += await self._advance(session, entity, model)
+        return counted
+
+    async def _advance(self, session: AsyncSession, entity: str, model) -> int:
+        watermark = await session.scalar(
+            select(StatWatermarkORM.last_id).where(StatWatermarkORM.entity == entity)
+        )
+        if watermark is None:
+            # Отметки ещё нет — счётчики заполнит сверка
+            return 0
+
+        day = func.date(model.created_at)
+        rows = (
+            await session.execute(
+                select(day, func.count(model.id), func.max(model.id))
+                .where(model.id > watermark)
+                .group_by(day)
+            )
+        ).all()
+        if not rows:
+            return 0
+
+        # Сдвиг отметки по принципу compare-and-set: параллельный воркер,
+        # успевший раньше, оставит нас без изменённых строк
+        moved = await session.execute(
+            update(StatWatermarkORM)
+            .where(StatWatermarkORM.entity == entity, StatWatermarkORM.last_id == watermark)
+            .values(last_id=max(row[2] for row in rows))
+        )
+        if moved.rowcount == 0:
+            await session.rollback()
+            return 0
+
+        total = sum(row[1] for row in rows)
+        await self._add(session, entity, TOTAL_BUCKET, total)
+        for created_day, count, _ in rows:
+            if created_day is not None:
+                await self._add(session, entity, _bucket(created_day), count)
+        await session.commit()
+        return total
+
+    @staticmethod
+    async def _add(session: AsyncSession, entity: str, bucket: str, amount: int) -> None:
+        bump = (
+            update(StatCounterORM)
+            .where(StatCounterORM.entity == entity, StatCounterORM.bucket == bucket)
+            .values(value=StatCounterORM.value + amount)
+        )
+        result = await session.execute(bump)
+        if result.rowcount == 0:
+            try:
+                async with session.begin_nested():
+                    await session.execute(
+                        insert(StatCounterORM).values(entity=entity, bucket=bucket, value=amount)
+                    )
+            except IntegrityError:
+                await session.execute(bump)
+
+    async def reconcile(self) -> None:
+        """Полный пересчёт: общий счётчик и последние ``day_buckets`` дней."""
+        since = datetime.combine(datetime.utcnow().date() - timedelta(days=self.day_buckets - 1), datetime.min.time())
+        for entity, model in STAT_ENTITIES.items():
+            async with self._session_factory() as session:
+                # Блокировка строки отметки не даёт инкрементальному проходу
+                # досчитать строки поверх пересчёта
+                watermark = await session.get(StatWatermarkORM, entity, with_for_update=True)
+                if watermark is not None and watermark.reconciled_at is not None and (
+                    datetime.utcnow() - watermark.reconciled_at
+                ).total_seconds() < self.reconcile_interval / 2:
+                    # Свежую сверку уже сделал другой воркер
+                    await session.rollback()
+                    continue
+                max_id = await session.scalar(select(func.max(model.id))) or 0
+                total = await session.scalar(select(func.count(model.id)).where(model.id <= max_id)) or 0
+                day = func.date(model.created_at)
+                per_day = (
+                    await session.execute(
+                        # Диапазон по created_at вместо DATE(created_at) = ... в условии
+                        select(day, func.count(model.id))
+                        .where(model.created_at >= since, model.id <= max_id)
+                        .group_by(day)
+                    )
+                ).all()
+
+                await session.execute(delete(StatCounterORM).where(StatCounterORM.entity == entity))
+                rows = [{"entity": entity, "bucket": TOTAL_BUCKET, "value": total}]
+                rows += [
+                    {"entity": entity, "bucket": _bucket(created_day), "value": count}
+                    for created_day, count in per_day
+                    if created_day is not None
+                ]
+                await session.execute(insert(StatCounterORM), rows)
+
+                if watermark is None:
+                    session.add(StatWatermarkORM(entity=entity, last_id=max_id, reconciled_at=datetime.utcnow()))
+                else:
+                    watermark.last_id = max_id
+                    watermark.reconciled_at = datetime.utcnow()
+                await session.commit()
+        self._last_reconcile = time.monotonic()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._last_reconcile >= self.reconcile_interval or not self._last_reconcile:
+                    await self.reconcile()
+                else:
+                    await self.refresh()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Admin stats counters update failed", error=str(exc))
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальные счётчики статистики
+stats_counters = StatsCounters(
+    refresh_interval=settings.stats_refresh_interval,
+    reconcile_interval=settings.stats_reconcile_interval,
+    day_buckets=settings.stats_day_buckets,
+)
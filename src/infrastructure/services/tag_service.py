@@ -0,0 +1,275 @@
+"""Нормализованный индекс тегов контента и портфолио."""
+
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.repositiry.db_models import (
+    ContentORM,
+    ContentTagORM,
+    PortfolioTagORM,
+    TagCountORM,
+    TagORM,
+)
+
+CONTENT_SCOPE = "content"
+PORTFOLIO_SCOPE = "portfolio"
+TAG_MAX_LENGTH = 64
+
+_PORTFOLIO_SEPARATORS = re.compile(r"[,;#\n]+")
+
+
+class TagService:
+    """Ведёт связи тегов и счётчики фасетов в рамках сессии вызывающего.
+
+    Методы не делают commit: изменения тегов попадают в ту же транзакцию, что и
+    сам материал. Счётчик ``content`` учитывает только опубликованные материалы,
+    ``portfolio`` — все работы.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # region normalization
+    @staticmethod
+    def normalize(tags: Optional[Iterable[str]]) -> List[str]:
+        """Привести теги к виду индекса: без регистра и повторов, порядок сохраняется."""
+        result: List[str] = []
+        seen = set()
+        for raw in tags or []:
+            name = " ".join(str(raw).split()).lower()[:TAG_MAX_LENGTH]
+            if name and name not in seen:
+                seen.add(name)
+                result.append(name)
+        return result
+
+    @classmethod
+    def normalize_one(cls, tag: str) -> str:
+        names = cls.normalize([tag])
+        return names[0] if names else ""
+
+    @classmethod
+    def parse_portfolio_tags(cls, raw: Optional[str]) -> List[str]:
+        """Разобрать свободную строку тегов портфолио (``python, ui #figma``)."""
+        if not raw:
+            return []
+        return cls.normalize(_PORTFOLIO_SEPARATORS.split(raw))
+
+    # endregion
+
+    async def _ensure_tags(self, names: List[str]) -> Dict[str, int]:
+        if not names:
+            return {}
+        rows = await self.session.execute(select(TagORM.name, TagORM.id).where(TagORM.name.in_(names)))
+        ids = dict(rows.all())
+        for name in names:
+            if name in ids:
+                continue
+            try:
+                async with self.session.begin_nested():
+                    result = await self.session.execute(
+                        insert(TagORM).values(name=name, created_at=datetime.utcnow())
+                    )
+                    tag_id = result.inserted_primary_key[0]
+                    await self.session.execute(
+                        insert(TagCountORM),
+                        [
+                            {"tag_id": tag_id, "scope": CONTENT_SCOPE, "count": 0},
+                            {"tag_id": tag_id, "scope": PORTFOLIO_SCOPE, "count": 0},
+                        ],
+                    )
+                ids[name] = tag_id
+            except IntegrityError:
+                # Тег успел создать параллельный запрос
+                ids[name] = (
+                    await self.session.execute(select(TagORM.id).where(TagORM.name == name))
+                ).scalar_one()
+        return ids
+
+    async def _apply_deltas(self, scope: str, deltas: Dict[int, int]) -> None:
+        by_delta: Dict[int, List[int]] = defaultdict(list)
+        for tag_id, delta in deltas.items():
+            if delta:
+                by_delta[delta].append(tag_id)
+        for delta, tag_ids in by_delta.items():
+            await self.session.execute(
+                update(TagCountORM)
+                .where(TagCountORM.scope == scope, TagCountORM.tag_id.in_(tag_ids))
+                .values(count=TagCountORM.count + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _replace_links(
+        self,
+        link_model,
+        owner_column,
+        owner_id: int,
+        names: List[str],
+        scope: str,
+        *,
+        was_counted: bool,
+        counted: bool,
+    ) -> None:
+        old_ids = list(
+            (await self.session.execute(select(link_model.tag_id).where(owner_column == owner_id))).scalars()
+        )
+        tag_ids = await self._ensure_tags(names)
+        new_ids = [tag_ids[name] for name in names]
+
+        await self.session.execute(delete(link_model).where(owner_column == owner_id))
+        if new_ids:
+            await self.session.execute(
+                insert(link_model),
+                [
+                    {owner_column.key: owner_id, "tag_id": tag_id, "position": position}
+                    for position, tag_id in enumerate(new_ids)
+                ],
+            )
+
+        deltas: Dict[int, int] = defaultdict(int)
+        if was_counted:
+            for tag_id in old_ids:
+                deltas[tag_id] -= 1
+        if counted:
+            for tag_id in new_ids:
+                deltas[tag_id] += 1
+        await self._apply_deltas(scope, deltas)
+
+    # region content
+    async def set_content_tags(
+        self,
+        content_id: int,
+        tags: Optional[Iterable[str]],
+        *,
+        was_published: bool,
+        is_published: bool,
+    ) -> List[str]:
+        names = self.normalize(tags)
+        await self._replace_links(
+            ContentTagORM,
+            ContentTagORM.content_id,
+            content_id,
+            names,
+            CONTENT_SCOPE,
+            was_counted=was_published,
+            counted=is_published,
+        )
+        return names
+
+    async def set_content_published(self, content_id: int, was_published: bool, is_published: bool) -> None:
+        """Учесть смену видимости материала в фасетах."""
+        if bool(was_published) == bool(is_published):
+            return
+        tag_ids = (
+            await self.session.execute(
+                select(ContentTagORM.tag_id).where(ContentTagORM.content_id == content_id)
+            )
+        ).scalars()
+        delta = 1 if is_published else -1
+        await self._apply_deltas(CONTENT_SCOPE, {tag_id: delta for tag_id in tag_ids})
+
+    async def remove_content(self, content_id: int, was_published: bool) -> None:
+        await self.set_content_published(content_id, was_published, False)
+        await self.session.execute(delete(ContentTagORM).where(ContentTagORM.content_id == content_id))
+
+    async def content_tags_for(self, content_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """Теги страницы материалов одним запросом (в порядке добавления)."""
+        ids = list(content_ids)
+        if not ids:
+            return {}
+        rows = await self.session.execute(
+            select(ContentTagORM.content_id, TagORM.name)
+            .join(TagORM, TagORM.id == ContentTagORM.tag_id)
+            .where(ContentTagORM.content_id.in_(ids))
+            .order_by(ContentTagORM.content_id, ContentTagORM.position)
+        )
+        result: Dict[int, List[str]] = defaultdict(list)
+        for content_id, name in rows:
+            result[content_id].append(name)
+        return result
+
+    @staticmethod
+    def content_ids_with_tag(tag: str):
+        """Подзапрос id материалов с тегом — для фильтра ``ContentORM.id.in_(...)``."""
+        return (
+            select(ContentTagORM.content_id)
+            .join(TagORM, TagORM.id == ContentTagORM.tag_id)
+            .where(TagORM.name == TagService.normalize_one(tag))
+        )
+
+    # endregion
+
+    # region portfolio
+    async def set_portfolio_tags(self, item_id: int, raw_tags: Optional[str], *, is_new: bool = False) -> List[str]:
+        names = self.parse_portfolio_tags(raw_tags)
+        await self._replace_links(
+            PortfolioTagORM,
+            PortfolioTagORM.item_id,
+            item_id,
+            names,
+            PORTFOLIO_SCOPE,
+            was_counted=not is_new,
+            counted=True,
+        )
+        return names
+
+    async def remove_portfolio_item(self, item_id: int) -> None:
+        tag_ids = (
+            await self.session.execute(select(PortfolioTagORM.tag_id).where(PortfolioTagORM.item_id == item_id))
+        ).scalars()
+        await self._apply_deltas(PORTFOLIO_SCOPE, {tag_id: -1 for tag_id in tag_ids})
+        await self.session.execute(delete(PortfolioTagORM).where(PortfolioTagORM.item_id == item_id))
+
+    @staticmethod
+    def portfolio_ids_with_tag(tag: str):
+        return (
+            select(PortfolioTagORM.item_id)
+            .join(TagORM, TagORM.id == PortfolioTagORM.tag_id)
+            .where(TagORM.name == TagService.normalize_one(tag))
+        )
+
+    # endregion
+
+    async def facets(self, scope: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Популярные теги из таблицы счётчиков, без сканирования связей."""
+        rows = await self.session.execute(
+            select(TagORM.name, TagCountORM.count)
+            .join(TagORM, TagORM.id == TagCountORM.tag_id)
+            .where(TagCountORM.scope == scope, TagCountORM.count > 0)
+            .order_by(TagCountORM.count.desc(), TagORM.name)
+            .limit(limit)
+        )
+        return [{"name": name, "count": count} for name, count in rows]
+
+    async def rebuild_counts(self) -> None:
+        """Пересчитать счётчики с нуля по таблицам связей (после бэкфилла/сверки)."""
+        await self.session.execute(delete(TagCountORM))
+        await self.session.execute(
+            insert(TagCountORM).from_select(
+                ["tag_id", "scope", "count"],
+                select(TagORM.id, literal(CONTENT_SCOPE), func.count(ContentORM.id))
+                .select_from(TagORM)
+                .outerjoin(ContentTagORM, ContentTagORM.tag_id == TagORM.id)
+                .outerjoin(
+                    ContentORM,
+                    (ContentORM.id == ContentTagORM.content_id) & ContentORM.is_published.is_(True),
+                )
+                .group_by(TagORM.id),
+            )
+        )
+        await self.session.execute(
+            insert(TagCountORM).from_select(
+                ["tag_id", "scope", "count"],
+                select(TagORM.id, literal(PORTFOLIO_SCOPE), func.count(PortfolioTagORM.item_id))
+                .select_from(TagORM)
+                .outerjoin(PortfolioTagORM, PortfolioTagORM.tag_id == TagORM.id)
+                .group_by(TagORM.id),
+            )
+        )
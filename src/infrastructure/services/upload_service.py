@@ -0,0 +1,351 @@
+"""
+Приём загружаемых файлов потоком.
+Тело multipart-запроса разбирается по мере поступления (без промежуточного
+SpooledTemporaryFile Starlette), части файла пишутся во временный файл в
+``<upload_dir>/.incoming`` в пуле потоков, а готовый файл переносится на место
+атомарным ``os.replace``. Размер проверяется на каждом фрагменте, тип —
+по сигнатуре первых байт, а не по имени файла и заголовку клиента.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+from src.config import settings
+
+UPLOAD_DIR = os.path.join("assets", "uploads")
+UPLOAD_URL_PREFIX = "/assets/uploads"
+INCOMING_DIR = ".incoming"
+
+SNIFF_BYTES = 16
+# Запас на заголовки частей и прочие поля формы сверх размера файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "application/pdf": ".pdf",
+}
+
+
+class UploadError(ValueError):
+    """Некорректная загрузка (400)."""
+
+
+class UploadTooLargeError(UploadError):
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"File is larger than {max_size} bytes")
+        self.max_size = max_size
+
+
+class UnsupportedFileTypeError(UploadError):
+    def __init__(self, content_type: Optional[str]) -> None:
+        super().__init__(f"Unsupported file type: {content_type or 'unknown'}")
+        self.content_type = content_type
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Тип файла по сигнатуре первых байт."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    name: str
+    path: str
+    url: str
+    size: int
+    content_type: str
+    sha256: Optional[str] = None
+    # Файл с таким содержимым уже был, новая копия не сохранялась
+    deduplicated: bool = False
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+class UploadSink:
+    """Временный файл загрузки: лимит размера, проверка типа, атомарная публикация."""
+
+    def __init__(
+        self,
+        directory: str = UPLOAD_DIR,
+        max_size: Optional[int] = None,
+        allowed_types: Optional[Iterable[str]] = None,
+        write_buffer: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.max_size = max_size if max_size is not None else settings.max_file_size
+        self.allowed_types = set(allowed_types if allowed_types is not None else settings.allowed_file_types)
+        self.write_buffer = write_buffer or settings.upload_write_buffer
+        self.size = 0
+        self.content_type: Optional[str] = None
+        self._head = b""
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._fd: Optional[int] = None
+        self._temp_path: Optional[str] = None
+        self._hash = hashlib.sha256()
+
+    def _open(self) -> None:
+        incoming = os.path.join(self.directory, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        self._fd, self._temp_path = tempfile.mkstemp(dir=incoming, suffix=".part")
+
+    def _sniff(self) -> None:
+        content_type = sniff_content_type(self._head)
+        if content_type is None or content_type not in self.allowed_types:
+            raise UnsupportedFileTypeError(content_type)
+        self.content_type = content_type
+
+    async def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+        if self.content_type is None:
+            self._head += data[: SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.write_buffer:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+
+        def _write() -> None:
+            if self._fd is None:
+                self._open()
+            _write_all(self._fd, data)
+            self._hash.update(data)
+
+        await asyncio.to_thread(_write)
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.content_type]
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    async def finish(self) -> None:
+        """Дописать буфер и закрыть временный файл; после этого известны тип и хэш."""
+        if self.size == 0:
+            raise UploadError("Empty file")
+        if self.content_type is None:
+            self._sniff()
+        await self._flush()
+
+        def _close() -> None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+        await asyncio.to_thread(_close)
+
+    async def publish(self, destination: str) -> None:
+        """Атомарно перенести готовый файл в ``destination``."""
+
+        def _publish() -> None:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(self._temp_path, destination)
+            self._temp_path = None
+
+        await asyncio.to_thread(_publish)
+
+    async def commit(self) -> StoredUpload:
+        """Сохранить файл под случайным именем."""
+        await self.finish()
+        name = f"{uuid.uuid4().hex}{self.extension}"
+        destination = os.path.join(self.directory, name)
+        await self.publish(destination)
+        return StoredUpload(
+            name=name,
+            path=destination,
+            url=f"{UPLOAD_URL_PREFIX}/{name}",
+            size=self.size,
+            content_type=self.content_type,
+            sha256=self.sha256,
+        )
+
+    async def abort(self) -> None:
+        self._buffer.clear()
+        if self._fd is None and self._temp_path is None:
+            return
+
+        def _cleanup() -> None:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._temp_path is not None:
+                try:
+                    os.unlink(self._temp_path)
+                except FileNotFoundError:
+                    pass
+                self._temp_path = None
+
+        await asyncio.to_thread(_cleanup)
+
+
+class _FilePartReader:
+    """Колбэки MultipartParser: данные только из части ``field_name`` с именем файла."""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name.encode()
+        self.found = False
+        self.done = False
+        self.filename: Optional[str] = None
+        self._in_file = False
+        self._pending: List[bytes] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if not self.found and options.get(b"name") == self.field_name and b"filename" in options:
+            self.found = True
+            self._in_file = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.done = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._pending)
+        self._pending.clear()
+        return data
+
+
+async def receive_upload(
+    request: Request,
+    field_name: str = "file",
+    sink: Optional[UploadSink] = None,
+    store: Optional[Callable[[UploadSink], Awaitable[StoredUpload]]] = None,
+) -> StoredUpload:
+    """Принять файл из multipart-тела запроса, не держа его в памяти целиком.
+
+    Превышение лимита обрывает чтение на первом лишнем фрагменте
+    (а при известном Content-Length — до чтения тела). ``store`` решает, куда
+    положить принятый файл; по умолчанию — под случайным именем.
+    """
+    sink = sink or UploadSink()
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise UploadError("Expected multipart/form-data")
+
+    body_limit = sink.max_size + MULTIPART_OVERHEAD
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > body_limit:
+        raise UploadTooLargeError(sink.max_size)
+
+    reader = _FilePartReader(field_name)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise UploadTooLargeError(sink.max_size)
+            try:
+                parser.write(chunk)
+            except MultipartParseError as exc:
+                # Испорченное тело — ошибка клиента, а не сервера
+                raise UploadError("Malformed multipart body") from exc
+            await sink.write(reader.take())
+            if reader.done:
+                # Остальные поля формы не нужны
+                break
+        if not reader.found:
+            raise UploadError(f"Field '{field_name}' with a file is required")
+        if not reader.done:
+            raise UploadError("Upload was interrupted")
+        if store is not None:
+            return await store(sink)
+        return await sink.commit()
+    except BaseException:
+        await sink.abort()
+        raise
+
+
+def purge_stale_parts(directory: str = UPLOAD_DIR, max_age: float = 3600.0) -> int:
+    """Удалить недокачанные временные файлы, оставшиеся после падения процесса."""
+    incoming = os.path.join(directory, INCOMING_DIR)
+    if not os.path.isdir(incoming):
+        return 0
+    threshold = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(incoming):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < threshold:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
@@ -14,12 +14,13 @@ from fastapi.responses import RedirectResponse
 import os
 import uvicorn
 import time
+import asyncio
 from contextlib import asynccontextmanager
 
 # Импорты конфигурации и безопасности
 from src.config import settings
 from src.presentation.api.v1.router import router as api_router
-from src.infrastructure.repositiry.base_repository import engine
+from src.infrastructure.repositiry.base_repository import AsyncSessionLocal, engine
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
 from src.infrastructure.security.rate_limiter import RateLimitMiddleware
@@ -27,6 +28,17 @@ from src.infrastructure.monitoring.logger import logger, audit_logger, security_
 from src.infrastructure.di.container import container, service_provider
 from src.infrastructure.cache.memory_cache import memory_cache
 from src.infrastructure.cache.redis_client import close_redis_client
+from src.infrastructure.cache.view_counter import view_counter
+from src.infrastructure.repositiry.message_writer import message_writer
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
+from src.infrastructure.security.moderation_registry import moderation_registry
+from src.infrastructure.services.content_service import warm_published_content_cache
+from src.infrastructure.services.event_outbox import event_outbox
+from src.infrastructure.services.stats_service import stats_counters
+from src.infrastructure.services.blob_store import blob_gc
+from src.infrastructure.services.image_service import image_pipeline
+from src.infrastructure.services.upload_service import purge_stale_parts
+from src.presentation.api.v1.websocket_engine import manager as ws_manager
 
 
 @asynccontextmanager
@@ -52,6 +64,10 @@ async def lifespan(app: FastAPI):
                         logger.warning("Database tables already exist; skipping creation", error=str(exc))
                     else:
                         raise
+                # create_all не добавляет новые индексы в уже существующие таблицы
+                for table in Base.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(sync_conn, checkfirst=True)
             await conn.run_sync(_create_all)
 
         if settings.database_url.startswith("mysql"):
@@ -64,11 +80,47 @@ async def lifespan(app: FastAPI):
     
     # Инициализация кэша
     logger.info("Memory cache initialized", stats=memory_cache.get_stats())
+
+    # Периодический сброс буфера просмотров контента
+    view_counter.start()
+
+    # Heartbeat и вытеснение неактивных WebSocket-соединений
+    ws_manager.start()
+    event_outbox.start()
+
+    # Счётчики админской статистики (инкрементально по id + периодическая сверка)
+    stats_counters.start()
+
+    # Межворкерная инвалидация и словарь модерации (из снимка, без пересборки)
+    invalidation_bus.start()
+    await moderation_registry.start()
+
+    # Недокачанные загрузки, оставшиеся после прошлого запуска
+    await asyncio.to_thread(purge_stale_parts)
+    # Удаление загрузок, на которые больше никто не ссылается
+    blob_gc.start()
+    # Пул процессов для уменьшенных копий изображений
+    image_pipeline.start()
+
+    # Прогрев первых страниц публичных лент
+    try:
+        await warm_published_content_cache(AsyncSessionLocal, settings.content_cache_warm_pages)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Content cache warm-up failed", error=str(exc))
     
     yield
     
     # Shutdown
     logger.info("Shutting down TeenFreelance API")
+    await view_counter.stop()
+    await ws_manager.stop()
+    await event_outbox.stop()
+    await stats_counters.stop()
+    await blob_gc.stop()
+    await image_pipeline.stop()
+    await message_writer.flush()
+    await moderation_registry.stop()
+    await invalidation_bus.stop()
     memory_cache.clear()
     await close_redis_client()
 
@@ -79,6 +131,26 @@ async def _ensure_mysql_columns(conn):
             "rub_balance": "FLOAT DEFAULT 0.0 NOT NULL",
             "is_editor": "BOOL DEFAULT FALSE NOT NULL",
         },
+        "career_tests": {
+            "updated_at": "DATETIME NULL",
+        },
+        "career_results": {
+            "answers": "TEXT NULL",
+        },
+        "chats": {
+            "user_low": "INT NULL",
+            "user_high": "INT NULL",
+        },
+        "commission_settings": {
+            "version": "INT DEFAULT 1 NOT NULL",
+        },
+    }
+    # Заполнение только что добавленных колонок для существующих строк
+    backfills = {
+        ("chats", "user_high"): (
+            "UPDATE `chats` SET `user_low` = LEAST(`customer_id`, `executor_id`), "
+            "`user_high` = GREATEST(`customer_id`, `executor_id`) WHERE `user_low` IS NULL"
+        ),
     }
     for table, columns in required_columns.items():
         for column, definition in columns.items():
@@ -94,6 +166,8 @@ async def _ensure_mysql_columns(conn):
                         )
                     )
                 )
+                if (table, column) in backfills:
+                    await conn.execute(text(backfills[(table, column)]))
 
 
 # Создание FastAPI приложения
@@ -177,7 +251,8 @@ async def health_check():
             "items_count": cache_stats["items_count"],
             "hit_rate": cache_stats["hit_rate_percent"],
             "size_mb": cache_stats["size_mb"]
-        }
+        },
+        "websocket": ws_manager.get_stats(),
     }
 
 
@@ -258,6 +333,11 @@ if __name__ == '__main__':
         host='0.0.0.0',
         port=8000,
         reload=settings.debug,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        # permessage-deflate поддерживает только реализация на websockets
+        ws="websockets",
+        ws_per_message_deflate=True,
+        ws_ping_interval=settings.ws_ping_interval,
+        ws_ping_timeout=settings.ws_ping_timeout,
     )
 
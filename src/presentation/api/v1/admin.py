@@ -1,11 +1,39 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+from src.config import settings
+
 from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
-from src.infrastructure.services.user_service import UserService
+from src.infrastructure.repositiry.pagination import (
+    InvalidCursorError,
+    Page,
+    PageRequest,
+    load_by_ids,
+    paginate,
+)
 from src.infrastructure.services.order_service import OrderService
+from src.infrastructure.services.stats_service import stats_counters
+from src.infrastructure.services.balance_service import (
+    BalanceLedger,
+    DuplicateTransferError,
+    InsufficientFundsError,
+    Settlement,
+)
+from src.infrastructure.services.export_service import (
+    EXPORT_MEDIA_TYPES,
+    EXPORTS,
+    stream_export,
+    stream_result,
+)
+from src.infrastructure.services.moderation_service import MATCH_MODES, ModerationService
+from src.infrastructure.security.moderation_registry import moderation_registry
+from src.infrastructure.cache.chat_membership import CHAT_MEMBERSHIP_TOPIC
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
 from src.infrastructure.repositiry.db_models import (
     UserORM,
     OrderORM,
@@ -14,8 +42,9 @@ from src.infrastructure.repositiry.db_models import (
     ChatORM,
     SupportRequestORM,
     CurrencyTypeEnum,
+    OrderStatusEnum,
 )
-from sqlalchemy import select, func, text as sa_text
+from sqlalchemy import select, text as sa_text
 from sqlalchemy.orm import selectinload
 from src.presentation.api.v1.auth import get_current_user
 from src.domain.entity.userentity import UserPrivate, UserRole
@@ -134,6 +163,8 @@ class PaginatedUsersResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_approximate: bool = False
 
 
 class PaginatedOrdersResponse(BaseModel):
@@ -142,6 +173,8 @@ class PaginatedOrdersResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_approximate: bool = False
 
 
 class PaginatedOffersResponse(BaseModel):
@@ -150,6 +183,8 @@ class PaginatedOffersResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_approximate: bool = False
 
 
 class SupportRequestsResponse(BaseModel):
@@ -158,16 +193,47 @@ class SupportRequestsResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_approximate: bool = False
+
+
+class BalanceBatchItem(BaseModel):
+    user_id: int = Field(..., gt=0)
+    amount: float = Field(..., description="Положительная сумма — начисление, отрицательная — списание")
+    currency: CurrencyTypeEnum = Field(default=CurrencyTypeEnum.RUB)
+
+
+class BalanceBatch(BaseModel):
+    items: List[BalanceBatchItem] = Field(..., min_items=1, max_items=10000)
+    kind: str = Field("admin_batch", min_length=1, max_length=32)
+    reason: Optional[str] = Field(None, max_length=64)
+    batch_id: Optional[str] = Field(None, min_length=1, max_length=48, description="Ключ идемпотентности пакета")
+
+
+class ModerationTermsCreate(BaseModel):
+    terms: List[str] = Field(..., min_items=1, max_items=1000)
+    match_mode: str = Field("word", description="word — целым словом, stem — в любом месте слова")
+
+
+class ModerationStatus(BaseModel):
+    version: int
+    digest: str
+    terms_count: int
 
 
 class SQLRequest(BaseModel):
     query: str = Field(..., min_length=1)
+    max_rows: Optional[int] = Field(None, ge=1, description="Предел строк; по умолчанию admin_sql_max_rows")
+    timeout: Optional[float] = Field(None, gt=0, description="Таймаут запроса в секундах, не больше admin_sql_timeout")
+    stream: bool = Field(False, description="Отдать результат потоком вместо JSON-ответа")
+    format: str = Field("ndjson", pattern="^(csv|ndjson)$")
 
 
 class SQLResponse(BaseModel):
     success: bool
     rows_affected: int
     result: List[Dict[str, Any]]
+    truncated: bool = False
 
 
 class BroadcastRequest(BaseModel):
@@ -185,60 +251,89 @@ async def get_admin_user(current_user: UserPrivate = Depends(get_current_user))
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
-@router.get("/stats", response_model=AdminStats)
-async def get_admin_stats(admin_user: UserPrivate = Depends(get_admin_user)):
-    async with AsyncSessionLocal() as session:
-        today = datetime.utcnow().date()
-        # Подсчёт общей статистики
-        users_count = await session.execute(select(func.count(UserORM.id)))
-        total_users = users_count.scalar() or 0
+# Сортировки админских списков — только по индексированным колонкам
+USER_SORTS = {"id": UserORM.id, "created_at": UserORM.created_at, "nickname": UserORM.nickname}
+ORDER_SORTS = {"id": OrderORM.id, "created_at": OrderORM.created_at}
+OFFER_SORTS = {"id": MessageORM.id}
+SUPPORT_REQUEST_SORTS = {"id": SupportRequestORM.id, "created_at": SupportRequestORM.created_at}
+
+
+def _page_params(sort_columns: Dict[str, Any], default_sort: str = "id", default_order: str = "desc"):
+    """Dependency с общими параметрами постраничной выдачи для списка."""
+
+    def dependency(
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        sort: str = Query(default_sort, description=f"Одно из: {', '.join(sort_columns)}"),
+        order: str = Query(default_order, pattern="^(asc|desc)$"),
+        cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы; page при этом не учитывается"),
+        include_total: bool = Query(True),
+    ) -> PageRequest:
+        if sort not in sort_columns:
+            raise HTTPException(status_code=400, detail=f"Unsupported sort field: {sort}")
+        return PageRequest(
+            page=page,
+            page_size=page_size,
+            sort=sort,
+            descending=order == "desc",
+            cursor=cursor,
+            include_total=include_total,
+        )
 
-        orders_count = await session.execute(select(func.count(OrderORM.id)))
-        total_orders = orders_count.scalar() or 0
+    return dependency
+
+
+async def _paginate(session, query, model, page_request: PageRequest, sort_columns, **kwargs) -> Page:
+    try:
+        return await paginate(session, query, model, page_request, sort_columns, **kwargs)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-        messages_count = await session.execute(select(func.count(MessageORM.id)))
-        total_messages = messages_count.scalar() or 0
-        
-        # ContactRequestORM не существует, используем 0
-        total_contact_requests = 0
-        
-        # Активные пользователи сегодня (last_login не существует в UserORM)
-        active_users_today = 0
-        
-        # Заказы сегодня
-        orders_today_query = await session.execute(
-            select(func.count(OrderORM.id)).where(func.date(OrderORM.created_at) == today)
-        )
-        orders_today = orders_today_query.scalar() or 0
-        
-        return AdminStats(
-            total_users=total_users,
-            total_orders=total_orders,
-            total_messages=total_messages,
-            total_contact_requests=total_contact_requests,
-            active_users_today=active_users_today,
-            orders_today=orders_today
-        )
+
+def _page_meta(result: Page) -> Dict[str, Any]:
+    return {
+        "total": result.total,
+        "page": result.page,
+        "page_size": result.page_size,
+        "total_pages": result.total_pages,
+        "next_cursor": result.next_cursor,
+        "total_approximate": result.total_approximate,
+    }
+
+@router.get("/stats", response_model=AdminStats)
+async def get_admin_stats(admin_user: UserPrivate = Depends(get_admin_user)):
+    # Счётчики поддерживаются фоновым проходом stats_counters, здесь только чтение
+    snapshot = await stats_counters.snapshot()
+
+    return AdminStats(
+        total_users=snapshot["users"]["total"],
+        total_orders=snapshot["orders"]["total"],
+        total_messages=snapshot["messages"]["total"],
+        total_contact_requests=snapshot["support_requests"]["total"],
+        # last_login пока не обновляется при входе, активность за день не считаем
+        active_users_today=0,
+        orders_today=snapshot["orders"]["today"]
+    )
 
 @router.get("/users", response_model=PaginatedUsersResponse)
 async def get_all_users(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+    page_request: PageRequest = Depends(_page_params(USER_SORTS, default_order="asc")),
+    role: Optional[UserRole] = Query(None),
+    search: Optional[str] = Query(None, min_length=1, max_length=50, description="Префикс никнейма"),
     admin_user: UserPrivate = Depends(get_admin_user)
 ):
     async with AsyncSessionLocal() as session:
         query = select(UserORM)
-        
-        # Подсчёт общего количества
-        count_query = query.with_only_columns(UserORM.id).order_by(None)
-        total_users = (await session.execute(count_query)).scalars().all()
-        total_count = len(total_users)
-        
-        # Пагинация
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
-        result = await session.execute(query)
-        users = result.scalars().all()
+        if role is not None:
+            query = query.where(UserORM.role == role.value)
+        if search:
+            # Префиксный LIKE использует индекс по nickname
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.where(UserORM.nickname.like(f"{escaped}%", escape="\\"))
+        total_hint = await stats_counters.total("users") if role is None and not search else None
+
+        result = await _paginate(session, query, UserORM, page_request, USER_SORTS, total_hint=total_hint)
+        users = result.items
         
         users_data: List[UserAdminEntry] = []
         for user in users:
@@ -279,15 +374,7 @@ async def get_all_users(
                 )
             )
 
-        total_pages = (total_count + page_size - 1) // page_size if page_size else 1
-
-        return PaginatedUsersResponse(
-            data=users_data,
-            total=total_count,
-            page=page,
-            page_size=page_size,
-            total_pages=max(1, total_pages),
-        )
+        return PaginatedUsersResponse(data=users_data, **_page_meta(result))
 
 @router.put("/users/{user_id}")
 async def update_user(
@@ -309,12 +396,13 @@ async def update_user(
             user.nickname = user_data.nickname
         if user_data.email is not None:
             user.email = user_data.email
-        if user_data.rub_balance is not None:
-            user.rub_balance = user_data.rub_balance
-        elif user_data.balance is not None:
-            user.balance = user_data.balance
+        # Балансы меняются корректирующими проводками журнала, а не присваиванием
+        ledger = BalanceLedger(session)
+        rub_target = user_data.rub_balance if user_data.rub_balance is not None else user_data.balance
+        if rub_target is not None:
+            await ledger.adjust_to(user_id, CurrencyTypeEnum.RUB, rub_target, reference=f"admin:{admin_user.id}")
         if user_data.tf_balance is not None:
-            user.tf_balance = user_data.tf_balance
+            await ledger.adjust_to(user_id, CurrencyTypeEnum.TF, user_data.tf_balance, reference=f"admin:{admin_user.id}")
         if user_data.customer_rating is not None:
             user.customer_rating = user_data.customer_rating
         if user_data.executor_rating is not None:
@@ -352,6 +440,7 @@ async def delete_user(
         
         await session.delete(user)
         await session.commit()
+        await invalidation_bus.publish(CHAT_MEMBERSHIP_TOPIC, {"user_id": user_id})
         
         logger.audit("admin_delete_user", user_id=admin_user.id, target_user=user_id)
 
@@ -359,31 +448,39 @@ async def delete_user(
 
 @router.get("/orders", response_model=PaginatedOrdersResponse)
 async def get_all_orders(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+    page_request: PageRequest = Depends(_page_params(ORDER_SORTS, default_order="asc")),
+    status: Optional[OrderStatusEnum] = Query(None),
+    customer_id: Optional[int] = Query(None, gt=0),
+    executor_id: Optional[int] = Query(None, gt=0),
     admin_user: UserPrivate = Depends(get_admin_user)
 ):
     async with AsyncSessionLocal() as session:
         query = select(OrderORM)
-        
-        # Подсчёт общего количества
-        count_query = query.with_only_columns(OrderORM.id).order_by(None)
-        total_orders = (await session.execute(count_query)).scalars().all()
-        total_count = len(total_orders)
-        
-        # Пагинация
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
-        result = await session.execute(query)
-        orders = result.scalars().all()
+        if status is not None:
+            query = query.where(OrderORM.status == status)
+        if customer_id is not None:
+            query = query.where(OrderORM.customer_id == customer_id)
+        if executor_id is not None:
+            query = query.where(OrderORM.executor_id == executor_id)
+        unfiltered = status is None and customer_id is None and executor_id is None
+        total_hint = await stats_counters.total("orders") if unfiltered else None
+
+        result = await _paginate(session, query, OrderORM, page_request, ORDER_SORTS, total_hint=total_hint)
+        orders = result.items
+
+        # Заказчики и исполнители всей страницы одним запросом
+        users = await load_by_ids(
+            session,
+            UserORM,
+            [order.customer_id for order in orders] + [order.executor_id for order in orders],
+            UserORM.name,
+            UserORM.nickname,
+        )
         
         orders_data: List[OrderAdminEntry] = []
         for order in orders:
-            customer_result = await session.execute(select(UserORM).where(UserORM.id == order.customer_id))
-            customer = customer_result.scalar_one_or_none()
-            
-            executor_result = await session.execute(select(UserORM).where(UserORM.id == order.executor_id))
-            executor = executor_result.scalar_one_or_none()
+            customer = users.get(order.customer_id)
+            executor = users.get(order.executor_id)
             
             orders_data.append(
                 OrderAdminEntry(
@@ -406,15 +503,7 @@ async def get_all_orders(
                 )
             )
 
-        total_pages = (total_count + page_size - 1) // page_size if page_size else 1
-
-        return PaginatedOrdersResponse(
-            data=orders_data,
-            total=total_count,
-            page=page,
-            page_size=page_size,
-            total_pages=max(1, total_pages),
-        )
+        return PaginatedOrdersResponse(data=orders_data, **_page_meta(result))
 
 @router.put("/orders/{order_id}")
 async def update_order(
@@ -461,6 +550,7 @@ async def delete_order(
         
         await session.delete(order)
         await session.commit()
+        await invalidation_bus.publish(CHAT_MEMBERSHIP_TOPIC, {"order_id": order_id})
         
         logger.audit("admin_delete_order", user_id=admin_user.id, target_order=order_id)
 
@@ -468,33 +558,28 @@ async def delete_order(
 
 @router.get("/offers", response_model=PaginatedOffersResponse)
 async def get_offers(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+    page_request: PageRequest = Depends(_page_params(OFFER_SORTS)),
     admin_user: UserPrivate = Depends(get_admin_user),
 ):
     async with AsyncSessionLocal() as session:
-        base_query = select(MessageORM).where(
+        query = select(MessageORM).where(
             MessageORM.message_type == "offer",
             MessageORM.is_deleted.is_(False),
         )
 
-        count_query = base_query.with_only_columns(MessageORM.id).order_by(None)
-        total_rows = (await session.execute(count_query)).scalars().all()
-        total_count = len(total_rows)
-
-        offset = (page - 1) * page_size
-        data_query = (
-            base_query.order_by(MessageORM.created_at.desc())
-            .offset(offset)
-            .limit(page_size)
-            .options(
+        # id растёт вместе с created_at, сортировка по индексу (message_type, id)
+        result = await _paginate(
+            session,
+            query,
+            MessageORM,
+            page_request,
+            OFFER_SORTS,
+            options=(
                 selectinload(MessageORM.chat).selectinload(ChatORM.order),
                 selectinload(MessageORM.sender),
-            )
+            ),
         )
-
-        result = await session.execute(data_query)
-        messages = result.scalars().all()
+        messages = result.items
 
         offers: List[OfferAdminEntry] = []
         for message in messages:
@@ -514,15 +599,7 @@ async def get_offers(
                 )
             )
 
-        total_pages = (total_count + page_size - 1) // page_size if page_size else 1
-
-        return PaginatedOffersResponse(
-            data=offers,
-            total=total_count,
-            page=page,
-            page_size=page_size,
-            total_pages=max(1, total_pages),
-        )
+        return PaginatedOffersResponse(data=offers, **_page_meta(result))
 
 
 @router.delete("/offers/{offer_id}")
@@ -552,20 +629,20 @@ async def delete_offer(
 
 @router.get("/support/requests", response_model=SupportRequestsResponse)
 async def get_support_requests(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+    page_request: PageRequest = Depends(_page_params(SUPPORT_REQUEST_SORTS, default_sort="created_at")),
+    status: Optional[str] = Query(None, max_length=20),
     admin_user: UserPrivate = Depends(get_admin_user),
 ):
     async with AsyncSessionLocal() as session:
-        base_query = select(SupportRequestORM).order_by(SupportRequestORM.created_at.desc())
-        count_query = base_query.with_only_columns(SupportRequestORM.id).order_by(None)
-        total_rows = (await session.execute(count_query)).scalars().all()
-        total_count = len(total_rows)
+        query = select(SupportRequestORM)
+        if status:
+            query = query.where(SupportRequestORM.status == status)
+        total_hint = await stats_counters.total("support_requests") if not status else None
 
-        offset = (page - 1) * page_size
-        data_query = base_query.offset(offset).limit(page_size)
-        result = await session.execute(data_query)
-        requests = result.scalars().all()
+        result = await _paginate(
+            session, query, SupportRequestORM, page_request, SUPPORT_REQUEST_SORTS, total_hint=total_hint
+        )
+        requests = result.items
 
         data: List[SupportRequestEntry] = []
         for request in requests:
@@ -581,15 +658,7 @@ async def get_support_requests(
                 )
             )
 
-        total_pages = (total_count + page_size - 1) // page_size if page_size else 1
-
-        return SupportRequestsResponse(
-            data=data,
-            total=total_count,
-            page=page,
-            page_size=page_size,
-            total_pages=max(1, total_pages),
-        )
+        return SupportRequestsResponse(data=data, **_page_meta(result))
 
 
 @router.post("/support/requests/{request_id}/close")
@@ -633,6 +702,69 @@ async def broadcast_support_message(
     return {"success": True, "message": "Broadcast sent"}
 
 
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    admin_user: UserPrivate = Depends(get_admin_user),
+):
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+
+    logger.audit("admin_export", user_id=admin_user.id, dataset=dataset, format=format)
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        stream_export(dataset, format, batch_size=settings.admin_export_batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Запросы только на чтение: их результат можно читать серверным курсором
+READ_SQL_PREFIXES = ("select", "with", "show", "describe", "explain")
+
+
+async def _set_statement_timeout(session, seconds: float) -> None:
+    # max_execution_time в MySQL действует только на SELECT; остальное ограничивает asyncio.wait_for
+    if session.bind.dialect.name == "mysql":
+        await session.execute(sa_text("SET SESSION max_execution_time = :ms"), {"ms": int(seconds * 1000)})
+
+
+async def _reset_statement_timeout(session) -> None:
+    # Соединение вернётся в пул, переменная сессии не должна достаться следующему запросу
+    if session.bind.dialect.name == "mysql":
+        try:
+            await session.execute(sa_text("SET SESSION max_execution_time = DEFAULT"))
+        except Exception:  # noqa: BLE001
+            pass
+
+
+async def _sql_failure(session, exc: Exception, timeout: float) -> HTTPException:
+    if isinstance(exc, asyncio.TimeoutError):
+        # Прерванный запрос оставляет соединение в неизвестном состоянии — выбрасываем его из пула
+        try:
+            connection = await session.connection()
+            await connection.invalidate()
+        except Exception:  # noqa: BLE001
+            pass
+        logger.error("admin_sql_timeout", timeout=timeout)
+        return HTTPException(status_code=408, detail=f"SQL execution timed out after {timeout:g}s")
+
+    await session.rollback()
+    await _reset_statement_timeout(session)
+    logger.error("admin_sql_error", error=str(exc))
+    return HTTPException(status_code=400, detail=f"SQL execution failed: {exc}")
+
+
+async def _stream_sql(session, result, fmt: str, max_rows: int):
+    try:
+        async for chunk in stream_result(result, fmt, limit=max_rows, size=settings.admin_export_batch_size):
+            yield chunk
+        await _reset_statement_timeout(session)
+    finally:
+        await session.close()
+
+
 @router.post("/sql", response_model=SQLResponse)
 async def execute_admin_sql(
     sql_request: SQLRequest,
@@ -658,38 +790,121 @@ async def execute_admin_sql(
     if not statement.lower().startswith(allowed_prefixes):
         raise HTTPException(status_code=400, detail="Unsupported SQL operation")
 
+    is_read = statement.lower().startswith(READ_SQL_PREFIXES)
+    timeout = min(sql_request.timeout or settings.admin_sql_timeout, settings.admin_sql_timeout)
+    row_cap = settings.admin_sql_stream_max_rows if sql_request.stream else settings.admin_sql_max_rows
+    max_rows = min(sql_request.max_rows or row_cap, row_cap)
+
+    if sql_request.stream:
+        if not is_read:
+            raise HTTPException(status_code=400, detail="Streaming is supported only for read queries")
+        # Запрос выполняется до ответа, чтобы ошибка вернулась статусом, а не оборванным потоком.
+        # Дальше сессией владеет генератор и закрывает её, когда ответ отдан или клиент отключился
+        session = AsyncSessionLocal()
+        try:
+            await _set_statement_timeout(session, timeout)
+            result = await asyncio.wait_for(session.stream(sa_text(statement)), timeout)
+        except Exception as exc:  # noqa: BLE001
+            error = await _sql_failure(session, exc, timeout)
+            await session.close()
+            raise error from exc
+
+        logger.audit("admin_sql_stream", user_id=admin_user.id, max_rows=max_rows)
+        return StreamingResponse(
+            _stream_sql(session, result, sql_request.format, max_rows),
+            media_type=EXPORT_MEDIA_TYPES[sql_request.format],
+            headers={"X-Row-Limit": str(max_rows)},
+        )
+
     async with AsyncSessionLocal() as session:
         try:
-            result = await session.execute(sa_text(statement))
+            if is_read:
+                await _set_statement_timeout(session, timeout)
+                # Серверный курсор: в память попадает не больше max_rows + 1 строк
+                result = await asyncio.wait_for(session.stream(sa_text(statement)), timeout)
+                try:
+                    fetched = await asyncio.wait_for(result.mappings().fetchmany(max_rows + 1), timeout)
+                finally:
+                    await result.close()
+                await _reset_statement_timeout(session)
+                rows_affected = len(fetched[:max_rows])
+            else:
+                result = await asyncio.wait_for(session.execute(sa_text(statement)), timeout)
+                fetched = result.mappings().fetchmany(max_rows + 1) if result.returns_rows else []
+                rows_affected = result.rowcount if result.rowcount not in (None, -1) else len(fetched[:max_rows])
+                await session.commit()
+            truncated = len(fetched) > max_rows
+            rows = [dict(row) for row in fetched[:max_rows]]
+        except Exception as exc:  # noqa: BLE001
+            raise await _sql_failure(session, exc, timeout) from exc
 
-            rows: List[Dict[str, Any]] = []
-            if result.returns_rows:
-                rows = [dict(row._mapping) for row in result.mappings().all()]
+        return SQLResponse(success=True, rows_affected=rows_affected, result=rows, truncated=truncated)
 
-            rows_affected = result.rowcount if result.rowcount not in (None, -1) else len(rows)
+def _moderation_status() -> ModerationStatus:
+    snapshot = moderation_registry.snapshot
+    return ModerationStatus(version=snapshot.version, digest=snapshot.digest, terms_count=snapshot.terms_count)
 
-            if not result.returns_rows:
-                await session.commit()
 
-            return SQLResponse(success=True, rows_affected=rows_affected, result=rows)
-        except Exception as exc:  # noqa: BLE001
-            await session.rollback()
-            logger.error("admin_sql_error", error=str(exc))
-            raise HTTPException(status_code=400, detail=f"SQL execution failed: {exc}") from exc
+@router.get("/moderation/terms")
+async def list_moderation_terms(
+    match_mode: Optional[str] = Query(None),
+    admin_user: UserPrivate = Depends(get_admin_user),
+):
+    async with AsyncSessionLocal() as session:
+        terms = await ModerationService(session).list_terms(match_mode)
+    return {"terms": terms, "status": _moderation_status()}
+
+
+@router.post("/moderation/terms")
+async def add_moderation_terms(
+    payload: ModerationTermsCreate,
+    admin_user: UserPrivate = Depends(get_admin_user),
+):
+    if payload.match_mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail="Invalid match mode")
+    async with AsyncSessionLocal() as session:
+        added = await ModerationService(session).add_terms(payload.terms, payload.match_mode, admin_user.id)
+
+    if added:
+        await moderation_registry.notify_changed()
+    logger.audit("admin_add_moderation_terms", user_id=admin_user.id, added=added)
+    return {"success": True, "added": added, "status": _moderation_status()}
+
+
+@router.delete("/moderation/terms/{term_id}")
+async def delete_moderation_term(
+    term_id: int,
+    admin_user: UserPrivate = Depends(get_admin_user),
+):
+    async with AsyncSessionLocal() as session:
+        deleted = await ModerationService(session).delete_term(term_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Term not found")
+
+    await moderation_registry.notify_changed()
+    logger.audit("admin_delete_moderation_term", user_id=admin_user.id, term_id=term_id)
+    return {"success": True, "status": _moderation_status()}
+
+
+@router.post("/moderation/reload", response_model=ModerationStatus)
+async def reload_moderation_dictionary(admin_user: UserPrivate = Depends(get_admin_user)):
+    await moderation_registry.notify_changed()
+    return _moderation_status()
+
 
 @router.get("/commission", response_model=CommissionSettings)
 async def get_commission_settings(admin_user: UserPrivate = Depends(get_admin_user)):
     async with AsyncSessionLocal() as session:
         order_service = OrderService(session)
-        commission = await order_service.get_commission_settings(session) or {}
+        commission = await order_service.get_commission_settings(session)
         
         return CommissionSettings(
-            commission_withdraw=commission.get('commission_withdraw', 3.0),
-            commission_customer=commission.get('commission_customer', 10.0),
-            commission_executor=commission.get('commission_executor', 5.0),
-            commission_post_order=commission.get('commission_post_order', 200),
-            commission_response_threshold=commission.get('commission_response_threshold', 5000),
-            commission_response_percent=commission.get('commission_response_percent', 1.0)
+            commission_withdraw=commission.commission_withdraw,
+            commission_customer=commission.commission_customer,
+            commission_executor=commission.commission_executor,
+            commission_post_order=commission.commission_post_order,
+            commission_response_threshold=commission.commission_response_threshold,
+            commission_response_percent=commission.commission_response_percent
         )
 
 @router.put("/commission")
@@ -725,18 +940,21 @@ async def add_user_balance(
 ):
     """Пополнение баланса пользователя (только для админов)"""
     async with AsyncSessionLocal() as session:
-        user_service = UserService(session)
-        
-        # Получаем пользователя
-        user = await user_service.get_user_by_id(balance_data.user_id)
-        if not user:
+        ledger = BalanceLedger(session)
+        try:
+            await ledger.credit(
+                balance_data.user_id,
+                balance_data.currency,
+                balance_data.amount,
+                kind="admin_credit",
+                reference=f"admin:{admin_user.id}",
+            )
+        except LookupError:
+            await session.rollback()
             raise HTTPException(status_code=404, detail="User not found")
-        
-        # Пополняем баланс
-        current_balance = user.get_balance(balance_data.currency)
-        new_balance = current_balance + balance_data.amount
-        user.set_balance(balance_data.currency, new_balance)
         await session.commit()
+        balances = await ledger.balances([balance_data.user_id], balance_data.currency)
+        new_balance = balances.get(balance_data.user_id, 0.0)
         
         logger.audit(
             "admin_balance_topup",
@@ -755,3 +973,32 @@ async def add_user_balance(
             "amount_added": balance_data.amount,
             "reason": balance_data.reason
         }
+
+
+@router.post("/balance/batch")
+async def settle_balance_batch(
+    batch: BalanceBatch,
+    admin_user: UserPrivate = Depends(get_admin_user),
+):
+    """Пакетные начисления и списания (премии, возвраты) одной транзакцией"""
+    async with AsyncSessionLocal() as session:
+        try:
+            transfer_ids = await BalanceLedger(session).settle_batch(
+                [Settlement(item.user_id, item.amount, item.currency) for item in batch.items],
+                kind=batch.kind,
+                reference=batch.reason,
+                transfer_id=batch.batch_id,
+            )
+        except InsufficientFundsError as exc:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail=f"Insufficient funds for user {exc.user_id}")
+        except DuplicateTransferError:
+            await session.rollback()
+            raise HTTPException(status_code=409, detail="Batch already settled")
+        except LookupError:
+            await session.rollback()
+            raise HTTPException(status_code=404, detail="User not found")
+        await session.commit()
+
+    logger.audit("admin_balance_batch", user_id=admin_user.id, items=len(batch.items), kind=batch.kind)
+    return {"success": True, "transfers": transfer_ids, "items": len(batch.items)}
@@ -18,6 +18,7 @@ from src.infrastructure.dependencies import (
 from src.infrastructure.repositiry.user_repository import UserRepository
 from src.infrastructure.repositiry.db_models import CurrencyTypeEnum
 from src.infrastructure.services.auth_service import AuthService, decode_access_token
+from src.infrastructure.services.balance_service import BalanceLedger
 from src.infrastructure.services.user_service import UserService
 from src.infrastructure.security.reset_token_store import reset_token_store
 
@@ -419,15 +420,14 @@ async def topup_balance(
     if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
-    user_service = UserService(session)
-    user = await user_service.get_user_by_id(current_user.id)
-    if not user:
+    ledger = BalanceLedger(session)
+    try:
+        await ledger.credit(current_user.id, currency, amount, kind="topup")
+    except LookupError:
+        await session.rollback()
         raise HTTPException(status_code=404, detail="User not found")
-
-    current_balance = user.get_balance(currency)
-    new_balance = current_balance + amount
-    user.set_balance(currency, new_balance)
     await session.commit()
+    new_balance = (await ledger.balances([current_user.id], currency)).get(current_user.id, 0.0)
 
     return {
         "success": True,
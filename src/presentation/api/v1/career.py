@@ -52,6 +52,21 @@ async def submit_test(
     return {"success": True, **result}
 
 
+@router.post("/tests/{test_id}/rescore")
+async def rescore_test_results(
+    test_id: int,
+    current_user: UserPrivate = Depends(get_current_user),
+    service: CareerTestService = Depends(get_career_test_service),
+):
+    if current_user.nickname != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        rescored = await service.rescore_results(test_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return {"success": True, "rescored": rescored}
+
+
 @router.get("/recommendations/{user_id}")
 async def get_recommendations(
     user_id: int,
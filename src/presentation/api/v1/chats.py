@@ -4,14 +4,16 @@ from typing import List, Optional
 from datetime import datetime
 
 from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.cache.chat_membership import chat_membership
 from src.infrastructure.services.chat_service import ChatService
 from src.infrastructure.services.message_service import MessageService
 from src.infrastructure.services.user_service import UserService
-from src.infrastructure.repositiry.db_models import ChatORM, MessageORM, UserORM
-from sqlalchemy import select
+from src.infrastructure.repositiry.db_models import MessageORM, UserORM
 from src.presentation.api.v1.auth import get_current_user
 from src.domain.entity.userentity import UserPrivate
 from src.infrastructure.security.content_filter import ContentRejectedError
+from src.presentation.api.v1.websocket_chats import push_unread_updates, unread_update_event
+from src.presentation.api.v1.websocket_engine import manager as ws_manager
 
 router = APIRouter(prefix="/chats", tags=["Chats"])
 
@@ -55,6 +57,18 @@ class ChatResponse(BaseModel):
 class ChatListResponse(BaseModel):
     chats: List[ChatResponse]
 
+class UnreadCounterResponse(BaseModel):
+    chat_id: int
+    unread_count: int
+    last_read_message_id: int
+
+class UnreadCountersResponse(BaseModel):
+    chats: List[UnreadCounterResponse]
+    total: int
+
+class MarkReadRequest(BaseModel):
+    message_id: Optional[int] = None
+
 @router.get("/", response_model=ChatListResponse)
 async def get_user_chats(current_user: UserPrivate = Depends(get_current_user)):
     async with AsyncSessionLocal() as session:
@@ -108,6 +122,44 @@ async def get_user_chats(current_user: UserPrivate = Depends(get_current_user)):
         
         return ChatListResponse(chats=chats)
 
+@router.get("/unread", response_model=UnreadCountersResponse)
+async def get_unread_counters(current_user: UserPrivate = Depends(get_current_user)):
+    async with AsyncSessionLocal() as session:
+        chat_service = ChatService(session)
+        states = await chat_service.get_unread_counters(current_user.id)
+
+        counters = [
+            UnreadCounterResponse(
+                chat_id=state.chat_id,
+                unread_count=state.unread_count,
+                last_read_message_id=state.last_read_message_id,
+            )
+            for state in states
+        ]
+        return UnreadCountersResponse(chats=counters, total=sum(c.unread_count for c in counters))
+
+@router.post("/{chat_id}/read", response_model=UnreadCounterResponse)
+async def mark_chat_read(
+    chat_id: int,
+    payload: Optional[MarkReadRequest] = None,
+    current_user: UserPrivate = Depends(get_current_user)
+):
+    async with AsyncSessionLocal() as session:
+        if not await chat_membership.is_member(chat_id, current_user.id, session):
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        chat_service = ChatService(session)
+        state = await chat_service.mark_chat_read(
+            chat_id, current_user.id, payload.message_id if payload else None
+        )
+
+    await ws_manager.send_to_user(unread_update_event(state), current_user.id)
+    return UnreadCounterResponse(
+        chat_id=state.chat_id,
+        unread_count=state.unread_count,
+        last_read_message_id=state.last_read_message_id,
+    )
+
 @router.get("/{chat_id}/messages", response_model=List[MessageResponse])
 async def get_chat_messages(
     chat_id: int,
@@ -119,10 +171,7 @@ async def get_chat_messages(
         user_service = UserService(session)
         
         # Проверяем, что пользователь имеет доступ к чату
-        chat_result = await session.execute(select(ChatORM).where(ChatORM.id == chat_id))
-        chat = chat_result.scalar_one_or_none()
-        
-        if not chat or (chat.customer_id != current_user.id and chat.executor_id != current_user.id):
+        if not await chat_membership.is_member(chat_id, current_user.id, session):
             raise HTTPException(status_code=403, detail="Access denied")
         
         messages = await message_service.get_messages(chat_id)
@@ -159,23 +208,23 @@ async def send_message(
 ):
     async with AsyncSessionLocal() as session:
         message_service = MessageService(session)
-        user_service = UserService(session)
         
         # Проверяем, что пользователь имеет доступ к чату
-        chat_result = await session.execute(select(ChatORM).where(ChatORM.id == chat_id))
-        chat = chat_result.scalar_one_or_none()
-        
-        if not chat or (chat.customer_id != current_user.id and chat.executor_id != current_user.id):
+        if not await chat_membership.is_member(chat_id, current_user.id, session):
             raise HTTPException(status_code=403, detail="Access denied")
         
-        user = await user_service.get_user_by_id(current_user.id)
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        # Профиль отправителя уже загружен get_current_user, повторный запрос не нужен
+        user = current_user
         
         try:
             message = await message_service.send_message(chat_id, user.id, message_data.text)
         except ContentRejectedError as exc:
             raise HTTPException(status_code=400, detail="Сообщение отклонено автоматической модерацией") from exc
+
+        membership = await chat_membership.get(chat_id, session)
+        if membership:
+            recipients = [participant for participant in membership.participants if participant != user.id]
+            await push_unread_updates(chat_id, recipients, session)
         
         return MessageResponse(
             id=message.id,
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+from src.infrastructure.cache.content_cache import etag_matches
 from src.infrastructure.services.content_service import ContentService, ContentStatus, ContentType
 from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
 from src.infrastructure.repositiry.db_models import UserORM
-from src.presentation.api.v1.auth import get_current_user, get_admin_user
+from src.presentation.api.v1.auth import get_current_user, get_admin_user, get_optional_user
 from src.domain.entity.userentity import UserPrivate, UserRole
 from src.infrastructure.dependencies import get_workflow_service
 from src.domain.services.workflow_service import WorkflowService, WorkflowError
@@ -43,6 +44,11 @@ class ContentResponse(BaseModel):
     views: int
     likes: int
     is_published: bool
+    liked_by_me: bool = False
+
+class TagFacetResponse(BaseModel):
+    name: str
+    count: int
 
 class ContentListResponse(BaseModel):
     content: List[ContentResponse]
@@ -88,11 +94,15 @@ async def create_content(
 
 @router.get("/", response_model=ContentListResponse)
 async def get_content(
+    response: Response,
     type: Optional[str] = Query(None, description="Filter by content type: news, article, test, career"),
     status: Optional[str] = Query("published", description="Filter by status: draft, pending, published, rejected"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    search: Optional[str] = Query(None, min_length=1, max_length=100)
+    search: Optional[str] = Query(None, min_length=1, max_length=100),
+    tag: Optional[str] = Query(None, min_length=1, max_length=64),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Optional[UserPrivate] = Depends(get_optional_user),
 ):
     if type and ContentType.from_value(type) is None:
         raise HTTPException(status_code=400, detail="Invalid content type")
@@ -100,21 +110,54 @@ async def get_content(
     if status and ContentStatus.from_value(status) is None:
         raise HTTPException(status_code=400, detail="Invalid status")
 
+    only_published = status is None or status.lower() == ContentStatus.PUBLISHED.value
+
     async with AsyncSessionLocal() as session:
         content_service = ContentService(session)
-        result = await content_service.get_content_list(
-            content_type=type,
-            status=status,
-            search=search,
-            page=page,
-            page_size=page_size,
-            only_published=(status is None or status.lower() == ContentStatus.PUBLISHED.value),
-        )
+        if only_published:
+            result, etag = await content_service.get_published_content_list(
+                content_type=type,
+                status=status,
+                search=search,
+                page=page,
+                page_size=page_size,
+                tag=tag,
+            )
+            # ETag описывает общую ленту; персональные поля для авторизованных его не используют
+            if current_user is None:
+                if etag_matches(if_none_match, etag):
+                    return Response(status_code=304, headers={"ETag": etag})
+                response.headers["ETag"] = etag
+        else:
+            result = await content_service.get_content_list(
+                content_type=type,
+                status=status,
+                search=search,
+                page=page,
+                page_size=page_size,
+                only_published=False,
+                tag=tag,
+            )
+        if current_user:
+            liked_ids = await content_service.get_liked_content_ids(
+                current_user.id, (item["id"] for item in result["content"])
+            )
+            for item in result["content"]:
+                item["liked_by_me"] = item["id"] in liked_ids
 
     return ContentListResponse(**result)
 
+@router.get("/tags", response_model=List[TagFacetResponse])
+async def get_content_tags(limit: int = Query(50, ge=1, le=200)):
+    """Популярные теги опубликованного контента со счётчиками."""
+    async with AsyncSessionLocal() as session:
+        return await ContentService(session).get_tag_facets(limit)
+
 @router.get("/{content_id}", response_model=ContentResponse)
-async def get_content_by_id(content_id: int):
+async def get_content_by_id(
+    content_id: int,
+    current_user: Optional[UserPrivate] = Depends(get_optional_user),
+):
     async with AsyncSessionLocal() as session:
         content_service = ContentService(session)
         content_obj = await content_service.get_content_by_id(content_id)
@@ -122,6 +165,9 @@ async def get_content_by_id(content_id: int):
             raise HTTPException(status_code=404, detail="Content not found")
 
         await content_service.increment_views(content_id)
+        if current_user:
+            liked_ids = await content_service.get_liked_content_ids(current_user.id, [content_id])
+            content_obj["liked_by_me"] = content_id in liked_ids
 
     return ContentResponse(**content_obj)
 
@@ -175,8 +221,10 @@ async def unlike_content(
     content_id: int,
     current_user: UserPrivate = Depends(get_current_user)
 ):
-    # В реальном проекте здесь должна быть логика снятия лайка
-    return {"success": True, "message": "Content unliked"}
+    async with AsyncSessionLocal() as session:
+        content_service = ContentService(session)
+        result = await content_service.unlike(content_id, current_user.id)
+    return result
 
 @router.post("/{content_id}/approve")
 async def approve_content(
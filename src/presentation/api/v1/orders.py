@@ -7,6 +7,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.infrastructure.dependencies import get_order_service, get_session, get_user_service
 from src.infrastructure.monitoring.logger import logger
 from src.infrastructure.services.order_service import OrderService
+from src.infrastructure.services.order_placement_service import OrderPlacementService
+from src.infrastructure.services.balance_service import (
+    PLATFORM_REVENUE,
+    BalanceLedger,
+    DuplicateTransferError,
+    InsufficientFundsError,
+    Leg,
+    to_minor,
+)
 from src.infrastructure.services.user_service import UserService
 from src.infrastructure.repositiry.db_models import (
     OrderORM,
@@ -17,7 +26,7 @@ from src.infrastructure.repositiry.db_models import (
     OrderTypeEnum,
     CurrencyTypeEnum,
 )
-from sqlalchemy import select, delete, and_
+from sqlalchemy import select, delete, and_, update
 from src.presentation.api.v1.auth import get_current_user, get_optional_user
 from src.presentation.api.v1.schemas.order_schemas import (
     OrderCreate, OrderUpdate, OrderResponse, OrderListResponse, 
@@ -31,97 +40,44 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 def _currency_label(currency: CurrencyTypeEnum) -> str:
     return "руб." if currency == CurrencyTypeEnum.RUB else "TF"
 
-def _get_balance(user: UserPrivate | UserORM, currency: CurrencyTypeEnum) -> float:
-    if hasattr(user, "get_balance"):
-        return float(user.get_balance(currency))
-    if currency == CurrencyTypeEnum.TF:
-        return float(getattr(user, "tf_balance", 0.0) or 0.0)
-    return float(getattr(user, "balance", 0.0) or 0.0)
-
-def _set_balance(user: UserPrivate | UserORM, currency: CurrencyTypeEnum, value: float) -> None:
-    amount = float(value or 0.0)
-    if hasattr(user, "set_balance"):
-        user.set_balance(currency, amount)
-        return
-    if currency == CurrencyTypeEnum.TF:
-        setattr(user, "tf_balance", amount)
-    else:
-        user.balance = amount
-
 @router.post("/", response_model=OrderResponse)
 async def create_order(
     order_data: OrderCreate,
     current_user: UserPrivate = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
     order_service: OrderService = Depends(get_order_service),
-    user_service: UserService = Depends(get_user_service),
 ):
     try:
-        user_orm = await user_service.get_user_by_id(current_user.id)
-        if not user_orm:
-            raise HTTPException(status_code=404, detail="User not found")
-
         commission = await order_service.get_commission_settings(session)
-        commission_post_order = int(commission.get("commission_post_order", 200)) if commission else 200
+        commission_post_order = commission.commission_post_order
         order_currency = CurrencyTypeEnum(order_data.currency.value)
 
-        user_balance = _get_balance(user_orm, order_currency)
-        if user_balance < commission_post_order:
+        try:
+            placed = await OrderPlacementService(session).place_order(
+                current_user.id,
+                currency=order_currency,
+                fee=commission_post_order,
+                category_id=order_data.category_id,
+                category_name=order_data.category,
+                title=order_data.title,
+                description=order_data.description,
+                price=order_data.price,
+                term=order_data.term,
+                priority=order_data.priority.value,
+                status=OrderStatus.OPEN.value,
+                order_type=OrderTypeEnum(order_data.order_type.value),
+            )
+        except InsufficientFundsError as exc:
             raise HTTPException(
                 status_code=400,
                 detail=(
                     f"Недостаточно средств для публикации заказа. Нужно {commission_post_order} {_currency_label(order_currency)}, "
-                    f"доступно {user_balance} {_currency_label(order_currency)}."
+                    f"доступно {exc.available} {_currency_label(order_currency)}."
                 ),
             )
 
-        category = None
-        if order_data.category_id:
-            cat_result = await session.execute(
-                select(CategoryORM).where(CategoryORM.id == order_data.category_id)
-            )
-            category = cat_result.scalar_one_or_none()
-            if not category:
-                category_name = order_data.category or f"Category {order_data.category_id}"
-                category = CategoryORM(name=category_name)
-                session.add(category)
-                await session.commit()
-                await session.refresh(category)
-        else:
-            cat_result = await session.execute(
-                select(CategoryORM).where(CategoryORM.name == order_data.category)
-            )
-            category = cat_result.scalar_one_or_none()
-            if not category:
-                category = CategoryORM(name=order_data.category)
-                session.add(category)
-                await session.commit()
-                await session.refresh(category)
-
-        new_order = OrderORM(
-            title=order_data.title,
-            description=order_data.description,
-            price=order_data.price,
-            currency=order_currency,
-            customer_id=current_user.id,
-            term=order_data.term,
-            priority=order_data.priority.value,
-            status=OrderStatus.OPEN.value,
-            category_id=category.id,
-            order_type=OrderTypeEnum(order_data.order_type.value),
-        )
-        session.add(new_order)
-
-        _set_balance(user_orm, order_currency, user_balance - commission_post_order)
-        await session.commit()
-        await session.refresh(new_order)
-
-        customer_result = await session.execute(select(UserORM).where(UserORM.id == new_order.customer_id))
-        customer = customer_result.scalar_one_or_none()
-        category_result = await session.execute(select(CategoryORM).where(CategoryORM.id == new_order.category_id))
-        category = category_result.scalar_one_or_none()
-
-        return await OrderHandlers.create_order_response(new_order, customer, category)
+        # Ответ собирается из уже имеющихся объектов, без повторных SELECT
+        return await OrderHandlers.create_order_response(placed.order, current_user, placed.category)
     except HTTPException:
         raise
     except Exception as e:
@@ -221,20 +177,23 @@ async def respond_to_order(
 
     order_currency = order.currency if isinstance(order.currency, CurrencyTypeEnum) else CurrencyTypeEnum(order.currency)
 
-    commission = await order_service.get_commission_settings(session) or {}
-    commission_response_threshold = int(commission.get("commission_response_threshold", 5000))
-    commission_response_percent = float(commission.get("commission_response_percent", 1.0))
+    commission = await order_service.get_commission_settings(session)
+    commission_response_threshold = commission.commission_response_threshold
+    commission_response_percent = commission.commission_response_percent
 
     response_fee = 0
     if respond_data.price > commission_response_threshold:
         response_fee = int(respond_data.price * commission_response_percent / 100)
-        executor_balance = _get_balance(executor, order_currency)
-        if executor_balance < response_fee:
+        try:
+            await BalanceLedger(session).debit(
+                executor.id, order_currency, response_fee, kind="response_fee", reference=f"order:{order_id}"
+            )
+        except InsufficientFundsError:
+            await session.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Недостаточно средств для отклика. Нужно {response_fee} {_currency_label(order_currency)}.",
             )
-        _set_balance(executor, order_currency, executor_balance - response_fee)
         await session.commit()
 
     from src.infrastructure.services.chat_service import ChatService
@@ -357,43 +316,64 @@ async def approve_order(
     offer_price = order.price
     order_currency = order.currency if isinstance(order.currency, CurrencyTypeEnum) else CurrencyTypeEnum(order.currency)
 
-    commission = await order_service.get_commission_settings(session) or {}
-    commission_customer = float(commission.get("commission_customer", 10.0))
-    commission_executor = float(commission.get("commission_executor", 5.0))
+    commission = await order_service.get_commission_settings(session)
+    commission_customer = commission.commission_customer
+    commission_executor = commission.commission_executor
 
     total_for_customer = int(offer_price + offer_price * commission_customer / 100)
     executor_balance = int(offer_price - offer_price * commission_executor / 100)
 
-    customer_balance = _get_balance(customer, order_currency)
-    if customer_balance < total_for_customer:
+    # Оплата заказа — один перевод: заказчик платит, исполнитель получает, разница — комиссия платформы.
+    # transfer_id по заказу не даёт провести оплату дважды при повторном подтверждении
+    charge = to_minor(total_for_customer)
+    payout = to_minor(executor_balance) if order.executor_id else 0
+    legs = [Leg.for_user(customer.id, -charge), Leg(PLATFORM_REVENUE, charge - payout)]
+    if payout:
+        legs.append(Leg.for_user(order.executor_id, payout))
+
+    ledger = BalanceLedger(session)
+    try:
+        await ledger.transfer(
+            order_currency,
+            "order_settlement",
+            legs,
+            reference=f"order:{order_id}",
+            transfer_id=f"order-settlement:{order_id}",
+        )
+    except InsufficientFundsError as exc:
+        await session.rollback()
         raise HTTPException(
             status_code=400,
             detail=(
                 f"Недостаточно средств на балансе. Нужно {total_for_customer} {_currency_label(order_currency)}, "
-                f"доступно {customer_balance} {_currency_label(order_currency)}."
+                f"доступно {exc.available} {_currency_label(order_currency)}."
             ),
         )
-
-    _set_balance(customer, order_currency, customer_balance - total_for_customer)
-
-    executor = await user_service.get_user_by_id(order.executor_id)
-    if executor:
-        executor_balance_before = _get_balance(executor, order_currency)
-        _set_balance(executor, order_currency, executor_balance_before + executor_balance)
-        executor.done_count += 1
-        await session.commit()
-    else:
-        await session.commit()
-
+    except DuplicateTransferError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Order is already paid")
+    except LookupError:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Executor not found")
+
+    if order.executor_id:
+        await session.execute(
+            update(UserORM)
+            .where(UserORM.id == order.executor_id)
+            .values(done_count=UserORM.done_count + 1)
+            .execution_options(synchronize_session=False)
+        )
     order.status = "CLOSE"
     await session.commit()
 
+    balances = await ledger.balances([customer.id, order.executor_id or customer.id], order_currency)
+
     return {
         "success": True,
         "order_id": order_id,
         "status": "CLOSE",
-        "customer_balance": _get_balance(customer, order_currency),
-        "executor_balance": _get_balance(executor, order_currency) if executor else 0,
+        "customer_balance": balances.get(customer.id, 0.0),
+        "executor_balance": balances.get(order.executor_id, 0.0) if order.executor_id else 0,
         "total_paid": total_for_customer,
         "executor_received": executor_balance,
     }
@@ -1,25 +1,53 @@
 from __future__ import annotations
 
-import os
-import shutil
-import uuid
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field, computed_field
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entity.userentity import UserPrivate
 from src.infrastructure.dependencies import (
     get_portfolio_service,
     get_reward_service,
+    get_session,
 )
+from src.infrastructure.services.blob_store import SHA256_PATTERN, BlobStore
+from src.infrastructure.services.image_service import VARIANT_FORMATS, image_pipeline
 from src.infrastructure.services.portfolio_service import PortfolioService
 from src.infrastructure.services.reward_service import RewardService
+from src.infrastructure.services.upload_service import (
+    UnsupportedFileTypeError,
+    UploadError,
+    UploadTooLargeError,
+    receive_upload,
+)
 from src.presentation.api.v1.auth import get_current_user
 
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
 
-UPLOAD_DIR = os.path.join("assets", "uploads")
+# Тело читается потоком, поэтому схема multipart описана для документации вручную
+UPLOAD_REQUEST_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+class MediaVariantResponse(BaseModel):
+    width: int
+    format: str
+    url: str
 
 
 class PortfolioItemResponse(BaseModel):
@@ -35,6 +63,26 @@ class PortfolioItemResponse(BaseModel):
     class Config:
         orm_mode = True
 
+    @computed_field
+    @property
+    def media_variants(self) -> List[MediaVariantResponse]:
+        """Уменьшенные копии media_url для srcset (рисуются при первом запросе)."""
+        return [
+            MediaVariantResponse(width=variant.width, format=variant.format, url=variant.url)
+            for variant in image_pipeline.variants_for(self.media_url)
+        ]
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        variants = image_pipeline.variants_for(self.media_url)
+        return variants[0].url if variants else None
+
+
+class TagFacetResponse(BaseModel):
+    name: str
+    count: int
+
 
 class PortfolioItemCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=120)
@@ -56,19 +104,29 @@ class PortfolioItemUpdate(BaseModel):
 
 @router.get("/me", response_model=List[PortfolioItemResponse])
 async def my_portfolio(
+    tag: Optional[str] = Query(None, min_length=1, max_length=64),
     current_user: UserPrivate = Depends(get_current_user),
     portfolio_service: PortfolioService = Depends(get_portfolio_service),
 ):
-    items = await portfolio_service.list_by_user(current_user.id)
+    items = await portfolio_service.list_by_user(current_user.id, tag=tag)
     return items
 
 
+@router.get("/tags", response_model=List[TagFacetResponse])
+async def portfolio_tags(
+    limit: int = Query(50, ge=1, le=200),
+    portfolio_service: PortfolioService = Depends(get_portfolio_service),
+):
+    return await portfolio_service.get_tag_facets(limit)
+
+
 @router.get("/users/{user_id}", response_model=List[PortfolioItemResponse])
 async def user_portfolio(
     user_id: int,
+    tag: Optional[str] = Query(None, min_length=1, max_length=64),
     portfolio_service: PortfolioService = Depends(get_portfolio_service),
 ):
-    return await portfolio_service.list_by_user(user_id)
+    return await portfolio_service.list_by_user(user_id, tag=tag)
 
 
 @router.post("", response_model=PortfolioItemResponse)
@@ -128,21 +186,52 @@ async def delete_portfolio_item(
     return {"success": True}
 
 
-@router.post("/upload", response_model=dict)
+@router.post("/upload", response_model=dict, openapi_extra=UPLOAD_REQUEST_SCHEMA)
 async def upload_portfolio_file(
-    file: UploadFile = File(...),
+    request: Request,
+    sha256: Optional[str] = Query(None, pattern=SHA256_PATTERN, description="Хэш файла: если он уже есть, тело не читается"),
     current_user: UserPrivate = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
 ):
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(file.filename or "")[1]
-    safe_name = f"{uuid.uuid4().hex}{ext}"
-    destination = os.path.join(UPLOAD_DIR, safe_name)
-
-    with open(destination, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    url = f"/assets/uploads/{safe_name}"
-    return {"url": url}
+    blobs = BlobStore(session)
+    if sha256:
+        existing = await blobs.reuse(sha256)
+        if existing is not None:
+            return {"url": existing.url, "sha256": existing.sha256, "deduplicated": True}
+
+    try:
+        stored = await receive_upload(request, store=blobs.store)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except UnsupportedFileTypeError as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+    except UploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # Уменьшенные копии готовятся в фоне, первый запрос списка их уже не ждёт
+    image_pipeline.schedule(stored.url)
+    return {"url": stored.url, "sha256": stored.sha256, "deduplicated": stored.deduplicated}
+
+
+# Варианты неизменяемы: имя содержит хэш оригинала
+MEDIA_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@router.get("/media/{shard}/{file_name}")
+async def portfolio_media_variant(
+    shard: str,
+    file_name: str,
+    w: int = Query(..., ge=1),
+    format: str = Query("webp"),
+):
+    """Уменьшенная копия изображения; рисуется при первом обращении."""
+    try:
+        path = await image_pipeline.ensure(f"{shard}/{file_name}", w, format)
+    except Exception:  # noqa: BLE001 - повреждённое или неподдерживаемое изображение
+        raise HTTPException(status_code=422, detail="Image cannot be processed")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image variant not found")
+    return FileResponse(path, media_type=VARIANT_FORMATS[format][1], headers=MEDIA_CACHE_HEADERS)
 
 
 @router.get("/achievements", response_model=dict)
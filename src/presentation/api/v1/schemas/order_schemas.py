@@ -67,6 +67,8 @@ class OrderResponse(BaseModel):
     customer_nickname: str
     customer_rating: float = 0.0
     customer_orders_count: int = 0
+    # Только для авторизованного пользователя; у анонимных запросов — None
+    is_favorite: Optional[bool] = None
 
 class OrderListResponse(BaseModel):
     orders: List[OrderResponse]
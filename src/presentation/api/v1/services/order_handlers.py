@@ -1,9 +1,12 @@
+from typing import Optional
+
 from fastapi import HTTPException
 from sqlalchemy import select
 from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
 from src.infrastructure.services.order_service import OrderService
 from src.infrastructure.services.user_service import UserService
 from src.infrastructure.services.message_service import MessageService
+from src.infrastructure.services.favorite_service import FavoriteService
 from src.infrastructure.repositiry.db_models import OrderORM, CategoryORM, UserORM, OrderTypeEnum, CurrencyTypeEnum
 from src.presentation.api.v1.schemas.order_schemas import OrderResponse, OrderListResponse, OrderStatus, OrderPriority, OrderType, CurrencyType
 from src.domain.entity.userentity import UserPrivate
@@ -52,7 +55,12 @@ class OrderHandlers:
             return default
 
     @staticmethod
-    async def create_order_response(order_orm: OrderORM, customer: UserORM, category: CategoryORM) -> OrderResponse:
+    async def create_order_response(
+        order_orm: OrderORM,
+        customer: UserORM,
+        category: CategoryORM,
+        is_favorite: Optional[bool] = None,
+    ) -> OrderResponse:
         status = OrderHandlers._resolve_enum(OrderStatus, getattr(order_orm, "status", None), OrderStatus.OPEN, STATUS_ALIASES)
         priority = OrderHandlers._resolve_enum(OrderPriority, getattr(order_orm, "priority", None), OrderPriority.NORMAL)
 
@@ -90,6 +98,7 @@ class OrderHandlers:
             customer_nickname=customer.nickname if customer else "",
             customer_rating=float(getattr(customer, "customer_rating", 0.0) or 0.0) if customer else 0.0,
             customer_orders_count=int(getattr(customer, "done_count", 0) or 0) if customer else 0,
+            is_favorite=is_favorite,
         )
 
     @staticmethod
@@ -131,6 +140,13 @@ class OrderHandlers:
             query = query.offset(offset).limit(page_size)
             result = await session.execute(query)
             order_orms = result.scalars().all()
+
+            # Отметки избранного для всей страницы сразу, а не запросом на карточку
+            favorite_ids = None
+            if current_user_id:
+                favorite_ids = await FavoriteService(session).favorite_order_ids(
+                    current_user_id, [order.id for order in order_orms]
+                )
             
             orders = []
             for order in order_orms:
@@ -139,7 +155,12 @@ class OrderHandlers:
                 category_result = await session.execute(select(CategoryORM).where(CategoryORM.id == order.category_id))
                 category = category_result.scalar_one_or_none()
                 
-                order_response = await OrderHandlers.create_order_response(order, customer, category)
+                order_response = await OrderHandlers.create_order_response(
+                    order,
+                    customer,
+                    category,
+                    is_favorite=order.id in favorite_ids if favorite_ids is not None else None,
+                )
                 orders.append(order_response)
             
             total_pages = (total_count + page_size - 1) // page_size
@@ -8,44 +8,25 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPExce
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-import json
-import asyncio
-from collections import defaultdict
 from http.cookies import SimpleCookie
 
 from jose import JWTError
 
 from src.infrastructure.monitoring.logger import logger
 from src.infrastructure.repositiry.base_repository import AsyncSessionLocal
+from src.infrastructure.cache.chat_membership import chat_membership
 from src.infrastructure.services.auth_service import decode_access_token
 from src.infrastructure.services.chat_service import ChatService
 from src.infrastructure.services.message_service import MessageService
 from src.infrastructure.services.user_service import UserService
-from src.infrastructure.repositiry.db_models import ChatORM, MessageORM, UserORM
-from sqlalchemy import select
+from src.infrastructure.repositiry.db_models import MessageORM, UserORM
 from src.domain.entity.userentity import UserPrivate
 from src.presentation.api.v1.auth import get_current_user
+from src.presentation.api.v1.websocket_engine import dispatcher, manager
 from src.infrastructure.security.content_filter import ContentRejectedError
 
 router = APIRouter(prefix="/ws", tags=["WebSocket Chats"])
 
-# Переходная таблица типов сообщений для обратной совместимости
-MESSAGE_TYPE_ALIASES = {
-    "join_chat": "join_chat",
-    "joinChat": "join_chat",
-    "leave_chat": "leave_chat",
-    "leaveChat": "leave_chat",
-    "send_message": "send_message",
-    "sendMessage": "send_message",
-    "chat_message": "send_message",
-    "message": "send_message",
-    "get_chats": "get_chats",
-    "getChats": "get_chats",
-    "get_messages": "get_messages",
-    "getMessages": "get_messages",
-    "ping": "ping",
-}
-
 # Pydantic модели для WebSocket
 class WSMessage(BaseModel):
     type: str
@@ -74,78 +55,6 @@ class WSChatData(BaseModel):
     created_at: str
     last_message: Optional[WSMessageData] = None
 
-# Менеджер WebSocket соединений
-class ConnectionManager:
-    def __init__(self):
-        # Словарь для хранения активных соединений по user_id
-        self.active_connections: Dict[int, List[WebSocket]] = defaultdict(list)
-        # Словарь для хранения соединений по chat_id
-        self.chat_connections: Dict[int, List[WebSocket]] = defaultdict(list)
-        # Словарь для хранения user_id по websocket
-        self.websocket_users: Dict[WebSocket, int] = {}
-
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Подключение пользователя к WebSocket"""
-        await websocket.accept()
-        self.active_connections[user_id].append(websocket)
-        self.websocket_users[websocket] = user_id
-        
-        # Отправляем подтверждение подключения
-        await self.send_personal_message({
-            "type": "connection_established",
-            "user_id": user_id,
-            "timestamp": datetime.utcnow().isoformat()
-        }, websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        """Отключение пользователя от WebSocket"""
-        if websocket in self.websocket_users:
-            user_id = self.websocket_users[websocket]
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-            del self.websocket_users[websocket]
-
-        for chat_id, sockets in list(self.chat_connections.items()):
-            if websocket in sockets:
-                sockets.remove(websocket)
-                if not sockets:
-                    del self.chat_connections[chat_id]
-
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Отправка сообщения конкретному WebSocket"""
-        try:
-            await websocket.send_text(json.dumps(message, ensure_ascii=False))
-        except Exception as exc:
-            logger.warning("WebSocket send failed", error=str(exc))
-
-    async def send_to_user(self, message: dict, user_id: int):
-        """Отправка сообщения всем соединениям пользователя"""
-        if user_id in self.active_connections:
-            for websocket in self.active_connections[user_id]:
-                await self.send_personal_message(message, websocket)
-
-    async def send_to_chat(self, message: dict, chat_id: int, exclude_user: Optional[int] = None):
-        """Отправка сообщения всем участникам чата"""
-        if chat_id in self.chat_connections:
-            for websocket in self.chat_connections[chat_id]:
-                if exclude_user and self.websocket_users.get(websocket) == exclude_user:
-                    continue
-                await self.send_personal_message(message, websocket)
-
-    def add_to_chat(self, websocket: WebSocket, chat_id: int):
-        """Добавление соединения к чату"""
-        self.chat_connections[chat_id].append(websocket)
-
-    def remove_from_chat(self, websocket: WebSocket, chat_id: int):
-        """Удаление соединения из чата"""
-        if websocket in self.chat_connections[chat_id]:
-            self.chat_connections[chat_id].remove(websocket)
-
-# Глобальный менеджер соединений
-manager = ConnectionManager()
-
 def get_user_from_token(token: str) -> Optional[int]:
     """Получение user_id из JWT токена"""
     try:
@@ -169,6 +78,8 @@ async def websocket_endpoint(websocket: WebSocket):
     # Проверяем query параметры (обратная совместимость)
     query_params = dict(websocket.query_params)
     token = query_params.get('token')
+    # Клиент отвечает на кадры heartbeat — его можно закрывать за молчание
+    answers_heartbeat = query_params.get('heartbeat') in ('1', 'true')
 
     # Пытаемся извлечь из cookie (предпочтительный способ)
     if not token:
@@ -196,17 +107,41 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=1008, reason="Invalid token")
         return
 
-    await manager.connect(websocket, user_id)
+    if not await manager.connect(websocket, user_id, answers_heartbeat):
+        return
     logger.info("WebSocket connected", user_id=user_id, endpoint="/api/v1/ws/chat")
 
+    # Подтверждение подключения; клиент узнаёт интервал heartbeat
+    await manager.send_personal_message({
+        "type": "connection_established",
+        "user_id": user_id,
+        "heartbeat_interval": manager.heartbeat_interval if answers_heartbeat else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }, websocket)
+
+    # Прогреваем кэш участников всех чатов пользователя одним запросом
+    try:
+        await chat_membership.warm_user(user_id)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Chat membership warm-up failed", error=str(exc), user_id=user_id)
+
+    # Переподключение: досылаем только пропущенные события журнала
+    resume_from = _parse_seq(query_params.get("resume_from"))
+    if resume_from is not None:
+        await _replay_events(websocket, user_id, resume_from)
+
     try:
         while True:
             # Получаем сообщение от клиента
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            manager.touch(websocket)
+            data = frame.get("bytes") if frame.get("bytes") is not None else frame.get("text")
+            message_data = manager.decode(websocket, data)
             
             # Обрабатываем сообщение
-            await handle_websocket_message(websocket, user_id, message_data)
+            await dispatcher.dispatch(websocket, user_id, message_data)
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -215,29 +150,7 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error("WebSocket error", error=str(e), user_id=user_id)
         manager.disconnect(websocket)
 
-async def handle_websocket_message(websocket: WebSocket, user_id: int, message_data: dict):
-    """Обработка WebSocket сообщений"""
-    message_type = message_data.get("type")
-    normalized_type = MESSAGE_TYPE_ALIASES.get(message_type, message_type)
-
-    if normalized_type == "join_chat":
-        await handle_join_chat(websocket, user_id, message_data)
-    elif normalized_type == "leave_chat":
-        await handle_leave_chat(websocket, user_id, message_data)
-    elif normalized_type == "send_message":
-        await handle_send_message(websocket, user_id, message_data)
-    elif normalized_type == "get_chats":
-        await handle_get_chats(websocket, user_id, message_data)
-    elif normalized_type == "get_messages":
-        await handle_get_messages(websocket, user_id, message_data)
-    elif normalized_type == "ping":
-        await handle_ping(websocket, user_id, message_data)
-    else:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": f"Unknown message type: {message_type}"
-        }, websocket)
-
+@dispatcher.handler("join_chat", "joinChat")
 async def handle_join_chat(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка подключения к чату"""
     payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
@@ -250,16 +163,12 @@ async def handle_join_chat(websocket: WebSocket, user_id: int, message_data: dic
         return
 
     # Проверяем доступ к чату
-    async with AsyncSessionLocal() as session:
-        chat_result = await session.execute(select(ChatORM).where(ChatORM.id == chat_id))
-        chat = chat_result.scalar_one_or_none()
-        
-        if not chat or (chat.customer_id != user_id and chat.executor_id != user_id):
-            await manager.send_personal_message({
-                "type": "error",
-                "message": "Access denied to chat"
-            }, websocket)
-            return
+    if not await chat_membership.is_member(chat_id, user_id):
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "Access denied to chat"
+        }, websocket)
+        return
 
     # Добавляем соединение к чату
     manager.add_to_chat(websocket, chat_id)
@@ -269,6 +178,7 @@ async def handle_join_chat(websocket: WebSocket, user_id: int, message_data: dic
         "chat_id": chat_id
     }, websocket)
 
+@dispatcher.handler("leave_chat", "leaveChat")
 async def handle_leave_chat(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка отключения от чата"""
     payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
@@ -281,28 +191,32 @@ async def handle_leave_chat(websocket: WebSocket, user_id: int, message_data: di
             "chat_id": chat_id
         }, websocket)
 
+@dispatcher.handler("send_message", "sendMessage", "chat_message", "message")
 async def handle_send_message(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка отправки сообщения"""
     payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
     chat_id = payload.get("chat_id") or payload.get("chatId")
+    target_user_id = payload.get("user_id") or payload.get("userId")
     text = payload.get("text") or payload.get("message")
     
-    if not chat_id or not text:
+    if not (chat_id or target_user_id) or not text:
         await manager.send_personal_message({
             "type": "error",
-            "message": "chat_id and text are required"
+            "message": "chat_id (or user_id) and text are required"
         }, websocket)
         return
 
     async with AsyncSessionLocal() as session:
         message_service = MessageService(session)
         user_service = UserService(session)
+
+        # Первое сообщение пользователю: чат находится или создаётся по паре участников
+        if not chat_id:
+            chat = await ChatService(session).get_or_create_chat_between_users(user_id, target_user_id)
+            chat_id = chat.id
         
         # Проверяем доступ к чату
-        chat_result = await session.execute(select(ChatORM).where(ChatORM.id == chat_id))
-        chat = chat_result.scalar_one_or_none()
-        
-        if not chat or (chat.customer_id != user_id and chat.executor_id != user_id):
+        if not await chat_membership.is_member(chat_id, user_id, session):
             await manager.send_personal_message({
                 "type": "error",
                 "message": "Access denied to chat"
@@ -310,7 +224,15 @@ async def handle_send_message(websocket: WebSocket, user_id: int, message_data:
             return
 
         # Отправляем сообщение
-        message = await message_service.send_message(chat_id, user_id, text)
+        try:
+            message = await message_service.send_message(chat_id, user_id, text)
+        except ContentRejectedError as exc:
+            await manager.send_personal_message({
+                "type": "moderation",
+                "message": "Сообщение отклонено автоматической модерацией",
+                "sanitized": exc.sanitized_text
+            }, websocket)
+            return
         user = await user_service.get_user_by_id(user_id)
         
         # Формируем данные сообщения
@@ -326,13 +248,31 @@ async def handle_send_message(websocket: WebSocket, user_id: int, message_data:
             "offer_price": getattr(message, 'offer_price', None)
         }
         
-        # Отправляем сообщение всем участникам чата
-        await manager.send_to_chat({
+        new_message_event = {
             "type": "new_message",
             "chat_id": chat_id,
             "message": message_response
-        }, chat_id)
+        }
+        membership = await chat_membership.get(chat_id, session)
+        if membership is None:
+            await manager.send_to_chat(new_message_event, chat_id)
+        else:
+            # Через журнал: получатели офлайн или на другом воркере получат событие при переподключении
+            await manager.send_durable(new_message_event, membership.participants)
+            # Дельта для списка чатов вместо повторной отправки всего списка
+            await manager.send_to_participants({
+                "type": "chat_updated",
+                "chat": {
+                    "id": chat_id,
+                    "customer_id": membership.customer_id,
+                    "executor_id": membership.executor_id,
+                    "last_message": message_response
+                }
+            }, chat_id)
+            recipients = [participant for participant in membership.participants if participant != user_id]
+            await push_unread_updates(chat_id, recipients, session)
 
+@dispatcher.handler("get_chats", "getChats")
 async def handle_get_chats(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка получения списка чатов"""
     async with AsyncSessionLocal() as session:
@@ -384,6 +324,7 @@ async def handle_get_chats(websocket: WebSocket, user_id: int, message_data: dic
             "chats": chats
         }, websocket)
 
+@dispatcher.handler("get_messages", "getMessages")
 async def handle_get_messages(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка получения сообщений чата"""
     payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
@@ -406,10 +347,7 @@ async def handle_get_messages(websocket: WebSocket, user_id: int, message_data:
         user_service = UserService(session)
         
         # Проверяем доступ к чату
-        chat_result = await session.execute(select(ChatORM).where(ChatORM.id == chat_id))
-        chat = chat_result.scalar_one_or_none()
-        
-        if not chat or (chat.customer_id != user_id and chat.executor_id != user_id):
+        if not await chat_membership.is_member(chat_id, user_id, session):
             await manager.send_personal_message({
                 "type": "error",
                 "message": "Access denied to chat"
@@ -441,6 +379,103 @@ async def handle_get_messages(websocket: WebSocket, user_id: int, message_data:
             "messages": new_messages
         }, websocket)
 
+@dispatcher.handler("mark_read", "markRead")
+async def handle_mark_read(websocket: WebSocket, user_id: int, message_data: dict):
+    """Обработка отметки чата прочитанным"""
+    payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
+    chat_id_raw = payload.get("chat_id")
+    if chat_id_raw is None:
+        chat_id_raw = payload.get("chatId")
+    message_id_raw = payload.get("message_id")
+    if message_id_raw is None:
+        message_id_raw = payload.get("messageId")
+
+    if chat_id_raw is None:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "chat_id is required"
+        }, websocket)
+        return
+
+    try:
+        chat_id = int(chat_id_raw)
+        # None — отметить прочитанным весь чат
+        message_id = int(message_id_raw) if message_id_raw is not None else None
+    except (TypeError, ValueError):
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "chat_id and message_id must be integers"
+        }, websocket)
+        return
+
+    async with AsyncSessionLocal() as session:
+        if not await chat_membership.is_member(chat_id, user_id, session):
+            await manager.send_personal_message({
+                "type": "error",
+                "message": "Access denied to chat"
+            }, websocket)
+            return
+
+        state = await ChatService(session).mark_chat_read(chat_id, user_id, message_id)
+
+    # Все вкладки пользователя получают новое значение счётчика
+    await manager.send_to_user(unread_update_event(state), user_id)
+
+def unread_update_event(state) -> dict:
+    return {
+        "type": "unread_update",
+        "chat_id": state.chat_id,
+        "unread_count": state.unread_count,
+        "last_read_message_id": state.last_read_message_id,
+    }
+
+async def push_unread_updates(chat_id: int, user_ids: List[int], session) -> None:
+    """Разослать актуальные счётчики непрочитанных подключённым участникам чата"""
+    online = [participant for participant in user_ids if participant in manager.active_connections]
+    if not online:
+        return
+    states = await ChatService(session).get_read_states(chat_id, online)
+    for participant, state in states.items():
+        await manager.send_to_user(unread_update_event(state), participant)
+
+@dispatcher.handler("pong", "heartbeat_ack")
+async def handle_heartbeat_ack(websocket: WebSocket, user_id: int, message_data: dict):
+    """Ответ клиента на серверный heartbeat: живость уже отмечена при приёме кадра"""
+    return None
+
+@dispatcher.handler("resume")
+async def handle_resume(websocket: WebSocket, user_id: int, message_data: dict):
+    """Запрос пропущенных событий журнала после указанного seq"""
+    payload = message_data.get("data") if isinstance(message_data.get("data"), dict) else message_data
+    resume_from = _parse_seq(payload.get("resume_from") or payload.get("resumeFrom"))
+    if resume_from is None:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "resume_from is required"
+        }, websocket)
+        return
+    await _replay_events(websocket, user_id, resume_from)
+
+def _parse_seq(value) -> Optional[int]:
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
+
+async def _replay_events(websocket: WebSocket, user_id: int, resume_from: int):
+    try:
+        await manager.replay(websocket, user_id, resume_from)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("WebSocket event replay failed", error=str(exc), user_id=user_id)
+        await manager.send_personal_message({
+            "type": "events_replay",
+            "events": [],
+            "last_seq": resume_from,
+            "resync_required": True,
+        }, websocket)
+
+@dispatcher.handler("ping")
 async def handle_ping(websocket: WebSocket, user_id: int, message_data: dict):
     """Обработка ping сообщения"""
     await manager.send_personal_message({
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий движок WebSocket: реестр соединений и диспетчер типов сообщений.
+"""
+
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+from src.config import settings
+from src.infrastructure.cache.chat_membership import chat_membership
+from src.infrastructure.cache.invalidation_bus import invalidation_bus
+from src.infrastructure.monitoring.logger import logger
+from src.infrastructure.services.event_outbox import event_outbox
+from src.presentation.api.v1.websocket_protocol import Codec, json_codec, negotiate
+
+Handler = Callable[[WebSocket, int, dict], Awaitable[None]]
+
+WS_EVENTS_TOPIC = "ws_events"
+
+
+class _Frame:
+    """Исходящее сообщение, сериализуемое не более одного раза на каждый кодек."""
+
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded: Dict[str, Any] = {}
+
+    def encode(self, codec: Codec):
+        payload = self._encoded.get(codec.subprotocol)
+        if payload is None:
+            payload = self._encoded[codec.subprotocol] = codec.encode(self.message)
+        return payload
+
+
+class ConnectionManager:
+    """Реестр соединений на множествах.
+
+    Кроме прямых индексов (пользователь -> сокеты, чат -> сокеты) хранится обратный
+    индекс сокет -> чаты, поэтому отключение не обходит все чаты воркера.
+
+    Живость всех соединений проверяют ping/pong протокола WebSocket (uvicorn
+    ``ws_ping_interval``, браузер отвечает сам). Клиенты, объявившие при подключении
+    ``heartbeat=1``, дополнительно получают раз в ``heartbeat_interval`` кадр
+    ``heartbeat``; любой их входящий кадр продлевает жизнь соединения, а молчащие
+    дольше ``max_missed`` интервалов закрываются. Остальных за молчание не закрывают.
+    """
+
+    def __init__(
+        self,
+        heartbeat_interval: float = 25.0,
+        max_missed: int = 2,
+        max_per_user: int = 10,
+        max_connections: int = 20_000,
+        send_timeout: float = 5.0,
+    ):
+        self.heartbeat_interval = heartbeat_interval
+        self.max_missed = max_missed
+        self.max_per_user = max_per_user
+        self.max_connections = max_connections
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[int, Set[WebSocket]] = defaultdict(set)
+        self.chat_connections: Dict[int, Set[WebSocket]] = defaultdict(set)
+        self.websocket_users: Dict[WebSocket, int] = {}
+        self.websocket_chats: Dict[WebSocket, Set[int]] = {}
+        self.websocket_codecs: Dict[WebSocket, Codec] = {}
+        self._connected_at: Dict[WebSocket, float] = {}
+        # Только клиенты, отвечающие на heartbeat
+        self._last_seen: Dict[WebSocket, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.evicted_total = 0
+        self.rejected_total = 0
+
+    async def connect(self, websocket: WebSocket, user_id: int, answers_heartbeat: bool = False) -> bool:
+        """Подключение пользователя к WebSocket. False — соединение отклонено лимитом воркера."""
+        if len(self.websocket_users) >= self.max_connections:
+            self.rejected_total += 1
+            logger.warning("WebSocket worker connection limit reached", user_id=user_id)
+            await websocket.close(code=1013, reason="Server is busy")
+            return False
+
+        # Кодек выбирается по Sec-WebSocket-Protocol; без заголовка — JSON
+        codec, subprotocol = negotiate(websocket.scope.get("subprotocols", ()))
+        await websocket.accept(subprotocol=subprotocol)
+        sockets = self.active_connections.get(user_id)
+        if sockets and len(sockets) >= self.max_per_user:
+            # Освобождаем место за счёт самого старого соединения пользователя:
+            # чаще всего это полуоткрытая сессия со старого устройства
+            oldest = min(sockets, key=lambda ws: self._connected_at.get(ws, 0.0))
+            await self.evict(oldest, reason="Too many connections")
+        self.register(websocket, user_id, codec, answers_heartbeat)
+        return True
+
+    def register(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        codec: Codec = json_codec,
+        answers_heartbeat: bool = False,
+    ):
+        now = time.monotonic()
+        self.websocket_codecs[websocket] = codec
+        self.active_connections[user_id].add(websocket)
+        self.websocket_users[websocket] = user_id
+        self.websocket_chats[websocket] = set()
+        self._connected_at[websocket] = now
+        if answers_heartbeat:
+            self._last_seen[websocket] = now
+
+    def touch(self, websocket: WebSocket):
+        """Отметить входящий кадр от клиента"""
+        if websocket in self._last_seen:
+            self._last_seen[websocket] = time.monotonic()
+
+    def disconnect(self, websocket: WebSocket):
+        """Отключение пользователя от WebSocket"""
+        self._connected_at.pop(websocket, None)
+        self._last_seen.pop(websocket, None)
+        self.websocket_codecs.pop(websocket, None)
+        user_id = self.websocket_users.pop(websocket, None)
+        if user_id is not None:
+            sockets = self.active_connections.get(user_id)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.active_connections[user_id]
+
+        for chat_id in self.websocket_chats.pop(websocket, ()):
+            self._discard_from_chat(websocket, chat_id)
+
+    async def evict(self, websocket: WebSocket, reason: str, code: int = 1001):
+        """Принудительно закрыть соединение и убрать его из реестров"""
+        user_id = self.websocket_users.get(websocket)
+        self.disconnect(websocket)
+        self.evicted_total += 1
+        if logger.debug_enabled:
+            logger.debug("WebSocket evicted", user_id=user_id, reason=reason)
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:  # noqa: BLE001
+            # Сокет уже мёртв — закрывать нечего
+            pass
+
+    async def heartbeat(self) -> int:
+        """Один проход heartbeat. Возвращает число закрытых соединений."""
+        now = time.monotonic()
+        deadline = self.heartbeat_interval * self.max_missed
+        frame = _Frame({"type": "heartbeat", "interval": self.heartbeat_interval})
+        expired = []
+        alive = []
+        for websocket, last_seen in list(self._last_seen.items()):
+            (expired if now - last_seen > deadline else alive).append(websocket)
+
+        # Отправки идут параллельно и с таймаутом: зависший клиент не задерживает остальных
+        results = await asyncio.gather(*(self._send_with_timeout(frame, websocket) for websocket in alive))
+        failed = [websocket for websocket, sent in zip(alive, results) if not sent]
+
+        for websocket in expired:
+            await self.evict(websocket, reason="Heartbeat timeout")
+        for websocket in failed:
+            await self.evict(websocket, reason="Send failed")
+        return len(expired) + len(failed)
+
+    async def _send_with_timeout(self, frame: "_Frame", websocket: WebSocket) -> bool:
+        try:
+            return await asyncio.wait_for(self._send(frame, websocket), self.send_timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run_heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("WebSocket heartbeat failed", error=str(exc))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_heartbeat())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики соединений воркера"""
+        registries = (
+            self.active_connections,
+            self.chat_connections,
+            self.websocket_users,
+            self.websocket_chats,
+            self._connected_at,
+            self._last_seen,
+            self.websocket_codecs,
+        )
+        registry_bytes = sum(sys.getsizeof(registry) for registry in registries)
+        registry_bytes += sum(sys.getsizeof(sockets) for sockets in self.active_connections.values())
+        registry_bytes += sum(sys.getsizeof(sockets) for sockets in self.chat_connections.values())
+        registry_bytes += sum(sys.getsizeof(chats) for chats in self.websocket_chats.values())
+        return {
+            "connections": len(self.websocket_users),
+            "users": len(self.active_connections),
+            "chats": len(self.chat_connections),
+            "chat_subscriptions": sum(len(chats) for chats in self.websocket_chats.values()),
+            "binary_connections": sum(1 for codec in self.websocket_codecs.values() if codec.binary),
+            "max_connections": self.max_connections,
+            "max_per_user": self.max_per_user,
+            "evicted_total": self.evicted_total,
+            "rejected_total": self.rejected_total,
+            "registry_bytes": registry_bytes,
+        }
+
+    def add_to_chat(self, websocket: WebSocket, chat_id: int):
+        """Добавление соединения к чату"""
+        self.chat_connections[chat_id].add(websocket)
+        self.websocket_chats.setdefault(websocket, set()).add(chat_id)
+
+    def remove_from_chat(self, websocket: WebSocket, chat_id: int):
+        """Удаление соединения из чата"""
+        chats = self.websocket_chats.get(websocket)
+        if chats is not None:
+            chats.discard(chat_id)
+        self._discard_from_chat(websocket, chat_id)
+
+    def _discard_from_chat(self, websocket: WebSocket, chat_id: int):
+        sockets = self.chat_connections.get(chat_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.chat_connections[chat_id]
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self.active_connections
+
+    def decode(self, websocket: WebSocket, data) -> Dict[str, Any]:
+        """Разобрать входящий кадр кодеком, согласованным для соединения"""
+        return self.websocket_codecs.get(websocket, json_codec).decode(data)
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Отправка сообщения конкретному WebSocket"""
+        await self._send(_Frame(message), websocket)
+
+    async def send_to_user(self, message: dict, user_id: int):
+        """Отправка сообщения всем соединениям пользователя"""
+        sockets = self.active_connections.get(user_id)
+        if sockets:
+            await self._broadcast(_Frame(message), sockets)
+
+    async def send_to_chat(self, message: dict, chat_id: int, exclude_user: Optional[int] = None):
+        """Отправка сообщения всем соединениям, открывшим чат"""
+        sockets = self.chat_connections.get(chat_id)
+        if not sockets:
+            return
+        if exclude_user is not None:
+            sockets = [ws for ws in sockets if self.websocket_users.get(ws) != exclude_user]
+        await self._broadcast(_Frame(message), sockets)
+
+    async def send_to_participants(self, message: dict, chat_id: int, exclude_user: Optional[int] = None):
+        """Отправка сообщения всем подключённым участникам чата, даже если чат не открыт"""
+        membership = await chat_membership.get(chat_id)
+        if membership is None:
+            return
+        frame = _Frame(message)
+        for user_id in membership.participants:
+            if user_id != exclude_user and user_id in self.active_connections:
+                await self._broadcast(frame, self.active_connections[user_id])
+
+    async def send_durable(self, message: dict, user_ids: Iterable[int]):
+        """Доставка события через журнал: с номером seq и на любой воркер.
+
+        Событие сначала записывается в журнал каждого получателя, затем уходит в шину;
+        каждый воркер (включая текущий) отправляет его своим сокетам этих пользователей.
+        Офлайн-получатели заберут его при переподключении с ``resume_from``.
+        """
+        user_ids = list(user_ids)
+        try:
+            seqs = await event_outbox.append(user_ids, message)
+        except Exception as exc:  # noqa: BLE001
+            # Без журнала событие всё равно доставляется тем, кто онлайн
+            logger.warning("Event outbox append failed", error=str(exc))
+            seqs = {}
+        await invalidation_bus.publish(WS_EVENTS_TOPIC, {
+            "event": message,
+            "recipients": [[user_id, seqs.get(user_id)] for user_id in user_ids],
+        })
+
+    async def handle_bus_event(self, payload: Dict[str, Any]):
+        event = payload.get("event") or {}
+        for user_id, seq in payload.get("recipients", ()):
+            sockets = self.active_connections.get(user_id)
+            if not sockets:
+                continue
+            message = dict(event, seq=seq) if seq is not None else event
+            await self._broadcast(_Frame(message), sockets)
+
+    async def replay(self, websocket: WebSocket, user_id: int, resume_from: int):
+        """Отправить события, пропущенные после ``resume_from``, одним кадром"""
+        events, truncated = await event_outbox.replay(user_id, resume_from)
+        await self.send_personal_message({
+            "type": "events_replay",
+            "events": events,
+            "last_seq": events[-1]["seq"] if events else resume_from,
+            # Разрыв в журнале: клиенту нужно заново запросить чаты и сообщения
+            "resync_required": truncated,
+        }, websocket)
+
+    async def _broadcast(self, frame: _Frame, sockets: Iterable[WebSocket]):
+        # Сообщение сериализуется один раз на кодек, копия множества защищает от
+        # изменения реестра во время await
+        for websocket in list(sockets):
+            await self._send(frame, websocket)
+
+    async def _send(self, frame: _Frame, websocket: WebSocket) -> bool:
+        codec = self.websocket_codecs.get(websocket, json_codec)
+        try:
+            if codec.binary:
+                await websocket.send_bytes(frame.encode(codec))
+            else:
+                await websocket.send_text(frame.encode(codec))
+            return True
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("WebSocket send failed", error=str(exc))
+            return False
+
+
+class MessageDispatcher:
+    """Таблица обработчиков по типу входящего сообщения (с алиасами старых клиентов)."""
+
+    def __init__(self, connection_manager: ConnectionManager):
+        self._manager = connection_manager
+        self._handlers: Dict[str, Handler] = {}
+
+    def handler(self, message_type: str, *aliases: str) -> Callable[[Handler], Handler]:
+        def decorator(func: Handler) -> Handler:
+            for name in (message_type, *aliases):
+                self._handlers[name] = func
+            return func
+        return decorator
+
+    async def dispatch(self, websocket: WebSocket, user_id: int, message_data: Dict[str, Any]):
+        """Обработка WebSocket сообщений"""
+        message_type = message_data.get("type")
+        if logger.debug_enabled:
+            logger.debug("WebSocket message received", user_id=user_id, message_type=message_type)
+
+        handler = self._handlers.get(message_type)
+        if handler is None:
+            await self._manager.send_personal_message({
+                "type": "error",
+                "message": f"Unknown message type: {message_type}"
+            }, websocket)
+            return
+        await handler(websocket, user_id, message_data)
+
+
+# Глобальный менеджер соединений и диспетчер
+manager = ConnectionManager(
+    heartbeat_interval=settings.ws_heartbeat_interval,
+    max_missed=settings.ws_heartbeat_max_missed,
+    max_per_user=settings.ws_max_connections_per_user,
+    max_connections=settings.ws_max_connections_per_worker,
+    send_timeout=settings.ws_send_timeout,
+)
+dispatcher = MessageDispatcher(manager)
+invalidation_bus.subscribe(WS_EVENTS_TOPIC, manager.handle_bus_event)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Протоколы кадров WebSocket.
+JSON остаётся протоколом по умолчанию; клиент может запросить компактный
+MessagePack через заголовок Sec-WebSocket-Protocol.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack опционален, без него работает только JSON
+    msgpack = None
+
+JSON_SUBPROTOCOL = "tf.json.v1"
+MSGPACK_SUBPROTOCOL = "tf.msgpack.v1"
+
+# Короткие ключи для бинарного протокола. Таблица только расширяется:
+# переименование существующего ключа ломает уже выпущенных клиентов.
+COMPACT_KEYS = {
+    "type": "t",
+    "data": "d",
+    "id": "i",
+    "chat_id": "c",
+    "user_id": "uid",
+    "message": "m",
+    "messages": "ms",
+    "text": "x",
+    "sender_id": "s",
+    "sender_name": "sn",
+    "sender_nickname": "sk",
+    "created_at": "ca",
+    "timestamp": "ts",
+    "order_id": "o",
+    "offer_price": "op",
+    "customer_id": "cu",
+    "customer_name": "cun",
+    "customer_nickname": "cuk",
+    "executor_id": "ex",
+    "executor_name": "exn",
+    "executor_nickname": "exk",
+    "last_message": "lm",
+    "chat": "ch",
+    "chats": "cs",
+    "unread_count": "u",
+    "last_read_message_id": "lr",
+    "heartbeat_interval": "hb",
+    "interval": "iv",
+    "seq": "q",
+    "events": "ev",
+    "last_seq": "lq",
+    "resync_required": "rr",
+}
+EXPANDED_KEYS = {short: full for full, short in COMPACT_KEYS.items()}
+
+# ISO-строки в этих полях передаются как миллисекунды эпохи (UTC)
+TIMESTAMP_KEYS = frozenset({"created_at", "timestamp"})
+
+
+def _epoch_ms(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def compact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            COMPACT_KEYS.get(key, key): _epoch_ms(item) if key in TIMESTAMP_KEYS else compact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def expand(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {EXPANDED_KEYS.get(key, key): expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+class JsonCodec:
+    subprotocol = JSON_SUBPROTOCOL
+    binary = False
+
+    def encode(self, message: Dict[str, Any]) -> str:
+        return json.dumps(message, ensure_ascii=False)
+
+    def decode(self, data: Union[str, bytes]) -> Dict[str, Any]:
+        return json.loads(data)
+
+
+class MsgPackCodec:
+    subprotocol = MSGPACK_SUBPROTOCOL
+    binary = True
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return msgpack.packb(compact(message), use_bin_type=True)
+
+    def decode(self, data: Union[str, bytes]) -> Dict[str, Any]:
+        if isinstance(data, str):
+            # Текстовые кадры принимаются и в бинарном режиме (ping из отладочных клиентов)
+            return json.loads(data)
+        return expand(msgpack.unpackb(data, raw=False))
+
+
+json_codec = JsonCodec()
+msgpack_codec = MsgPackCodec() if msgpack is not None else None
+
+Codec = Union[JsonCodec, MsgPackCodec]
+
+
+def negotiate(requested: Iterable[str]) -> Tuple[Codec, Optional[str]]:
+    """Выбрать кодек по списку подпротоколов клиента.
+
+    Возвращает кодек и подпротокол для ответа (None — клиент ничего не просил).
+    """
+    requested = list(requested or ())
+    if MSGPACK_SUBPROTOCOL in requested and msgpack_codec is not None:
+        return msgpack_codec, MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in requested:
+        return json_codec, JSON_SUBPROTOCOL
+    return json_codec, None